@@ -0,0 +1 @@
+"""Benchmarks for the Visa Interview Coach server (run with ``python -m benchmarks.<name>``)."""
@@ -0,0 +1,91 @@
+"""Cohort rollup latency over a year of synthetic session history.
+
+Fills the columnar analytics store with --sessions sessions spread over 365
+days, then times full-history and last-week rollups. For comparison it also
+times the old approach (generate_feedback on every SessionLog) on a sample.
+
+    python -m benchmarks.bench_analytics [--sessions 500000] [--sample 5000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+from server.agent import SessionLog
+from server.analytics import AnalyticsStore
+from server.feedback import generate_feedback
+from server.questions import get_all_questions
+
+YEAR = 365 * 86400
+
+
+def fill(store: AnalyticsStore, sessions: int, question_ids: list[int], rng: random.Random):
+    start = time.time() - YEAR
+    for i in range(sessions):
+        asked = rng.sample(question_ids, k=min(len(question_ids), rng.randint(4, 8)))
+        questions = []
+        for qid in asked:
+            replies = rng.randint(1, 3)
+            questions.append((qid, int(rng.random() < 0.2), replies, rng.randint(0, replies) // 2))
+        store.add(
+            ended_at=start + YEAR * i / sessions,
+            duration=rng.uniform(300, 1200),
+            student=sum(q[2] for q in questions),
+            hindi=sum(q[3] for q in questions),
+            switches=sum(q[1] for q in questions),
+            proficiency=rng.randrange(4),
+            questions=questions,
+        )
+
+
+def _time(fn, repeat: int = 5) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=500_000)
+    parser.add_argument("--sample", type=int, default=5000, help="sessions for the per-session baseline")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    question_ids = [q["id"] for q in get_all_questions()]
+    store = AnalyticsStore()
+    started = time.perf_counter()
+    fill(store, args.sessions, question_ids, rng)
+    print(
+        f"filled {len(store.sessions):,} sessions / {len(store.questions):,} question rows "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+    now = time.time()
+    full = _time(lambda: store.rollup())
+    week = _time(lambda: store.rollup(since=now - 7 * 86400))
+    print(f"rollup, full year:  {full * 1000:8.2f} ms")
+    print(f"rollup, last week:  {week * 1000:8.2f} ms")
+
+    logs = []
+    for i in range(args.sample):
+        session = SessionLog(session_id=str(i))
+        for qid in rng.sample(question_ids, k=min(len(question_ids), 6)):
+            session.mark_question(qid)
+            session.add_message("student", "answer", rng.choice(("en", "hi")))
+        logs.append(session)
+    per_session = _time(lambda: [generate_feedback(s) for s in logs], repeat=3) / args.sample
+    print(
+        f"generate_feedback per session: {per_session * 1e6:.1f} us "
+        f"(~{per_session * args.sessions * 1000:,.0f} ms for {args.sessions:,} sessions, "
+        "before any cross-session aggregation)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Throughput and accuracy of the language/confusion detector on one core.
+
+Runs over the labeled corpus in benchmarks/fixtures/utterances.jsonl.
+
+    python -m benchmarks.bench_detector [--rounds 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+
+from server.detector import detect
+
+CORPUS = os.path.join(os.path.dirname(__file__), "fixtures", "utterances.jsonl")
+TARGET_PER_SEC = 50_000
+
+
+def load_corpus(path: str = CORPUS) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = load_corpus()
+    language_errors = [r["text"] for r in rows if detect(r["text"]).language != r["language"]]
+    confusion_errors = [
+        r["text"] for r in rows if detect(r["text"]).needs_hindi_help != r["confused"]
+    ]
+    print(f"corpus: {len(rows)} utterances")
+    print(f"language accuracy:  {1 - len(language_errors) / len(rows):.1%}")
+    print(f"confusion accuracy: {1 - len(confusion_errors) / len(rows):.1%}")
+    for text in language_errors + confusion_errors:
+        print(f"  miss: {text}")
+
+    texts = [r["text"] for r in rows]
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        for text in texts:
+            detect(text)
+    elapsed = time.perf_counter() - started
+    rate = args.rounds * len(texts) / elapsed
+    verdict = "ok" if rate >= TARGET_PER_SEC else "BELOW TARGET"
+    print(f"throughput: {rate:,.0f} utterances/s ({verdict}, target {TARGET_PER_SEC:,})")
+
+
+if __name__ == "__main__":
+    main()
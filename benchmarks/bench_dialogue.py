@@ -0,0 +1,57 @@
+"""Officer turn decision latency of the local dialogue engine.
+
+Replays scripted interviews (vague answers, complete answers, confusion,
+Hindi answers and silence) through ``InterviewDialogue`` and reports the
+per-turn decision time, i.e. what replaces a language-model round trip.
+
+    python -m benchmarks.bench_dialogue [--interviews 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from server.agent import SessionLog
+from server.dialogue import InterviewDialogue
+
+REPLIES = [
+    "My father.",
+    "Samajh nahi aaya, hindi mein samjhao.",
+    "Mere papa pay karenge aur bank se loan bhi hai.",
+    "My father will sponsor my studies from his business income and we also have an "
+    "education loan of twenty lakh rupees approved by the bank.",
+    "After my masters in computer science at the university I will come back to India "
+    "and join my family business because my parents live here.",
+    None,  # silence
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interviews", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    samples = []
+    for n in range(args.interviews):
+        dialogue = InterviewDialogue(SessionLog(session_id=f"b{n}"))
+        dialogue.start()
+        while not dialogue.finished:
+            reply = rng.choice(REPLIES)
+            started = time.perf_counter()
+            if reply is None:
+                dialogue.on_silence()
+            else:
+                dialogue.respond(reply)
+            samples.append(time.perf_counter() - started)
+    samples.sort()
+    p50 = samples[len(samples) // 2] * 1e6
+    p99 = samples[int(len(samples) * 0.99)] * 1e6
+    print(f"{len(samples)} turns over {args.interviews} interviews: p50 {p50:.1f} us, p99 {p99:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Peak memory and throughput of the streaming NDJSON export.
+
+Fills an in-memory store with sessions, then drains the same generators the
+export endpoints stream from, page by page, discarding each chunk. The
+Python heap peak (measured with tracemalloc, above the filled store) should
+stay roughly the same whatever the session count or transcript length.
+
+    python -m benchmarks.bench_export [--sessions 200,2000] [--messages 20,200] [--gzip]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from server.agent import SessionLog
+from server.export import EXPORT_PAGE_LIMIT, ndjson_chunks, page_records
+from server.store import InMemorySessionStore
+
+TEXT = "My father runs a small business and he will sponsor my tuition and living costs."
+
+
+def fill(sessions: int, messages: int) -> InMemorySessionStore:
+    store = InMemorySessionStore(max_sessions=sessions)
+    for i in range(sessions):
+        session = SessionLog(session_id=f"s{i:07d}")
+        for j in range(messages):
+            session.add_message("student" if j % 2 else "agent", TEXT, "en", timestamp=float(j))
+        store.put(session)
+    return store
+
+
+async def drain(store: InMemorySessionStore, compress: bool) -> int:
+    total = 0
+    cursor = None
+    while True:
+        ids = store.scan_ids(cursor, EXPORT_PAGE_LIMIT)
+        cursor = ids[-1] if len(ids) == EXPORT_PAGE_LIMIT else None
+        async for chunk in ndjson_chunks(page_records(store, ids, cursor), compress=compress):
+            total += len(chunk)
+        if cursor is None:
+            return total
+
+
+def run(sessions: int, messages: int, compress: bool) -> dict:
+    store = fill(sessions, messages)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    exported = asyncio.run(drain(store, compress))
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return {"mb": exported / 1e6, "seconds": elapsed, "peak_kb": peak / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", default="200,2000")
+    parser.add_argument("--messages", default="20,200")
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+
+    for sessions in (int(v) for v in args.sessions.split(",")):
+        for messages in (int(v) for v in args.messages.split(",")):
+            result = run(sessions, messages, args.gzip)
+            print(
+                f"{sessions:6d} sessions x {messages:4d} messages: "
+                f"{result['mb']:8.1f} MB in {result['seconds']:6.2f} s, "
+                f"heap peak {result['peak_kb']:8.1f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
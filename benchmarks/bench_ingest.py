@@ -0,0 +1,76 @@
+"""Transcript ingestion throughput: one message per request vs batched events.
+
+    python -m benchmarks.bench_ingest [--messages 5000] [--batch-size 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from server.app import app
+
+
+async def _start(client: httpx.AsyncClient) -> str:
+    response = await client.post("/api/session/start")
+    return response.json()["session_id"]
+
+
+async def single(client: httpx.AsyncClient, messages: int) -> float:
+    session_id = await _start(client)
+    started = time.perf_counter()
+    for i in range(messages):
+        await client.post(
+            f"/api/session/{session_id}/message",
+            params={"role": "student", "text": f"Answer number {i}", "language": "en"},
+        )
+    return messages / (time.perf_counter() - started)
+
+
+async def batched(client: httpx.AsyncClient, messages: int, batch_size: int) -> float:
+    session_id = await _start(client)
+    started = time.perf_counter()
+    for offset in range(0, messages, batch_size):
+        events = [
+            {"type": "message", "role": "student", "text": f"Answer number {i}", "language": "en"}
+            for i in range(offset, min(offset + batch_size, messages))
+        ]
+        await client.post(f"/api/session/{session_id}/events", json=events)
+    return messages / (time.perf_counter() - started)
+
+
+async def streamed(client: httpx.AsyncClient, messages: int) -> float:
+    session_id = await _start(client)
+
+    async def body():
+        for i in range(messages):
+            yield (
+                b'{"type": "message", "role": "student", "text": "Answer number %d"}\n' % i
+            )
+
+    started = time.perf_counter()
+    await client.post(f"/api/session/{session_id}/events/stream", content=body())
+    return messages / (time.perf_counter() - started)
+
+
+async def run(messages: int, batch_size: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'single':>10}: {await single(client, messages):,.0f} msg/s")
+        print(f"{'batched':>10}: {await batched(client, messages, batch_size):,.0f} msg/s")
+        print(f"{'ndjson':>10}: {await streamed(client, messages):,.0f} msg/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Session journal append throughput and caller-side latency.
+
+For each fsync interval, appends --appends message records from the
+calling thread, then waits for the background writer to make them durable.
+Reports the caller-side rate (what a request pays), the end-to-end durable
+rate, fsync count and p99 latency of a single append call.
+
+    python -m benchmarks.bench_journal [--appends 200000] [--intervals 0.001,0.01,0.05]
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+
+from server.journal import SessionJournal
+
+TEXT = "My father runs a small business and he will sponsor my tuition and living costs."
+
+
+def run(appends: int, interval: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = SessionJournal(tmp, fsync_interval=interval)
+        journal.recover()
+        latencies = []
+        started = time.perf_counter()
+        for i in range(appends):
+            before = time.perf_counter()
+            journal.message(f"s{i % 1000}", "student", TEXT, "en", time.time())
+            latencies.append(time.perf_counter() - before)
+        queued = time.perf_counter() - started
+        journal.flush(timeout=300)
+        durable = time.perf_counter() - started
+        journal.close()
+    latencies.sort()
+    return {
+        "caller_rate": appends / queued,
+        "durable_rate": appends / durable,
+        "fsyncs": journal.stats["fsyncs"],
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "mb": journal.stats["bytes"] / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--appends", type=int, default=200_000)
+    parser.add_argument("--intervals", default="0.001,0.01,0.05")
+    args = parser.parse_args()
+
+    for interval in (float(v) for v in args.intervals.split(",")):
+        result = run(args.appends, interval)
+        print(
+            f"fsync every {interval * 1000:5.1f} ms: "
+            f"caller {result['caller_rate']:10,.0f} appends/s, "
+            f"durable {result['durable_rate']:10,.0f} appends/s, "
+            f"{result['fsyncs']:5d} fsyncs, append p99 {result['p99_us']:.1f} us, "
+            f"{result['mb']:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Per-request overhead of the rate limiter and admission control.
+
+Drives ``RateLimitMiddleware`` around a no-op ASGI app with every lane
+limited, a mix of start, transcript-write and read requests from many client
+IPs, and compares against the bare app. Fails if the added cost per request
+exceeds the budget.
+
+    python -m benchmarks.bench_limits [--requests 200000] [--clients 10000] [--budget-us 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from server.limits import Limiter, RateLimitMiddleware
+
+
+async def noop_app(scope, receive, send):
+    pass
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+def build_scopes(count: int, clients: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    paths = [
+        ("POST", "/api/session/start"),
+        ("POST", "/api/session/{}/events"),
+        ("POST", "/api/session/{}/end"),
+        ("GET", "/api/session/{}/feedback"),
+        ("GET", "/api/analytics"),
+    ]
+    scopes = []
+    for _ in range(count):
+        method, path = rng.choice(paths)
+        scopes.append({
+            "type": "http",
+            "method": method,
+            "path": path.format(f"s{rng.randrange(clients):05d}"),
+            "client": (f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(clients) % 256}", 4000),
+            "headers": [],
+        })
+    return scopes
+
+
+async def drive(app, scopes: list[dict]) -> float:
+    started = time.perf_counter()
+    for scope in scopes:
+        await app(scope, receive, send)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--budget-us", type=float, default=20.0)
+    args = parser.parse_args()
+
+    scopes = build_scopes(args.requests, args.clients)
+    limiter = Limiter(start_rate=1, start_burst=5, rate=20, burst=50, priority_rate=50,
+                      priority_burst=200, max_active=5000)
+    # Seed below the cap so timed starts take the reserve/release path, not the 503.
+    for n in range(min(args.clients, limiter.max_active // 2)):
+        limiter.started(f"s{n:05d}")
+    limited = RateLimitMiddleware(noop_app, limiter)
+
+    bare = asyncio.run(drive(noop_app, scopes))
+    total = asyncio.run(drive(limited, scopes))
+    overhead = (total - bare) / args.requests * 1e6
+    print(f"{args.requests} requests from {args.clients} clients: "
+          f"limiter overhead {overhead:.2f} us/request, stats {limiter.stats()}")
+    if overhead > args.budget_us:
+        print(f"FAIL: over the {args.budget_us} us budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Cost of recording session audio on the live path, and of seeking during playback.
+
+Feeds 30 ms PCM16 frames for many concurrent sessions through
+``SessionRecording.write`` (what the /ws/audio handler calls per frame) and
+reports the per-frame cost on the event loop and the background writer's
+throughput. Then reads one utterance-sized range from each recording through
+the memory-mapped playback, against reading the whole file.
+
+    python -m benchmarks.bench_recording [--sessions 50] [--seconds 120]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.loadgen import percentile
+from server.recording import WAV_HEADER_BYTES, AudioRecorder
+from server.stt import SAMPLE_RATE
+
+FRAME_BYTES = SAMPLE_RATE * 2 * 30 // 1000
+UTTERANCE_SECONDS = 5
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--seconds", type=int, default=120, help="audio per session")
+    args = parser.parse_args()
+
+    frame = os.urandom(FRAME_BYTES)
+    frames = args.seconds * 1000 // 30
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = AudioRecorder(directory)
+        recordings = [recorder.open(f"s{i:05d}") for i in range(args.sessions)]
+        samples = []
+        started = time.perf_counter()
+        now = 1.7e9
+        for _ in range(frames):
+            now += 0.03
+            for recording in recordings:
+                t0 = time.perf_counter()
+                recording.write(frame, now=now)
+                samples.append(time.perf_counter() - t0)
+        for recording in recordings:
+            recording.close()
+        recorder.flush(timeout=600)
+        elapsed = time.perf_counter() - started
+        total = recorder.stats["bytes"]
+        print(
+            f"write: p50 {percentile(samples, 50) * 1e6:.2f} us, p99 {percentile(samples, 99) * 1e6:.2f} us "
+            f"per 30 ms frame; {total / 1e6:.1f} MB in {elapsed:.2f} s ({total / 1e6 / elapsed:.0f} MB/s)"
+        )
+
+        seek, whole = [], []
+        length = UTTERANCE_SECONDS * SAMPLE_RATE * 2
+        for i in range(args.sessions):
+            session_id = f"s{i:05d}"
+            t0 = time.perf_counter()
+            playback = recorder.open_playback(session_id)
+            start = playback.offset_at(1.7e9 + args.seconds / 2)
+            data = b"".join(playback.iter_bytes(start, min(playback.size, start + length)))
+            seek.append(time.perf_counter() - t0)
+            assert len(data) == min(length, playback.size - start)
+
+            t0 = time.perf_counter()
+            with open(os.path.join(directory, f"{session_id}.wav"), "rb") as f:
+                data = f.read()[WAV_HEADER_BYTES:]
+            whole.append(time.perf_counter() - t0)
+        recorder.close()
+    print(
+        f"seek to one {UTTERANCE_SECONDS} s answer: p50 {percentile(seek, 50) * 1e3:.3f} ms; "
+        f"read whole {args.seconds} s file: p50 {percentile(whole, 50) * 1e3:.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
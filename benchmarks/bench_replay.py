@@ -0,0 +1,300 @@
+"""Replay recorded or simulated interviews through ingestion, feedback and the session API.
+
+Recordings are session exports (``GET /api/sessions/export``, plain or
+gzipped). Without --input, interviews are simulated with the local dialogue
+engine from student profiles (typical, hindi_heavy, silent, follow_ups), so
+the load has the shape of real sessions: Hindi answers, confusion, long
+silences and follow-up chains. --record writes the simulated sessions as an
+export file for later runs.
+
+Stages:
+
+* offline: each recording is rebuilt through language detection and
+  ingestion, then its feedback is generated (both timed per session);
+* --golden FILE: the rebuilt feedback is compared with FILE, which is
+  written when missing or with --update-golden; any difference exits
+  non-zero, so an optimization can be shown not to change feedback;
+* replay: recordings are replayed against the in-process app (or --url) at
+  each --speed (1 = recorded pace, 0 = as fast as possible), --concurrency
+  at a time, reporting per-endpoint latency. --processes splits a --url
+  replay across worker processes.
+
+    python -m benchmarks.bench_replay [--sessions 200] [--speed 0,10] [--concurrency 50]
+    python -m benchmarks.bench_replay --input export.ndjson.gz --golden feedback.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import httpx
+
+from benchmarks.loadgen import Recorder, percentile
+from benchmarks.stub_elevenlabs import StubServer
+from server import agent
+from server.agent import SessionLog
+from server.detector import NO_QUESTION, annotate_message, detect
+from server.dialogue import InterviewDialogue
+from server.export import session_records
+from server.feedback import generate_feedback
+from server.questions import get_all_questions
+from server.replay import Recording, duration, load_recordings, read_recordings, rebuild, replay_http
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "utterances.jsonl")
+# Seconds without speech before the officer offers help (VAD_SILENCE_SECONDS default).
+SILENCE_SECONDS = 6.0
+# Speaking time per word, officer and student.
+WORD_SECONDS = 0.4
+
+
+class Profile(NamedTuple):
+    hindi: float  # share of answers given in Hindi
+    confused: float  # share of replies that show confusion
+    silence: float  # chance of saying nothing when a reply is due
+    sentences: int  # most answer sentences per reply
+    think: tuple  # seconds before replying (min, max)
+
+
+PROFILES = {
+    "typical": Profile(hindi=0.1, confused=0.05, silence=0.02, sentences=3, think=(1.0, 4.0)),
+    "hindi_heavy": Profile(hindi=0.7, confused=0.2, silence=0.05, sentences=2, think=(2.0, 6.0)),
+    "silent": Profile(hindi=0.2, confused=0.1, silence=0.4, sentences=1, think=(4.0, 12.0)),
+    "follow_ups": Profile(hindi=0.05, confused=0.05, silence=0.0, sentences=1, think=(1.0, 3.0)),
+}
+
+
+def _utterances() -> dict[str, list[str]]:
+    pools = {"en": [], "hi": [], "confused": []}
+    with open(FIXTURES) as f:
+        for line in f:
+            u = json.loads(line)
+            pools["confused" if u["confused"] else u["language"]].append(u["text"])
+    return pools
+
+
+def simulate(session_id: str, profile: Profile, rng: random.Random, pools: dict, start: float) -> Recording:
+    """One interview driven by the dialogue engine, as its export would record it."""
+    questions = get_all_questions()
+    plan = sorted(q["id"] for q in rng.sample(questions, min(5, len(questions))))
+    session = SessionLog(
+        session_id=session_id, student_id=f"student{rng.randrange(50)}", start_time=start,
+        question_plan=plan,
+    )
+    dialogue = InterviewDialogue(session)
+    now = start
+
+    def say(turns):
+        nonlocal now
+        for turn in turns:
+            now += 0.5
+            session.add_message("agent", turn.text, turn.language, timestamp=now)
+            now += len(turn.text.split()) * WORD_SECONDS
+
+    say(dialogue.start())
+    while not dialogue.finished:
+        if rng.random() < profile.silence:
+            now += SILENCE_SECONDS
+            question_id = session.current_question_id
+            session.add_language_switch(
+                NO_QUESTION if question_id is None else question_id,
+                f"silence: {SILENCE_SECONDS:g}s", timestamp=now,
+            )
+            say(dialogue.on_silence())
+            continue
+        now += rng.uniform(*profile.think)
+        if rng.random() < profile.confused:
+            text = rng.choice(pools["confused"])
+        else:
+            pool = pools["hi" if rng.random() < profile.hindi else "en"]
+            text = " ".join(rng.sample(pool, rng.randint(1, profile.sentences)))
+        event = {"type": "message", "role": "student", "text": text, "timestamp": now}
+        detection = detect(text)
+        session.add_events(annotate_message(session, event, detection))
+        now += len(text.split()) * WORD_SECONDS
+        say(dialogue.respond(text, detection))
+    session.end_time = now + 1.0
+    return next(read_recordings(json.dumps(r) for r in session_records(session)))
+
+
+def simulate_all(count: int, profiles: list[str], seed: int) -> list[Recording]:
+    rng = random.Random(seed)
+    pools = _utterances()
+    return [
+        simulate(f"sim{i:06d}", PROFILES[profiles[i % len(profiles)]], rng, pools, 1.7e9 + i * 3600)
+        for i in range(count)
+    ]
+
+
+def offline(recordings: list[Recording]) -> tuple[dict, dict]:
+    """Rebuild and feedback timings, and the feedback per session."""
+    rebuild_times, feedback_times = [], []
+    feedback = {}
+    events = 0
+    for recording in recordings:
+        started = time.perf_counter()
+        session = rebuild(recording)
+        rebuilt = time.perf_counter()
+        feedback[recording.session_id] = generate_feedback(session)
+        rebuild_times.append(rebuilt - started)
+        feedback_times.append(time.perf_counter() - rebuilt)
+        events += len(recording.records)
+    total = sum(rebuild_times)
+    timings = {
+        "events_per_s": round(events / total) if total else None,
+        "rebuild_p50_ms": round(percentile(rebuild_times, 50) * 1000, 3),
+        "rebuild_p99_ms": round(percentile(rebuild_times, 99) * 1000, 3),
+        "feedback_p50_ms": round(percentile(feedback_times, 50) * 1000, 3),
+        "feedback_p99_ms": round(percentile(feedback_times, 99) * 1000, 3),
+    }
+    return timings, feedback
+
+
+def check_golden(feedback: dict, path: str, update: bool) -> list[str]:
+    """Differences between ``feedback`` and the golden file (which is (re)written if asked or missing)."""
+    feedback = json.loads(json.dumps(feedback))
+    if update or not os.path.exists(path):
+        with open(path, "w") as f:
+            json.dump(feedback, f, indent=1, sort_keys=True)
+        return []
+    with open(path) as f:
+        golden = json.load(f)
+    problems = [f"{sid}: missing from this run" for sid in golden.keys() - feedback.keys()]
+    for session_id, report in sorted(feedback.items()):
+        expected = golden.get(session_id)
+        if expected is None:
+            problems.append(f"{session_id}: not in the golden file")
+            continue
+        for key in sorted(expected.keys() | report.keys()):
+            if expected.get(key) != report.get(key):
+                problems.append(f"{session_id}: {key} differs")
+    return problems
+
+
+async def replay(client: httpx.AsyncClient, recordings: list[Recording], speed: float, concurrency: int):
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = 0
+
+    async def one(recording):
+        nonlocal failed
+        async with semaphore:
+            if await replay_http(client, recording, speed, call=recorder.call) is None:
+                failed += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(r) for r in recordings))
+    return recorder, time.perf_counter() - started, failed
+
+
+async def _replay_in_process(recordings, speed, concurrency):
+    from server.app import app, signed_url_pool
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+        result = await replay(client, recordings, speed, concurrency)
+    await signed_url_pool.close()
+    return result
+
+
+async def _replay_remote(url, recordings, speed, concurrency):
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        return await replay(client, recordings, speed, concurrency)
+
+
+def _replay_worker(url, recordings, speed, concurrency):
+    recorder, elapsed, failed = asyncio.run(_replay_remote(url, recordings, speed, concurrency))
+    return dict(recorder.latencies), dict(recorder.errors), elapsed, failed
+
+
+def run_replay(args, recordings: list[Recording], speed: float) -> dict:
+    if args.url and args.processes > 1:
+        slices = [recordings[i::args.processes] for i in range(args.processes)]
+        per_process = max(1, args.concurrency // args.processes)
+        recorder, elapsed, failed = Recorder(), 0.0, 0
+        with ProcessPoolExecutor(args.processes) as pool:
+            futures = [
+                pool.submit(_replay_worker, args.url, part, speed, per_process) for part in slices if part
+            ]
+            for future in futures:
+                latencies, errors, seconds, lost = future.result()
+                for name, samples in latencies.items():
+                    recorder.latencies[name].extend(samples)
+                for name, count in errors.items():
+                    recorder.errors[name] += count
+                elapsed, failed = max(elapsed, seconds), failed + lost
+    elif args.url:
+        recorder, elapsed, failed = asyncio.run(
+            _replay_remote(args.url, recordings, speed, args.concurrency)
+        )
+    else:
+        with StubServer(delay=0.0) as stub:
+            agent.ELEVENLABS_API_BASE = stub.url  # read at import, which has already happened
+            os.environ.setdefault("ELEVENLABS_API_KEY", "replay-key")
+            os.environ.setdefault("ELEVENLABS_AGENT_ID", "replay-agent")
+            recorder, elapsed, failed = asyncio.run(
+                _replay_in_process(recordings, speed, args.concurrency)
+            )
+    recorded = sum(duration(r) for r in recordings)
+    return {
+        "speed": speed or "max",
+        "elapsed_s": round(elapsed, 3),
+        # Interview-seconds replayed per wall-clock second, across all sessions.
+        "time_compression": round(recorded / elapsed, 1) if elapsed else None,
+        "failed_sessions": failed,
+        "endpoints": recorder.summary(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", help="session export to replay (default: simulate sessions)")
+    parser.add_argument("--sessions", type=int, default=200, help="sessions to simulate")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="simulated profiles, in rotation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", help="write the simulated sessions as an export file")
+    parser.add_argument("--golden", help="feedback golden file to check (or write)")
+    parser.add_argument("--update-golden", action="store_true")
+    parser.add_argument("--speed", default="0", help="replay speeds, e.g. 1,10,0 (0 = max); empty skips")
+    parser.add_argument("--concurrency", type=int, default=50, help="sessions replayed at once")
+    parser.add_argument("--url", help="replay against a running server instead of the in-process app")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes (with --url)")
+    args = parser.parse_args()
+
+    if args.input:
+        recordings = load_recordings(args.input)
+    else:
+        recordings = simulate_all(args.sessions, args.profiles.split(","), args.seed)
+    if args.record:
+        with open(args.record, "w") as f:
+            for recording in recordings:
+                for record in session_records(rebuild(recording)):
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    timings, feedback = offline(recordings)
+    result = {
+        "sessions": len(recordings),
+        "events": sum(len(r.records) for r in recordings),
+        "recorded_minutes": round(sum(duration(r) for r in recordings) / 60, 1),
+        "offline": timings,
+        "replays": [run_replay(args, recordings, float(s)) for s in args.speed.split(",") if s],
+    }
+    problems = check_golden(feedback, args.golden, args.update_golden) if args.golden else []
+    result["golden_differences"] = len(problems)
+    print(json.dumps(result, indent=2))
+    for problem in problems:
+        print(f"FEEDBACK CHANGED: {problem}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
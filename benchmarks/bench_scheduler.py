@@ -0,0 +1,93 @@
+"""Question plan latency as the bank and the student population grow.
+
+For each bank size, builds a synthetic bank, gives every student a history
+of struggled sessions, then times ``plan`` for random students (the work
+done on each session start) and ``record`` (done once per session end).
+
+    python -m benchmarks.bench_scheduler [--banks 100,1000,10000] [--students 10000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from unittest.mock import patch
+
+from server.agent import SessionLog
+from server.questions import QuestionBank
+from server.scheduler import QuestionScheduler
+
+CATEGORIES = ("study_plans", "financial", "return_intent", "academic", "english_proficiency")
+
+
+def build_bank(directory: str, size: int) -> QuestionBank:
+    questions = [
+        {
+            "id": qid,
+            "question_en": f"Question {qid}?",
+            "hint_hi": f"Sawaal {qid}?",
+            "category": CATEGORIES[qid % len(CATEGORIES)],
+            "follow_ups": [],
+        }
+        for qid in range(1, size + 1)
+    ]
+    path = f"{directory}/questions-{size}.json"
+    with open(path, "w") as f:
+        json.dump({"questions": questions}, f)
+    return QuestionBank(path)
+
+
+def history(scheduler: QuestionScheduler, student: str, rng: random.Random, bank_size: int):
+    session = SessionLog(session_id=student)
+    for qid in rng.sample(range(1, bank_size + 1), 6):
+        session.mark_question(qid)
+        session.add_message("student", "answer", "en", timestamp=0.0)
+        if rng.random() < 0.5:
+            session.add_language_switch(qid, "confusion", timestamp=0.0)
+    scheduler.record(student, session)
+
+
+def percentiles(samples: list[float]) -> tuple[float, float]:
+    samples.sort()
+    return samples[len(samples) // 2] * 1e6, samples[int(len(samples) * 0.99)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--banks", default="100,1000,10000")
+    parser.add_argument("--students", type=int, default=10_000)
+    parser.add_argument("--sessions", type=int, default=3, help="past sessions per student")
+    parser.add_argument("--plans", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(v) for v in args.banks.split(",")):
+            bank = build_bank(tmp, size)
+            with patch("server.scheduler.question_bank", bank):
+                scheduler = QuestionScheduler(rng=random.Random(1))
+                record_times = []
+                for n in range(args.students):
+                    for _ in range(args.sessions):
+                        started = time.perf_counter()
+                        history(scheduler, f"student-{n}", rng, size)
+                        record_times.append(time.perf_counter() - started)
+                plan_times = []
+                for _ in range(args.plans):
+                    student = f"student-{rng.randrange(args.students)}"
+                    started = time.perf_counter()
+                    scheduler.plan(student)
+                    plan_times.append(time.perf_counter() - started)
+            p50, p99 = percentiles(plan_times)
+            r50, _ = percentiles(record_times)
+            print(
+                f"bank {size:6d}, {args.students} students: "
+                f"plan p50 {p50:6.1f} us  p99 {p99:6.1f} us   record+history p50 {r50:6.1f} us"
+            )
+
+
+if __name__ == "__main__":
+    main()
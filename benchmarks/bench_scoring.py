@@ -0,0 +1,79 @@
+"""Answer-quality scoring latency for a full interview transcript.
+
+Builds a 30-turn session (officer question, student answer) from the
+question bank and times ``score_transcript`` over it, then the whole
+``generate_feedback`` call that ``/end`` makes. Fails if the scoring p99
+exceeds the budget.
+
+    python -m benchmarks.bench_scoring [--turns 30] [--rounds 2000] [--budget-ms 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+
+from server.agent import SessionLog
+from server.feedback import generate_feedback
+from server.questions import get_all_questions
+from server.scoring import score_transcript
+
+ANSWERS = [
+    "My father will sponsor my studies, he has savings of forty lakh rupees and a fixed deposit.",
+    "Um, basically I want to do my masters in computer science at the university because of its research labs.",
+    "After graduation I will come back to India and join my family business, my parents live here.",
+    "I scored seven point five bands overall in IELTS.",
+    "I did my BTech in electronics with a CGPA of eight point two.",
+    "Actually, you know, I am not sure sir.",
+]
+
+
+def build_session(turns: int, seed: int = 0) -> SessionLog:
+    rng = random.Random(seed)
+    prompts = [text for q in get_all_questions() for text in (q["question_en"], *q["follow_ups"])]
+    session = SessionLog(session_id="bench")
+    for i in range(turns):
+        session.add_message("agent", prompts[i % len(prompts)], timestamp=float(2 * i))
+        session.add_message("student", rng.choice(ANSWERS), timestamp=float(2 * i + 1))
+    return session
+
+
+def timed(function, rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    session = build_session(args.turns)
+    print(f"{args.turns} turns, {len(score_transcript(session.transcript))} answers scored")
+    worst = 0.0
+    for name, function in (
+        ("score_transcript", lambda: score_transcript(session.transcript)),
+        ("generate_feedback", lambda: generate_feedback(session)),
+    ):
+        samples = timed(function, args.rounds)
+        p50 = samples[len(samples) // 2] * 1000
+        p99 = samples[int(len(samples) * 0.99)] * 1000
+        print(f"{name:18s} p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+        if name == "score_transcript":
+            worst = p99
+    if worst > args.budget_ms:
+        print(f"FAIL: p99 {worst:.3f} ms over the {args.budget_ms} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
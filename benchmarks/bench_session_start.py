@@ -0,0 +1,71 @@
+"""p50/p99 latency of /api/session/start at 200 concurrent starts.
+
+Runs the app in-process against a local stub of the ElevenLabs API that
+answers after a fixed delay, once with the signed-URL pool disabled and once
+with it pre-filled.
+
+    python -m benchmarks.bench_session_start [--concurrency 200] [--delay 0.05]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+from benchmarks.stub_elevenlabs import StubServer
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _run(app, pool, concurrency: int, pool_size: int) -> list[float]:
+    pool.size = pool_size
+    await pool.refill()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one() -> float:
+            started = time.perf_counter()
+            response = await client.post("/api/session/start")
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+        latencies = await asyncio.gather(*(one() for _ in range(concurrency)))
+    await pool.close()
+    return list(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=0.05, help="stub upstream delay (s)")
+    args = parser.parse_args()
+
+    with StubServer(delay=args.delay) as stub:
+        os.environ["ELEVENLABS_API_BASE"] = stub.url
+        os.environ["ELEVENLABS_API_KEY"] = "bench-key"
+        os.environ["ELEVENLABS_AGENT_ID"] = "bench-agent"
+
+        from server.app import app, signed_url_pool
+
+        for label, pool_size in (("no pool", 0), ("prefetched pool", args.concurrency)):
+            latencies = asyncio.run(_run(app, signed_url_pool, args.concurrency, pool_size))
+            print(
+                f"{label:>16}: n={len(latencies)} "
+                f"p50={_percentile(latencies, 50) * 1000:.1f}ms "
+                f"p99={_percentile(latencies, 99) * 1000:.1f}ms "
+                f"mean={statistics.fmean(latencies) * 1000:.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Partial-result latency of the local STT pipeline over recorded WAV files.
+
+Streams each 16 kHz mono PCM16 WAV through SpeechStream in real time (one
+chunk every ``--chunk-ms``) and reports how long after a chunk is sent the
+next partial or final result arrives. Needs the vosk package and a model in
+STT_MODEL_PATH (``pip install -r requirements-local.txt``).
+
+Fixtures default to benchmarks/fixtures/audio/*.wav. Recordings of real
+students are not committed, so when there are none the English answers of
+benchmarks/fixtures/utterances.jsonl are spoken by the local TTS voice
+(TTS_MODEL_PATH) and resampled to 16 kHz instead.
+
+    python -m benchmarks.bench_stt [--chunk-ms 100] [--streams 4] [--answers 8] [wav ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+import wave
+
+import numpy as np
+
+from server.stt import SAMPLE_RATE, SpeechStream, create_recognizer, get_executor
+from server.tts import create_synthesizer
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "audio", "*.wav")
+CORPUS = os.path.join(os.path.dirname(__file__), "fixtures", "utterances.jsonl")
+TARGET_MS = 300
+
+
+def _read_pcm(path: str) -> bytes:
+    with wave.open(path, "rb") as wav:
+        if wav.getframerate() != SAMPLE_RATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16 kHz mono PCM16")
+        return wav.readframes(wav.getnframes())
+
+
+def _resample(pcm: bytes, rate: int) -> bytes:
+    """PCM16 at ``rate`` to 16 kHz, followed by a second of silence to end the utterance."""
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32)
+    if rate != SAMPLE_RATE:
+        positions = np.arange(len(samples) * SAMPLE_RATE // rate) * (rate / SAMPLE_RATE)
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return samples.astype("<i2").tobytes() + bytes(SAMPLE_RATE * 2)
+
+
+def synthesize_answers(count: int) -> list[bytes]:
+    """Spoken English answers from the utterance corpus, as 16 kHz PCM16."""
+    synthesizer = create_synthesizer("en")
+    with open(CORPUS, encoding="utf-8") as f:
+        texts = [r["text"] for r in map(json.loads, f) if r["language"] == "en"][:count]
+    return [_resample(synthesizer.synthesize(text), synthesizer.sample_rate) for text in texts]
+
+
+async def _stream_file(pcm: bytes, chunk_ms: int) -> list[float]:
+    loop = asyncio.get_running_loop()
+    recognizer = await loop.run_in_executor(get_executor(), create_recognizer)
+    stream = SpeechStream(recognizer)
+    chunk_bytes = SAMPLE_RATE * 2 * chunk_ms // 1000
+    sent_at: list[float] = []
+    latencies: list[float] = []
+
+    async def consume():
+        async for _ in stream.results():
+            if sent_at:
+                latencies.append(time.perf_counter() - sent_at[-1])
+
+    consumer = asyncio.create_task(consume())
+    for offset in range(0, len(pcm), chunk_bytes):
+        sent_at.append(time.perf_counter())
+        stream.push(pcm[offset:offset + chunk_bytes])
+        await asyncio.sleep(chunk_ms / 1000)
+    stream.close()
+    await consumer
+    return latencies
+
+
+async def run(pcms: list[bytes], chunk_ms: int, streams: int) -> list[float]:
+    jobs = [_stream_file(pcms[i % len(pcms)], chunk_ms) for i in range(max(streams, len(pcms)))]
+    results = await asyncio.gather(*jobs)
+    return [latency for latencies in results for latency in latencies]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("wav", nargs="*", help="WAV fixtures (16 kHz mono PCM16)")
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    parser.add_argument("--streams", type=int, default=1, help="concurrent audio streams")
+    parser.add_argument("--answers", type=int, default=8, help="answers to synthesize without fixtures")
+    args = parser.parse_args()
+
+    paths = args.wav or sorted(glob.glob(FIXTURES))
+    if paths:
+        pcms = [_read_pcm(path) for path in paths]
+    else:
+        print(f"no WAV fixtures at {FIXTURES}; synthesizing {args.answers} answers")
+        pcms = synthesize_answers(args.answers)
+
+    latencies = sorted(asyncio.run(run(pcms, args.chunk_ms, args.streams)))
+    if not latencies:
+        print("no partial results produced")
+        return
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    verdict = "OK" if p95 < TARGET_MS else f"over {TARGET_MS} ms target"
+    print(f"results={len(latencies)} p50={p50:.0f}ms p95={p95:.0f}ms ({verdict})")
+
+
+if __name__ == "__main__":
+    main()
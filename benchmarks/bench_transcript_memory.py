@@ -0,0 +1,69 @@
+"""Traced bytes per 1,000 utterances: dict-per-entry transcript vs columnar Transcript.
+
+    python -m benchmarks.bench_transcript_memory [--utterances 100000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+
+from server.agent import Transcript
+
+
+def _texts(count: int) -> list[str]:
+    return [f"I will study computer science at the university, answer {i}" for i in range(count)]
+
+
+def _measure(build) -> int:
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        keep = build()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del keep
+    return after - before
+
+
+def dict_transcript(texts: list[str]):
+    transcript = []
+    for i, text in enumerate(texts):
+        transcript.append({
+            "role": "student" if i % 2 else "agent",
+            "text": text,
+            "language": "en",
+            "timestamp": time.time(),
+        })
+    return transcript
+
+
+def columnar_transcript(texts: list[str]):
+    transcript = Transcript()
+    for i, text in enumerate(texts):
+        transcript.append("student" if i % 2 else "agent", text, "en", time.time())
+    return transcript
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--utterances", type=int, default=100_000)
+    args = parser.parse_args()
+
+    texts = _texts(args.utterances)
+    text_bytes = _measure(lambda: _texts(args.utterances))
+    per_k = 1000 / args.utterances
+    results = {
+        "list of dicts": _measure(lambda: dict_transcript(texts)),
+        "columnar": _measure(lambda: columnar_transcript(texts)),
+    }
+    print(f"utterance text alone: {text_bytes * per_k:,.0f} B per 1k utterances (shared by both)")
+    for label, size in results.items():
+        print(f"{label:>14}: {size * per_k:,.0f} B per 1k utterances (excluding text)")
+    print(f"reduction: {1 - results['columnar'] / results['list of dicts']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Time to first audio for officer replies: phrase-cache hits vs misses.
+
+Needs the piper-tts package and a voice in TTS_MODEL_PATH (and
+TTS_MODEL_PATH_HI for the Hindi hints).
+
+    python -m benchmarks.bench_tts [--rounds 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from server.tts import SpeechService, fixed_phrases
+
+NOVEL_REPLIES = [
+    "Which city will you live in during your studies? Do you have relatives there?",
+    "You mentioned a scholarship. How much of the tuition does it cover?",
+    "What did you study in your final year project? Tell me briefly.",
+]
+
+
+async def _first_audio(service: SpeechService, text: str, language: str) -> float:
+    started = time.perf_counter()
+    async for _ in service.stream(text, language):
+        return time.perf_counter() - started
+    return time.perf_counter() - started
+
+
+async def run(rounds: int):
+    service = SpeechService()
+    started = time.perf_counter()
+    await service.prewarm()
+    print(f"prewarm: {len(service.cache)} phrases in {time.perf_counter() - started:.2f}s")
+
+    phrases = fixed_phrases()
+    hits = [await _first_audio(service, text, lang) for lang, text in phrases * rounds]
+    misses = []
+    for i in range(rounds):
+        for reply in NOVEL_REPLIES:
+            misses.append(await _first_audio(service, f"Round {i}. {reply}", "en"))
+
+    for label, samples in (("cache hit", hits), ("cache miss", misses)):
+        samples.sort()
+        print(
+            f"{label:>10}: n={len(samples)} "
+            f"p50={statistics.median(samples) * 1000:.2f}ms "
+            f"p95={samples[int(len(samples) * 0.95)] * 1000:.2f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.rounds))
+
+
+if __name__ == "__main__":
+    main()
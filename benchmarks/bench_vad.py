@@ -0,0 +1,64 @@
+"""Voice activity detection throughput: frames per second per core.
+
+Feeds synthetic 16 kHz PCM16 audio (alternating tone bursts and quiet gaps)
+in 100 ms chunks, the size the browser sends, through one detector per
+process. With --processes N, N detectors run in parallel and the per-core
+rate is reported alongside the total.
+
+    python -m benchmarks.bench_vad [--seconds 600] [--processes 1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import time
+
+import numpy as np
+
+from server.vad import VoiceActivityDetector
+
+RATE = 16000
+CHUNK_SECONDS = 0.1
+
+
+def _audio(seconds: float) -> list[bytes]:
+    rng = np.random.default_rng(0)
+    t = np.arange(int(RATE * seconds)) / RATE
+    voiced = (np.sin(2 * np.pi * 1.5 * t) > 0) * 8000 * np.sin(2 * np.pi * 180 * t)
+    samples = (voiced + rng.normal(0, 50, t.size)).astype("<i2").tobytes()
+    step = int(RATE * CHUNK_SECONDS) * 2
+    return [samples[i:i + step] for i in range(0, len(samples), step)]
+
+
+def _run(seconds: float) -> tuple[int, float, int]:
+    chunks = _audio(seconds)
+    vad = VoiceActivityDetector()
+    events = 0
+    started = time.perf_counter()
+    for chunk in chunks:
+        events += len(vad.process(chunk))
+    elapsed = time.perf_counter() - started
+    return int(seconds / vad.frame_seconds), elapsed, events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=600, help="audio per process")
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args()
+
+    with multiprocessing.Pool(args.processes) as pool:
+        results = pool.map(_run, [args.seconds] * args.processes)
+
+    for i, (frames, elapsed, events) in enumerate(results):
+        print(
+            f"core {i}: {frames / elapsed:,.0f} frames/s "
+            f"({args.seconds / elapsed:,.0f}x real time, {events} events)"
+        )
+    total = sum(frames / elapsed for frames, elapsed, _ in results)
+    print(f"total: {total:,.0f} frames/s across {args.processes} process(es)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Request throughput of the full session lifecycle with 1..N uvicorn workers.
+
+Each worker count gets a fresh SQLite session store (SESSION_STORE=sqlite)
+so sessions started on one worker can be ended on another. Load comes from
+several client processes, each running many concurrent asyncio clients.
+
+    python -m benchmarks.bench_workers [--max-workers 4] [--duration 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.stub_elevenlabs import _free_port
+
+
+async def _client_loop(base_url: str, deadline: float, concurrency: int) -> int:
+    requests = 0
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+
+        async def student():
+            nonlocal requests
+            while time.monotonic() < deadline:
+                session_id = (await client.post("/api/session/start")).json()["session_id"]
+                events = [
+                    {"type": "message", "role": "agent", "text": "How will you fund your studies?"},
+                    {"type": "message", "role": "student", "text": "My father will sponsor me."},
+                ]
+                response = await client.post(f"/api/session/{session_id}/events", json=events)
+                response.raise_for_status()
+                response = await client.post(f"/api/session/{session_id}/end")
+                response.raise_for_status()
+                requests += 3
+
+        await asyncio.gather(*(student() for _ in range(concurrency)))
+    return requests
+
+
+def _client_process(args) -> int:
+    base_url, deadline, concurrency = args
+    return asyncio.run(_client_loop(base_url, deadline, concurrency))
+
+
+def _wait_ready(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/api/sessions/stats").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def run(workers: int, duration: float, clients: int, concurrency: int) -> float:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            SESSION_STORE="sqlite",
+            SESSION_DB_PATH=os.path.join(tmp, "sessions.db"),
+            ELEVENLABS_API_KEY="",
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server.app:app",
+             "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+            env=env,
+        )
+        try:
+            _wait_ready(base_url)
+            deadline = time.monotonic() + duration
+            with multiprocessing.Pool(clients) as pool:
+                total = sum(pool.map(_client_process, [(base_url, deadline, concurrency)] * clients))
+        finally:
+            server.terminate()
+            server.wait()
+    return total / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=4, help="client processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="students per client")
+    args = parser.parse_args()
+
+    baseline = None
+    workers = 1
+    while workers <= args.max_workers:
+        rps = run(workers, args.duration, args.clients, args.concurrency)
+        baseline = baseline or rps
+        print(f"workers={workers:<3} {rps:10,.0f} req/s  ({rps / baseline:.2f}x)")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Concurrent interview load generator for the session API.
+
+Simulates N students running the full lifecycle at once: start, bursts of
+transcript events, language switches, a live feedback read and end. By
+default the app runs in-process (``server.app:app`` over httpx's ASGI
+transport) against a local stub of the ElevenLabs API; pass --url to drive a
+running server instead. Prints one JSON document with throughput, per-endpoint
+latency percentiles and memory growth; --compare checks it against an earlier
+run and exits non-zero on a regression.
+
+    python -m benchmarks.loadgen [--students 200] [--rounds 3] [--output run.json]
+    python -m benchmarks.loadgen --compare baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.stub_elevenlabs import StubServer
+
+STUDENT_LINES = [
+    "My father will sponsor my studies.",
+    "I want to study computer science.",
+    "Samajh nahi aaya, please repeat.",
+    "I will return to India after my degree.",
+    "Mere papa business karte hain.",
+]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is a high-water mark (KiB on Linux, bytes on macOS).
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class Recorder:
+    """Collects latencies per endpoint template."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+    def summary(self) -> dict:
+        endpoints = {}
+        for name in sorted(self.latencies.keys() | self.errors.keys()):
+            samples = self.latencies.get(name, [])
+            endpoints[name] = {
+                "requests": len(samples),
+                "errors": self.errors.get(name, 0),
+                "p50_ms": round(percentile(samples, 50) * 1000, 3) if samples else None,
+                "p95_ms": round(percentile(samples, 95) * 1000, 3) if samples else None,
+                "p99_ms": round(percentile(samples, 99) * 1000, 3) if samples else None,
+            }
+        return endpoints
+
+
+async def student(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, args):
+    """One interview: start, event bursts with switches, a feedback read, end."""
+    response = await recorder.call(client, "POST /api/session/start", "POST", "/api/session/start")
+    if response is None or response.status_code != 200:
+        return
+    session_id = response.json()["session_id"]
+    base = f"/api/session/{session_id}"
+    for question_id in range(1, args.rounds + 1):
+        events = [{"type": "question", "question_id": question_id}]
+        for _ in range(args.burst):
+            events.append({"type": "message", "role": "agent", "text": "Could you tell me more?"})
+            events.append({"type": "message", "role": "student", "text": rng.choice(STUDENT_LINES)})
+        await recorder.call(client, "POST /api/session/{id}/events", "POST", f"{base}/events", json=events)
+        await recorder.call(
+            client, "POST /api/session/{id}/message", "POST", f"{base}/message",
+            params={"role": "student", "text": rng.choice(STUDENT_LINES)},
+        )
+        if rng.random() < args.switch_rate:
+            await recorder.call(
+                client, "POST /api/session/{id}/switch", "POST", f"{base}/switch",
+                params={"question_id": question_id, "reason": "loadgen"},
+            )
+        await asyncio.sleep(rng.uniform(0, args.think_time))
+    await recorder.call(client, "GET /api/session/{id}/feedback", "GET", f"{base}/feedback")
+    await recorder.call(client, "POST /api/session/{id}/end", "POST", f"{base}/end")
+
+
+async def drive(client: httpx.AsyncClient, args) -> tuple[Recorder, float]:
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    semaphore = asyncio.Semaphore(args.concurrency or args.students)
+
+    async def limited(seed: int):
+        async with semaphore:
+            await student(client, recorder, random.Random(seed), args)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(limited(rng.randrange(1 << 30)) for _ in range(args.students)))
+    return recorder, time.perf_counter() - started
+
+
+async def _run_in_process(args) -> tuple[Recorder, float, dict]:
+    from server.app import app, sessions, signed_url_pool
+
+    await signed_url_pool.refill()
+    gc.collect()
+    tracemalloc.start()
+    rss_before = _rss_bytes()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadgen") as client:
+        recorder, elapsed = await drive(client, args)
+    gc.collect()
+    traced, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = _rss_bytes()
+    memory = {
+        "rss_before_bytes": rss_before,
+        "rss_after_bytes": rss_after,
+        "rss_growth_bytes": rss_after - rss_before,
+        "python_heap_growth_bytes": traced,
+        "python_heap_peak_bytes": traced_peak,
+        "sessions_held": len(sessions),
+    }
+    await signed_url_pool.close()
+    return recorder, elapsed, memory
+
+
+async def _run_remote(args) -> tuple[Recorder, float, dict]:
+    limits = httpx.Limits(max_connections=args.concurrency or args.students)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        recorder, elapsed = await drive(client, args)
+        stats = (await client.get("/api/sessions/stats")).json()
+    return recorder, elapsed, {"server_store": stats}
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    if args.url:
+        recorder, elapsed, memory = asyncio.run(_run_remote(args))
+    else:
+        with StubServer(delay=args.upstream_delay) as stub:
+            os.environ["ELEVENLABS_API_BASE"] = stub.url
+            os.environ.setdefault("ELEVENLABS_API_KEY", "loadgen-key")
+            os.environ.setdefault("ELEVENLABS_AGENT_ID", "loadgen-agent")
+            recorder, elapsed, memory = asyncio.run(_run_in_process(args))
+
+    endpoints = recorder.summary()
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "target": args.url or "in-process",
+        "config": {
+            "students": args.students,
+            "concurrency": args.concurrency or args.students,
+            "rounds": args.rounds,
+            "burst": args.burst,
+            "switch_rate": args.switch_rate,
+            "seed": args.seed,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "throughput": {
+            "requests_per_s": round(total / elapsed, 1),
+            "sessions_per_s": round(args.students / elapsed, 1),
+        },
+        "errors": sum(e["errors"] for e in endpoints.values()),
+        "endpoints": endpoints,
+        "memory": memory,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_ms: float = 2.0) -> list[str]:
+    """Regressions of ``current`` against ``baseline`` beyond ``tolerance`` (0.2 = 20%).
+
+    Latency changes smaller than ``min_delta_ms`` are treated as noise.
+    """
+    problems = []
+    old_rps = baseline["throughput"]["requests_per_s"]
+    new_rps = current["throughput"]["requests_per_s"]
+    if new_rps < old_rps * (1 - tolerance):
+        problems.append(f"throughput {new_rps} req/s < baseline {old_rps} req/s")
+    if current["errors"] > baseline["errors"]:
+        problems.append(f"errors {current['errors']} > baseline {baseline['errors']}")
+    for name, old in baseline["endpoints"].items():
+        new = current["endpoints"].get(name)
+        if not new or old["p95_ms"] is None or new["p95_ms"] is None:
+            continue
+        slower = new["p95_ms"] - old["p95_ms"]
+        if new["p95_ms"] > old["p95_ms"] * (1 + tolerance) and slower > min_delta_ms:
+            problems.append(f"{name} p95 {new['p95_ms']}ms > baseline {old['p95_ms']}ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=0, help="0 = all students at once")
+    parser.add_argument("--rounds", type=int, default=3, help="questions per interview")
+    parser.add_argument("--burst", type=int, default=5, help="agent/student pairs per batch")
+    parser.add_argument("--switch-rate", type=float, default=0.3)
+    parser.add_argument("--think-time", type=float, default=0.0, help="max pause per round (s)")
+    parser.add_argument("--upstream-delay", type=float, default=0.05, help="stub ElevenLabs delay (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="drive a running server instead of the in-process app")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--min-delta-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    result = run(args)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(result, json.load(f), args.tolerance, args.min_delta_ms)
+        for problem in problems:
+            print(f"REGRESSION: {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
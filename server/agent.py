@@ -2,16 +2,31 @@
 
 from __future__ import annotations
 
+import asyncio
+import copy
 import os
 import time
+from array import array
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
+from typing import ClassVar, Literal, get_args
 
+import httpx
 from dotenv import load_dotenv
 
-from server.questions import get_all_questions
+from server.metrics import SIGNED_URL_ERRORS, SIGNED_URL_SECONDS
+from server.questions import get_all_questions, get_question_bank_version, get_question_by_id
 
 load_dotenv()
 
+# Fixed officer lines spoken in every session (pre-synthesized in local mode).
+OFFICER_GREETING = (
+    "Good morning. I am the visa officer conducting your interview today. "
+    "Please answer each question clearly."
+)
+REASK_LINE = "Let me ask that again in English..."
+CLOSING_LINE = "Thank you. That concludes your interview."
+
 SYSTEM_PROMPT = """You are a visa interview officer conducting a mock student visa interview.
 
 BEHAVIOR:
@@ -40,82 +55,489 @@ LANGUAGE SWITCHING RULES:
 """
 
 
+# The only transcript roles and languages; the API rejects anything else.
+Role = Literal["agent", "student"]
+Language = Literal["en", "hi"]
+ROLES: tuple = get_args(Role)
+LANGUAGES: tuple = get_args(Language)
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+_LANGUAGE_CODES = {language: code for code, language in enumerate(LANGUAGES)}
+
+
+class Transcript:
+    """Columnar transcript storage.
+
+    Utterances are kept in parallel arrays instead of one dict per entry: role
+    and language are stored as codes into the fixed ``ROLES`` and ``LANGUAGES``
+    tables and timestamps live in an ``array('d')``. Indexing and iteration still yield the familiar
+    ``{"role", "text", "language", "timestamp"}`` dicts, built on demand.
+    """
+
+    __slots__ = ("_texts", "_roles", "_languages", "_timestamps", "_dropped")
+
+    def __init__(self, entries=()):
+        self._texts: list = []
+        self._roles = array("B")
+        self._languages = array("B")
+        self._timestamps = array("d")
+        self._dropped = 0  # utterances trimmed from the front so far
+        for entry in entries:
+            self.append(entry["role"], entry["text"], entry["language"], entry["timestamp"])
+
+    def append(self, role: str, text: str, language: str, timestamp: float):
+        role_code = _ROLE_CODES.get(role)
+        if role_code is None:
+            raise ValueError(f"Unknown transcript role: {role!r}")
+        language_code = _LANGUAGE_CODES.get(language)
+        if language_code is None:
+            raise ValueError(f"Unknown transcript language: {language!r}")
+        self._texts.append(text)
+        self._roles.append(role_code)
+        self._languages.append(language_code)
+        self._timestamps.append(timestamp)
+
+    def role(self, index: int) -> str:
+        return ROLES[self._roles[index]]
+
+    def text(self, index: int) -> str:
+        return self._texts[index]
+
+    def drop_oldest(self, count: int):
+        """Remove the first ``count`` utterances."""
+        del self._texts[:count]
+        del self._roles[:count]
+        del self._languages[:count]
+        del self._timestamps[:count]
+        self._dropped += count
+
+    def copy(self) -> "Transcript":
+        """Independent copy of the columns (no per-entry dicts are built)."""
+        clone = Transcript()
+        clone._texts = list(self._texts)
+        clone._roles = array("B", self._roles)
+        clone._languages = array("B", self._languages)
+        clone._timestamps = array("d", self._timestamps)
+        clone._dropped = self._dropped
+        return clone
+
+    def _entry(self, index: int) -> dict:
+        return {
+            "role": ROLES[self._roles[index]],
+            "text": self._texts[index],
+            "language": LANGUAGES[self._languages[index]],
+            "timestamp": self._timestamps[index],
+        }
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def iter_live(self):
+        """Iterate the entries present now without copying, staying correct if
+        utterances are appended (not yielded) or trimmed (skipped) meanwhile."""
+        position = self._dropped
+        end = self._dropped + len(self._texts)
+        while position < end:
+            index = position - self._dropped
+            if index < 0:
+                position = self._dropped
+                continue
+            yield self._entry(index)
+            position += 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._entry(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transcript index out of range")
+        return self._entry(index)
+
+    def __iter__(self):
+        return (self._entry(i) for i in range(len(self)))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Transcript):
+            return self.to_list() == other.to_list()
+        if isinstance(other, list):
+            return self.to_list() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Transcript({self.to_list()!r})"
+
+    def to_list(self) -> list:
+        return [self._entry(i) for i in range(len(self))]
+
+
+# Rough per-entry cost beyond the utterance text: the text object header plus
+# one slot in each transcript column. Switches are still stored as dicts.
+TRANSCRIPT_ENTRY_OVERHEAD = 72
+SWITCH_ENTRY_OVERHEAD = 240
+
+# Question ID logged for switches that happen before any question is marked
+# (hosted sessions never mark one); they count towards the session's total
+# but not towards any question's.
+NO_QUESTION = 0
+
+
 @dataclass
 class SessionLog:
     """Tracks a single interview session."""
+    # Set by the app to a SessionJournal to append every change for crash recovery.
+    journal: ClassVar = None
+
     session_id: str
+    # Set when the client identifies the student, so plans can adapt across sessions.
+    student_id: str | None = None
     start_time: float = field(default_factory=time.time)
     end_time: float | None = None
+    # Question IDs the officer has moved on to, in order (see ``mark_question``).
     questions_asked: list = field(default_factory=list)
     language_switches: list = field(default_factory=list)
-    transcript: list = field(default_factory=list)
+    transcript: Transcript = field(default_factory=Transcript)
     student_language_usage: dict = field(default_factory=lambda: {"english": 0, "hindi": 0})
+    # Approximate transcript size; oldest entries are dropped past the budget.
+    transcript_budget_bytes: int | None = None
+    transcript_bytes: int = field(default=0, init=False)
+    # Running aggregates kept as events arrive, so feedback never rescans the
+    # transcript (and stays exact after old utterances are trimmed).
+    role_counts: dict = field(default_factory=dict)
+    switch_counts: dict = field(default_factory=dict)
+    first_switch_at: dict = field(default_factory=dict)
+    current_question_id: int | None = None
+    # Student replies per question while it was current: {question_id: [total, hindi]}.
+    question_responses: dict = field(default_factory=dict)
+    # Questions chosen for the session when it started, in interview order.
+    question_plan: list = field(default_factory=list)
 
-    def add_message(self, role: str, text: str, language: str = "en"):
-        self.transcript.append({
-            "role": role,
-            "text": text,
-            "language": language,
-            "timestamp": time.time(),
-        })
+    def __post_init__(self):
+        if not isinstance(self.transcript, Transcript):
+            self.transcript = Transcript(self.transcript)
+        self.transcript_bytes = sum(
+            len(self.transcript.text(i)) + TRANSCRIPT_ENTRY_OVERHEAD
+            for i in range(len(self.transcript))
+        )
+        if not self.role_counts:
+            for i in range(len(self.transcript)):
+                role = self.transcript.role(i)
+                self.role_counts[role] = self.role_counts.get(role, 0) + 1
+        if not self.switch_counts:
+            for switch in self.language_switches:
+                self._count_switch(switch["question_id"], switch["timestamp"])
+
+    def add_message(self, role: str, text: str, language: str = "en", timestamp: float | None = None):
+        timestamp = time.time() if timestamp is None else timestamp
+        if self.journal is not None:
+            self.journal.message(self.session_id, role, text, language, timestamp)
+        self.transcript.append(role, text, language, timestamp)
+        self.role_counts[role] = self.role_counts.get(role, 0) + 1
+        self.transcript_bytes += len(text) + TRANSCRIPT_ENTRY_OVERHEAD
+        budget = self.transcript_budget_bytes
+        if budget is not None and self.transcript_bytes > budget:
+            self._trim_transcript()
         if role == "student":
             if language == "hi":
                 self.student_language_usage["hindi"] += 1
             else:
                 self.student_language_usage["english"] += 1
+            if self.current_question_id is not None:
+                counts = self.question_responses.setdefault(self.current_question_id, [0, 0])
+                counts[0] += 1
+                counts[1] += language == "hi"
+
+    def _trim_transcript(self):
+        """Drop the oldest entries until the transcript is back under 3/4 of its budget."""
+        target = self.transcript_budget_bytes * 3 // 4
+        drop = 0
+        while drop < len(self.transcript) and self.transcript_bytes > target:
+            self.transcript_bytes -= len(self.transcript.text(drop)) + TRANSCRIPT_ENTRY_OVERHEAD
+            drop += 1
+        self.transcript.drop_oldest(drop)
 
-    def add_language_switch(self, question_id: int, reason: str):
+    def approx_bytes(self) -> int:
+        """Approximate memory held by this session's transcript and switch log."""
+        return self.transcript_bytes + len(self.language_switches) * SWITCH_ENTRY_OVERHEAD
+
+    def add_language_switch(self, question_id: int, reason: str, timestamp: float | None = None):
+        timestamp = time.time() if timestamp is None else timestamp
+        if self.journal is not None:
+            self.journal.switch(self.session_id, question_id, reason, timestamp)
         self.language_switches.append({
             "question_id": question_id,
             "reason": reason,
-            "timestamp": time.time(),
+            "timestamp": timestamp,
         })
+        self._count_switch(question_id, timestamp)
+
+    def _count_switch(self, question_id: int, timestamp: float):
+        if question_id == NO_QUESTION:
+            return
+        if question_id not in self.switch_counts:
+            self.switch_counts[question_id] = 0
+            self.first_switch_at[question_id] = timestamp
+        self.switch_counts[question_id] += 1
+
+    def mark_question(self, question_id: int):
+        """Record that the officer moved on to ``question_id``."""
+        if self.journal is not None:
+            self.journal.question(self.session_id, question_id)
+        self.current_question_id = question_id
+        if question_id not in self.questions_asked:
+            self.questions_asked.append(question_id)
+
+    def add_events(self, events) -> int:
+        """Apply a batch of message/switch/question events in order; returns how many were applied.
+
+        Events may carry a ``timestamp`` (replays do); otherwise they are stamped now.
+        """
+        applied = 0
+        for event in events:
+            if event["type"] == "message":
+                self.add_message(
+                    event["role"], event["text"], event.get("language") or "en", event.get("timestamp")
+                )
+            elif event["type"] == "switch":
+                self.add_language_switch(event["question_id"], event["reason"], event.get("timestamp"))
+            elif event["type"] == "question":
+                self.mark_question(event["question_id"])
+            else:
+                raise ValueError(f"Unknown event type: {event['type']!r}")
+            applied += 1
+        return applied
 
     def end_session(self):
+        """Mark the session ended; later calls keep the first end time."""
+        if self.end_time is not None:
+            return
         self.end_time = time.time()
+        if self.journal is not None:
+            self.journal.end(self.session_id, self.end_time)
+
+    def content_version(self) -> tuple:
+        """Changes whenever anything feedback depends on changes (stable across reloads)."""
+        return (
+            sum(self.role_counts.values()),
+            len(self.language_switches),
+            len(self.questions_asked),
+            self.current_question_id,
+            self.end_time,
+        )
+
+    def snapshot(self) -> "SessionLog":
+        """Copy that can be read from another thread while this session keeps changing."""
+        clone = copy.copy(self)
+        clone.transcript = self.transcript.copy()
+        clone.questions_asked = list(self.questions_asked)
+        clone.language_switches = list(self.language_switches)
+        clone.student_language_usage = dict(self.student_language_usage)
+        clone.role_counts = dict(self.role_counts)
+        clone.switch_counts = dict(self.switch_counts)
+        clone.first_switch_at = dict(self.first_switch_at)
+        clone.question_responses = {qid: list(c) for qid, c in self.question_responses.items()}
+        return clone
 
     def duration_minutes(self) -> float:
         end = self.end_time or time.time()
         return round((end - self.start_time) / 60, 1)
 
+    def to_record(self) -> dict:
+        """Full session state for persistence (see ``from_record``)."""
+        return {
+            "session_id": self.session_id,
+            "student_id": self.student_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "questions_asked": self.questions_asked,
+            "language_switches": self.language_switches,
+            "transcript": self.transcript.to_list(),
+            "student_language_usage": self.student_language_usage,
+            "transcript_budget_bytes": self.transcript_budget_bytes,
+            "role_counts": self.role_counts,
+            "switch_counts": self.switch_counts,
+            "first_switch_at": self.first_switch_at,
+            "current_question_id": self.current_question_id,
+            "question_responses": self.question_responses,
+            "question_plan": self.question_plan,
+        }
+
+    @classmethod
+    def from_record(cls, record: dict) -> "SessionLog":
+        """Rebuild a session from ``to_record`` output."""
+        record = dict(record)
+        # JSON round trips turn the integer question IDs into strings.
+        for key in ("switch_counts", "first_switch_at", "question_responses"):
+            if key in record:
+                record[key] = {int(qid): value for qid, value in record[key].items()}
+        return cls(**record)
+
     def to_dict(self) -> dict:
         return {
             "session_id": self.session_id,
             "duration_minutes": self.duration_minutes(),
+            "question_plan": self.question_plan,
             "questions_asked": self.questions_asked,
             "language_switches": self.language_switches,
-            "transcript": self.transcript,
+            "transcript": self.transcript.to_list(),
             "student_language_usage": self.student_language_usage,
         }
 
 
-def build_system_prompt() -> str:
-    """Build the system prompt with all questions injected."""
-    questions = get_all_questions()
-    questions_text = ""
+def build_system_prompt(plan: list[int] | None = None) -> str:
+    """Build the system prompt with all questions injected, or only ``plan``'s, in its order."""
+    if plan is None:
+        questions = get_all_questions()
+    else:
+        questions = [q for q in map(get_question_by_id, plan) if q is not None]
+    lines = []
     for q in questions:
-        questions_text += f"\n{q['id']}. {q['question_en']}"
-        questions_text += f"\n   Hindi hint: {q['hint_hi']}"
+        lines.append(f"\n{q['id']}. {q['question_en']}")
+        lines.append(f"\n   Hindi hint: {q['hint_hi']}")
         for fu in q["follow_ups"]:
-            questions_text += f"\n   - Follow-up: {fu}"
-        questions_text += "\n"
-    return SYSTEM_PROMPT.format(questions=questions_text)
+            lines.append(f"\n   - Follow-up: {fu}")
+        lines.append("\n")
+    return SYSTEM_PROMPT.format(questions="".join(lines))
 
 
-def get_signed_url() -> str:
-    """Get a signed URL for a conversational AI session via REST API."""
-    import httpx
+# Rendered prompts keyed by question bank content hash. A few old versions are
+# kept so clients holding a recent version can still fetch it after a change.
+PROMPT_CACHE_SIZE = 8
+_prompt_cache: OrderedDict = OrderedDict()
+
+
+def get_prompt_version() -> str:
+    """Return the current prompt version, rendering the prompt on first use."""
+    version = get_question_bank_version()
+    if version not in _prompt_cache:
+        _prompt_cache[version] = build_system_prompt()
+        while len(_prompt_cache) > PROMPT_CACHE_SIZE:
+            _prompt_cache.popitem(last=False)
+    return version
+
+
+def get_cached_prompt(version: str) -> str | None:
+    """Return the rendered prompt for ``version``, or None if it is not cached."""
+    return _prompt_cache.get(version)
+
+
+ELEVENLABS_API_BASE = os.getenv("ELEVENLABS_API_BASE", "https://api.elevenlabs.io")
+
+# Upstream calls sit on the session-start path, so fail fast rather than hang.
+UPSTREAM_TIMEOUT = httpx.Timeout(5.0, connect=2.0, pool=2.0)
+UPSTREAM_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
 
+_http_client: httpx.AsyncClient | None = None
+_http_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared upstream client, creating it for the running event loop."""
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            base_url=ELEVENLABS_API_BASE,
+            timeout=UPSTREAM_TIMEOUT,
+            limits=UPSTREAM_LIMITS,
+        )
+        _http_client_loop = loop
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared upstream client (called on app shutdown)."""
+    global _http_client, _http_client_loop
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
+    _http_client_loop = None
+
+
+async def get_signed_url() -> str:
+    """Get a signed URL for a conversational AI session via REST API."""
     api_key = os.getenv("ELEVENLABS_API_KEY")
     agent_id = os.getenv("ELEVENLABS_AGENT_ID")
+    if not api_key or not agent_id:
+        SIGNED_URL_ERRORS.inc("config")
     if not api_key:
         raise ValueError("ELEVENLABS_API_KEY not set in environment")
     if not agent_id:
         raise ValueError("ELEVENLABS_AGENT_ID not set in environment")
 
-    response = httpx.get(
-        f"https://api.elevenlabs.io/v1/convai/conversation/get-signed-url?agent_id={agent_id}",
-        headers={"xi-api-key": api_key},
-    )
-    response.raise_for_status()
+    started = time.perf_counter()
+    try:
+        response = await get_http_client().get(
+            "/v1/convai/conversation/get-signed-url",
+            params={"agent_id": agent_id},
+            headers={"xi-api-key": api_key},
+        )
+        response.raise_for_status()
+    except httpx.TimeoutException:
+        SIGNED_URL_ERRORS.inc("timeout")
+        raise
+    except httpx.HTTPStatusError as exc:
+        SIGNED_URL_ERRORS.inc(f"status_{exc.response.status_code}")
+        raise
+    except httpx.TransportError:
+        SIGNED_URL_ERRORS.inc("transport")
+        raise
+    finally:
+        SIGNED_URL_SECONDS.observe(time.perf_counter() - started)
     return response.json()["signed_url"]
+
+
+class SignedUrlPool:
+    """Small pool of pre-fetched signed URLs so session start skips the upstream call.
+
+    Signed URLs are single-use and expire upstream after 15 minutes, so each URL
+    is handed out once and dropped once it is older than ``max_age`` seconds.
+    """
+
+    def __init__(self, size: int = 4, max_age: float = 600.0, fetch=get_signed_url):
+        self.size = size
+        self.max_age = max_age
+        self._fetch = fetch
+        self._urls: deque = deque()
+        self._refill_task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        self._evict_expired()
+        return len(self._urls)
+
+    def _evict_expired(self):
+        cutoff = time.monotonic() - self.max_age
+        while self._urls and self._urls[0][0] < cutoff:
+            self._urls.popleft()
+
+    def pop(self) -> str | None:
+        """Take a fresh signed URL from the pool, or None if it is empty."""
+        self._evict_expired()
+        if not self._urls:
+            return None
+        return self._urls.popleft()[1]
+
+    def schedule_refill(self):
+        """Top the pool back up in the background (no-op without an API key)."""
+        if self.size <= 0 or not os.getenv("ELEVENLABS_API_KEY"):
+            return
+        if self._refill_task is not None and not self._refill_task.done():
+            return
+        self._refill_task = asyncio.get_running_loop().create_task(self.refill())
+
+    async def refill(self):
+        """Fetch enough signed URLs to bring the pool back to ``size``."""
+        self._evict_expired()
+        missing = self.size - len(self._urls)
+        if missing <= 0:
+            return
+        results = await asyncio.gather(
+            *(self._fetch() for _ in range(missing)), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, str):
+                self._urls.append((time.monotonic(), result))
+
+    async def close(self):
+        if self._refill_task is not None and not self._refill_task.done():
+            self._refill_task.cancel()
+        self._urls.clear()
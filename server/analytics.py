@@ -0,0 +1,392 @@
+"""Cohort analytics across finished sessions.
+
+Each session adds one row to a session table and one row per question it
+touched to a question table when it ends. Both tables are NumPy columns
+grown by doubling, ordered by end time, so a time window is a pair of binary
+searches and every rollup is a handful of ``np.bincount`` calls over dense
+question and category codes — no per-session Python work at query time.
+
+Whole days are also pre-aggregated into a (day, group, metric) cube, so
+a window spanning a year sums a few hundred small rows and only reads raw
+rows for the partial days at its ends.
+
+The tables live in the worker process. With ANALYTICS_PATH set they are
+loaded at startup and written back on shutdown as a ``.npz`` snapshot.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from server.agent import SessionLog
+from server.feedback import PROFICIENCY_LEVELS, proficiency_level
+from server.questions import get_question_by_id
+
+logger = logging.getLogger(__name__)
+
+SESSION_COLUMNS = {
+    "ended_at": np.float64,
+    "duration": np.float32,
+    "student": np.int32,
+    "hindi": np.int32,
+    "switches": np.int32,
+    "proficiency": np.int8,
+}
+QUESTION_COLUMNS = {
+    "ended_at": np.float64,
+    "question": np.int32,
+    "category": np.int16,
+    "duration": np.float32,
+    "switches": np.int32,
+    "student": np.int32,
+    "hindi": np.int32,
+    "proficiency": np.int8,
+}
+UNKNOWN_CATEGORY = "unknown"
+
+
+class ColumnTable:
+    """Append-only set of equally long NumPy columns."""
+
+    def __init__(self, columns: dict, capacity: int = 1024):
+        self._columns = {name: np.zeros(capacity, dtype) for name, dtype in columns.items()}
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, **values):
+        if self.size == len(self._columns["ended_at"]):
+            self._grow(self.size * 2)
+        for name, column in self._columns.items():
+            column[self.size] = values[name]
+        self.size += 1
+
+    def extend(self, **columns):
+        count = len(columns["ended_at"])
+        if self.size + count > len(self._columns["ended_at"]):
+            self._grow(max(self.size * 2, self.size + count))
+        for name, column in self._columns.items():
+            column[self.size:self.size + count] = columns[name]
+        self.size += count
+
+    def _grow(self, capacity: int):
+        for name, column in self._columns.items():
+            grown = np.zeros(capacity, column.dtype)
+            grown[:self.size] = column[:self.size]
+            self._columns[name] = grown
+
+    def column(self, name: str, lo: int = 0, hi: int | None = None) -> np.ndarray:
+        return self._columns[name][lo:self.size if hi is None else hi]
+
+    def window(self, since: float | None, until: float | None) -> tuple[int, int]:
+        """Row range whose ``ended_at`` falls in [since, until)."""
+        ended = self.column("ended_at")
+        lo = 0 if since is None else int(np.searchsorted(ended, since, "left"))
+        hi = self.size if until is None else int(np.searchsorted(ended, until, "left"))
+        return lo, hi
+
+
+DAY = 86400
+# Aggregates kept per group: counts and sums, then one count per proficiency rating.
+METRICS = ("sessions", "switched", "switches", "student", "hindi", "duration")
+WIDTH = len(METRICS) + len(PROFICIENCY_LEVELS)
+
+
+def aggregate(codes: np.ndarray, groups: int, switches, student, hindi, duration, proficiency):
+    """(groups, WIDTH) sums of each metric per group code."""
+    out = np.zeros((groups, WIDTH))
+    if groups == 0 or not len(codes):
+        return out
+    codes = codes.astype(np.intp, copy=False)
+    out[:, 0] = np.bincount(codes, minlength=groups)
+    out[:, 1] = np.bincount(codes, weights=switches > 0, minlength=groups)
+    for i, column in enumerate((switches, student, hindi, duration), start=2):
+        out[:, i] = np.bincount(codes, weights=column, minlength=groups)
+    levels = codes * len(PROFICIENCY_LEVELS) + proficiency.astype(np.intp)
+    counts = np.bincount(levels, minlength=groups * len(PROFICIENCY_LEVELS))
+    out[:, len(METRICS):] = counts.reshape(groups, len(PROFICIENCY_LEVELS))
+    return out
+
+
+class DailyCube:
+    """Per-day, per-group metric sums, so whole days in a window cost one slice sum."""
+
+    def __init__(self):
+        self._data = np.zeros((16, 4, WIDTH))
+        self.day0: int | None = None
+
+    def _reserve(self, day: int, group: int):
+        if self.day0 is None:
+            self.day0 = day
+        days, groups, _ = self._data.shape
+        need_days, need_groups = day - self.day0 + 1, group + 1
+        if need_days > days or need_groups > groups:
+            grown = np.zeros((max(days * 2, need_days), max(groups * 2, need_groups), WIDTH))
+            grown[:days, :groups] = self._data
+            self._data = grown
+
+    def add(self, day: int, group: int, vector: np.ndarray):
+        self._reserve(day, group)
+        self._data[day - self.day0, group] += vector
+
+    def sum(self, day_lo: int, day_hi: int, groups: int) -> np.ndarray:
+        """(groups, WIDTH) totals for days in [day_lo, day_hi)."""
+        out = np.zeros((groups, WIDTH))
+        if self.day0 is None:
+            return out
+        lo = max(day_lo - self.day0, 0)
+        hi = min(day_hi - self.day0, self._data.shape[0])
+        if lo < hi:
+            width = min(groups, self._data.shape[1])
+            out[:width] = self._data[lo:hi, :width].sum(axis=0)
+        return out
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> list:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = numerator / denominator
+    return [None if np.isnan(v) else round(float(v), 3) for v in values]
+
+
+class AnalyticsStore:
+    """Columnar per-session and per-question aggregates, updated at session end."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._reset()
+        if path and os.path.exists(path):
+            try:
+                self.load(path)
+            except (OSError, ValueError, KeyError) as exc:
+                logger.warning("Starting with empty analytics; could not load %s: %s", path, exc)
+
+    def _reset(self):
+        self.sessions = ColumnTable(SESSION_COLUMNS)
+        self.questions = ColumnTable(QUESTION_COLUMNS)
+        self._question_ids: list[int] = []
+        self._question_codes: dict[int, int] = {}
+        self._categories: list[str] = []
+        self._category_codes: dict[str, int] = {}
+        self._overall_days = DailyCube()
+        self._question_days = DailyCube()
+        self._category_days = DailyCube()
+        self._last_ended_at = 0.0
+
+    def _question_code(self, question_id: int) -> int:
+        code = self._question_codes.get(question_id)
+        if code is None:
+            code = self._question_codes[question_id] = len(self._question_ids)
+            self._question_ids.append(question_id)
+        return code
+
+    def _category_code(self, category: str) -> int:
+        code = self._category_codes.get(category)
+        if code is None:
+            code = self._category_codes[category] = len(self._categories)
+            self._categories.append(category)
+        return code
+
+    def record(self, session: SessionLog):
+        """Add a finished session."""
+        student = session.role_counts.get("student", 0)
+        english = session.student_language_usage.get("english", 0)
+        per_question = {}
+        for question_id in session.questions_asked:
+            per_question[question_id] = [0, 0, 0]
+        for question_id, switches in session.switch_counts.items():
+            per_question.setdefault(question_id, [0, 0, 0])[0] = switches
+        for question_id, (replies, hindi) in session.question_responses.items():
+            counts = per_question.setdefault(question_id, [0, 0, 0])
+            counts[1], counts[2] = replies, hindi
+        ended_at = session.end_time or time.time()
+        self.add(
+            ended_at=ended_at,
+            duration=ended_at - session.start_time,
+            student=student,
+            hindi=session.student_language_usage.get("hindi", 0),
+            switches=len(session.language_switches),
+            proficiency=proficiency_level(english / student if student else 0.0),
+            questions=[(qid, *counts) for qid, counts in per_question.items()],
+        )
+
+    def add(self, ended_at: float, duration: float, student: int, hindi: int,
+            switches: int, proficiency: int, questions: list[tuple]):
+        """Append one session; ``questions`` holds (question_id, switches, replies, hindi_replies)."""
+        # Rows stay sorted by end time for the window search; a clock step
+        # backwards just files the session with the previous one.
+        ended_at = max(ended_at, self._last_ended_at)
+        self._last_ended_at = ended_at
+        day = int(ended_at // DAY)
+        minutes = duration / 60
+        self.sessions.append(
+            ended_at=ended_at, duration=minutes, student=student, hindi=hindi,
+            switches=switches, proficiency=proficiency,
+        )
+        self._overall_days.add(day, 0, self._vector(switches, student, hindi, minutes, proficiency))
+        for question_id, q_switches, replies, q_hindi in questions:
+            question = get_question_by_id(question_id)
+            category = self._category_code(question["category"] if question else UNKNOWN_CATEGORY)
+            code = self._question_code(question_id)
+            self.questions.append(
+                ended_at=ended_at, question=code, category=category, duration=minutes,
+                switches=q_switches, student=replies, hindi=q_hindi, proficiency=proficiency,
+            )
+            vector = self._vector(q_switches, replies, q_hindi, minutes, proficiency)
+            self._question_days.add(day, code, vector)
+            self._category_days.add(day, category, vector)
+
+    @staticmethod
+    def _vector(switches, student, hindi, minutes, proficiency) -> np.ndarray:
+        vector = np.zeros(WIDTH)
+        vector[:len(METRICS)] = (1, switches > 0, switches, student, hindi, minutes)
+        vector[len(METRICS) + proficiency] = 1
+        return vector
+
+    def _totals(self, table: ColumnTable, cube: DailyCube, code_column: str | None,
+                groups: int, since: float | None, until: float | None) -> np.ndarray:
+        """(groups, WIDTH) sums for rows ended in [since, until): whole days from the
+        cube, the partial days at either end from the raw rows."""
+        first_full = cube.day0 if since is None else -int(-since // DAY)
+        end_full = (int(self._last_ended_at // DAY) + 1) if until is None else int(until // DAY)
+        if cube.day0 is None or first_full >= end_full:
+            edges = [(since, until)]
+            totals = np.zeros((groups, WIDTH))
+        else:
+            edges = [(since, first_full * DAY), (end_full * DAY, until)]
+            totals = cube.sum(first_full, end_full, groups)
+        for lo_time, hi_time in edges:
+            if lo_time is not None and hi_time is not None and lo_time >= hi_time:
+                continue
+            lo, hi = table.window(lo_time, hi_time)
+            if lo == hi:
+                continue
+            codes = (
+                table.column(code_column, lo, hi) if code_column
+                else np.zeros(hi - lo, dtype=np.intp)
+            )
+            totals += aggregate(
+                codes, groups,
+                table.column("switches", lo, hi), table.column("student", lo, hi),
+                table.column("hindi", lo, hi), table.column("duration", lo, hi),
+                table.column("proficiency", lo, hi),
+            )
+        return totals
+
+    @staticmethod
+    def _summary(totals: np.ndarray) -> dict:
+        sessions = totals[:, 0]
+        return {
+            "sessions": sessions.astype(np.int64).tolist(),
+            "switch_rate": _ratio(totals[:, 1], sessions),
+            "switches": totals[:, 2].astype(np.int64).tolist(),
+            "hindi_response_ratio": _ratio(totals[:, 4], totals[:, 3]),
+            "avg_duration_minutes": _ratio(totals[:, 5], sessions),
+            "proficiency": totals[:, len(METRICS):].astype(np.int64).tolist(),
+        }
+
+    @staticmethod
+    def _rows(key: str, labels: list, summary: dict) -> list[dict]:
+        rows = []
+        for i, label in enumerate(labels):
+            if not summary["sessions"][i]:
+                continue
+            rows.append({
+                key: label,
+                "sessions": summary["sessions"][i],
+                "switch_rate": summary["switch_rate"][i],
+                "switches": summary["switches"][i],
+                "hindi_response_ratio": summary["hindi_response_ratio"][i],
+                "avg_duration_minutes": summary["avg_duration_minutes"][i],
+                "proficiency": dict(zip(PROFICIENCY_LEVELS, summary["proficiency"][i])),
+            })
+        return rows
+
+    def rollup(self, since: float | None = None, until: float | None = None) -> dict:
+        """Per-question, per-category and overall aggregates for sessions ended in [since, until)."""
+        overall = self._summary(
+            self._totals(self.sessions, self._overall_days, None, 1, since, until)
+        )
+        questions = self._rows("question_id", self._question_ids, self._summary(self._totals(
+            self.questions, self._question_days, "question", len(self._question_ids), since, until,
+        )))
+        for row in questions:
+            question = get_question_by_id(row["question_id"])
+            row["category"] = question["category"] if question else UNKNOWN_CATEGORY
+        questions.sort(key=lambda row: row["question_id"])
+        categories = self._rows("category", self._categories, self._summary(self._totals(
+            self.questions, self._category_days, "category", len(self._categories), since, until,
+        )))
+        return {
+            "window": {"since": since, "until": until},
+            "overall": {
+                "sessions": overall["sessions"][0],
+                "avg_duration_minutes": overall["avg_duration_minutes"][0],
+                "switch_rate": overall["switch_rate"][0],
+                "hindi_response_ratio": overall["hindi_response_ratio"][0],
+                "proficiency": dict(zip(PROFICIENCY_LEVELS, overall["proficiency"][0])),
+            },
+            "questions": questions,
+            "categories": categories,
+        }
+
+    def save(self, path: str | None = None):
+        """Write a snapshot (atomically replacing the previous one)."""
+        path = path or self.path
+        if not path:
+            return
+        arrays = {f"s_{name}": self.sessions.column(name) for name in SESSION_COLUMNS}
+        arrays.update({f"q_{name}": self.questions.column(name) for name in QUESTION_COLUMNS})
+        arrays["meta"] = np.array(json.dumps({
+            "question_ids": self._question_ids, "categories": self._categories,
+        }))
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    def load(self, path: str):
+        """Replace the contents with a snapshot and rebuild the daily aggregates."""
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            sessions = {name: data[f"s_{name}"] for name in SESSION_COLUMNS}
+            questions = {name: data[f"q_{name}"] for name in QUESTION_COLUMNS}
+        self._reset()
+        self.sessions.extend(**sessions)
+        self.questions.extend(**questions)
+        self._question_ids = meta["question_ids"]
+        self._question_codes = {qid: i for i, qid in enumerate(self._question_ids)}
+        self._categories = meta["categories"]
+        self._category_codes = {name: i for i, name in enumerate(self._categories)}
+        if len(self.sessions):
+            self._last_ended_at = float(self.sessions.column("ended_at")[-1])
+            self._rebuild(self._overall_days, self.sessions, None, 1)
+            self._rebuild(self._question_days, self.questions, "question", len(self._question_ids))
+            self._rebuild(self._category_days, self.questions, "category", len(self._categories))
+
+    @staticmethod
+    def _rebuild(cube: DailyCube, table: ColumnTable, code_column: str | None, groups: int):
+        if not len(table) or not groups:
+            return
+        days = (table.column("ended_at") // DAY).astype(np.intp)
+        day0 = int(days[0])
+        codes = table.column(code_column) if code_column else np.zeros(len(table), np.intp)
+        cube.day0 = day0
+        cube._reserve(int(days[-1]), groups - 1)
+        span = int(days[-1]) - day0 + 1
+        flat = aggregate(
+            (days - day0) * groups + codes.astype(np.intp), span * groups,
+            table.column("switches"), table.column("student"), table.column("hindi"),
+            table.column("duration"), table.column("proficiency"),
+        )
+        cube._data[:span, :groups] = flat.reshape(span, groups, WIDTH)
+
+
+def create_analytics_store() -> AnalyticsStore:
+    """Build the analytics store, restoring the ANALYTICS_PATH snapshot if there is one."""
+    return AnalyticsStore(os.getenv("ANALYTICS_PATH") or None)
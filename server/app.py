@@ -1,33 +1,267 @@
 """FastAPI server for the Visa Interview Coach."""
 
+import asyncio
+import json
+import logging
 import os
+import time
 import uuid
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from typing import Annotated, Literal, Union
+
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 
+from server import metrics
 from server.agent import (
+    OFFICER_GREETING,
+    Language,
+    Role,
     SessionLog,
-    get_signed_url,
+    SignedUrlPool,
     build_system_prompt,
+    close_http_client,
+    get_signed_url,
+    get_cached_prompt,
+    get_prompt_version,
 )
-from server.feedback import generate_feedback
+from server.analytics import create_analytics_store
+from server.detector import NO_QUESTION, annotate_events, annotate_message, detect
+from server.dialogue import InterviewDialogue, Turn
+from server.export import EXPORT_PAGE_LIMIT, ndjson_chunks, page_records, session_records
+from server.feedback import FeedbackService
+from server.journal import create_journal
+from server.limits import RateLimitMiddleware, create_limiter
+from server.recording import create_audio_recorder, parse_range
+from server.scheduler import create_scheduler
+from server.scoring import match_question
+from server.store import create_session_store
+from server.stt import SpeechStream, create_recognizer, get_executor
+from server.tts import SpeechService
+from server.vad import SILENCE, create_vad
 
 load_dotenv()
 
-app = FastAPI(title="Visa Interview Coach")
+logger = logging.getLogger(__name__)
+
+# "elevenlabs" streams audio through the hosted agent; "local" uses /ws/audio.
+VOICE_MODE = os.getenv("VOICE_MODE", "elevenlabs")
+# Send the planned prompt as a conversation override. The hosted agent must allow
+# prompt overrides in its security settings, or ElevenLabs refuses the conversation.
+PROMPT_OVERRIDE = os.getenv("ELEVENLABS_PROMPT_OVERRIDE", "").lower() in ("1", "true", "yes", "on")
+
+speech = SpeechService()
+
+signed_url_pool = SignedUrlPool(
+    size=int(os.getenv("SIGNED_URL_POOL_SIZE", "4")),
+    max_age=float(os.getenv("SIGNED_URL_MAX_AGE", "600")),
+)
+
+
+def _log_prewarm_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Prewarming the speech cache failed: %r", task.exception())
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if journal is not None:
+        for session in journal.recover():
+            if sessions.get(session.session_id) is None:
+                await _put(session)
+                limiter.started(session.session_id)
+        SessionLog.journal = journal
+    signed_url_pool.schedule_refill()
+    prewarm = None
+    if VOICE_MODE == "local":
+        prewarm = asyncio.create_task(speech.prewarm())
+        prewarm.add_done_callback(_log_prewarm_failure)
+    app.state.prewarm = prewarm
+    yield
+    if prewarm is not None:
+        prewarm.cancel()
+        await asyncio.gather(prewarm, return_exceptions=True)
+    await asyncio.gather(*_finishing, return_exceptions=True)
+    metrics.profiler.disable()
+    await signed_url_pool.close()
+    await close_http_client()
+    if journal is not None:
+        SessionLog.journal = None
+        journal.close()
+    feedback_service.close()
+    if recorder is not None:
+        recorder.close()
+    sessions.close()
+    analytics.save()
+    scheduler.save()
+
+
+app = FastAPI(title="Visa Interview Coach", lifespan=lifespan)
+
+limiter = create_limiter()
+# Innermost, so rejections still get CORS headers and show up in metrics.
+app.add_middleware(RateLimitMiddleware, limiter=limiter)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
+
+sessions = create_session_store()
+analytics = create_analytics_store()
+scheduler = create_scheduler()
+feedback_service = FeedbackService()
+journal = create_journal()
+recorder = create_audio_recorder()
+metrics.SESSIONS_STORED.set_function(lambda: len(sessions))
+# Read from the limiter's activity tracking, so abandoned sessions leave the
+# gauge once idle and an /end served by another worker cannot push it below 0.
+metrics.SESSIONS_ACTIVE.set_function(lambda: limiter.active.count(limiter.clock()))
+
+# Shared secret for the /debug endpoints; they are disabled when unset.
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")
+
+
+class MessageEvent(BaseModel):
+    type: Literal["message"]
+    role: Role
+    text: str
+    # Detected on the server for student messages when omitted.
+    language: Language | None = None
+
+
+class SwitchEvent(BaseModel):
+    type: Literal["switch"]
+    question_id: int
+    reason: str
+
+
+class QuestionEvent(BaseModel):
+    type: Literal["question"]
+    question_id: int
+
+
+class ModeEvent(BaseModel):
+    type: Literal["mode"]
+    mode: str
+
+
+class EndEvent(BaseModel):
+    type: Literal["end"]
+
+
+SessionEvent = Annotated[
+    Union[MessageEvent, SwitchEvent, QuestionEvent], Field(discriminator="type")
+]
+_event_adapter = TypeAdapter(SessionEvent)
+
+ChannelEvent = Annotated[
+    Union[MessageEvent, SwitchEvent, QuestionEvent, ModeEvent, EndEvent],
+    Field(discriminator="type"),
+]
+_channel_adapter = TypeAdapter(Union[ChannelEvent, list[ChannelEvent]])
+
+# Minimum gap between feedback pushes on the session WebSocket. Updates that
+# arrive meanwhile are coalesced, so a slow client only ever gets the latest.
+WS_FEEDBACK_INTERVAL = float(os.getenv("WS_FEEDBACK_INTERVAL", "0.5"))
+WS_MAX_EVENTS_PER_FRAME = 256
+
+# Apply streamed NDJSON events to the session in chunks of this many lines.
+STREAM_APPLY_BATCH = 64
+
+
+# Finishing work of ended sessions, kept so shutdown can wait for it.
+_finishing: set[asyncio.Task] = set()
+
+
+async def _end(session: SessionLog) -> dict:
+    """End a session and return its feedback.
+
+    Safe to repeat: only the first call records the end time, metrics,
+    analytics and scheduler stats; every call gets the same memoized report.
+    The first call's recording runs in its own task, so a client that
+    disconnects mid-request cannot cancel it.
+    """
+    if session.end_time is not None:
+        return await feedback_service.get(session)
+    session.end_session()
+    limiter.ended(session.session_id)
+    metrics.TRANSCRIPT_MESSAGES.observe(len(session.transcript))
+    metrics.TRANSCRIPT_BYTES.observe(session.approx_bytes())
+    task = asyncio.ensure_future(_finish(session))
+    _finishing.add(task)
+    task.add_done_callback(_finishing.discard)
+    return await asyncio.shield(task)
+
 
-# In-memory session store (MVP — no database needed)
-sessions: dict[str, SessionLog] = {}
+async def _finish(session: SessionLog) -> dict:
+    await _save(session)
+    feedback = await feedback_service.get(session)
+    analytics.record(session)
+    if session.student_id:
+        answers = feedback.get("answer_quality", {}).get("answers", ())
+        scheduler.record(session.student_id, session, answers)
+    return feedback
+
+
+async def _put(session: SessionLog):
+    saved = sessions.put(session)
+    if saved is not None:
+        await asyncio.wrap_future(saved)
+
+
+async def _save(session: SessionLog):
+    """Persist a changed session; shared stores return once other workers can see it."""
+    saved = sessions.save(session)
+    if saved is not None:
+        await asyncio.wrap_future(saved)
+
+
+def _annotate(session: SessionLog, events):
+    """``annotate_events``, plus a question event before each officer line that asks a
+    new bank question.
+
+    Hosted clients never send question events, so this is what gives their
+    language switches a question id.
+    """
+    for event in events:
+        if event["type"] == "message" and event["role"] == "agent":
+            asked = match_question(event["text"])
+            if asked is not None and asked[0] != session.current_question_id:
+                yield {"type": "question", "question_id": asked[0]}
+        yield from annotate_events(session, (event,))
+
+
+def _get_session_or_404(session_id: str) -> SessionLog:
+    session = sessions.get(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+def _check_open(session: SessionLog):
+    """409 for changes to an ended session: its report, analytics and export are final."""
+    if session.end_time is not None:
+        raise HTTPException(status_code=409, detail="Session has ended")
+
+
+def _get_open_session(session_id: str) -> SessionLog:
+    session = _get_session_or_404(session_id)
+    _check_open(session)
+    return session
 
 
 @app.get("/")
@@ -36,67 +270,543 @@ async def serve_ui():
     return FileResponse("web/index.html")
 
 
+# Opaque student identifiers, e.g. a UUID the web client keeps in localStorage.
+StudentId = Annotated[str, Query(pattern=r"^[A-Za-z0-9_-]{1,64}$")]
+
+
 @app.post("/api/session/start")
-async def start_session():
-    """Start a new interview session. Returns agent_id (and signed_url if available)."""
+async def start_session(request: Request, student_id: StudentId | None = None):
+    """Start a new interview session. Returns agent_id (and signed_url if available).
+
+    The session's question plan is weighted toward the weak areas of
+    ``student_id`` when it is given. With ``prompt_override`` set, the client
+    gives the hosted agent the plan through its prompt, rendered by
+    ``/api/prompt/{prompt_version}?plan=...``; otherwise the agent keeps the
+    prompt configured in the ElevenLabs dashboard.
+    """
     session_id = str(uuid.uuid4())[:8]
     agent_id = os.getenv("ELEVENLABS_AGENT_ID", "")
 
-    # Try signed URL for private agents; fall back to public agent_id
-    signed_url = None
-    try:
-        signed_url = get_signed_url()
-    except Exception:
-        pass
+    # Try signed URL for private agents; fall back to public agent_id.
+    # A pre-fetched URL avoids waiting on the upstream round trip.
+    signed_url = signed_url_pool.pop()
+    source = "pool"
+    if signed_url is None:
+        source = "upstream"
+        try:
+            signed_url = await get_signed_url()
+        except Exception:
+            source = "fallback"
+    signed_url_pool.schedule_refill()
+    metrics.SIGNED_URL_SOURCE.inc(source)
 
-    session = SessionLog(session_id=session_id)
-    sessions[session_id] = session
+    plan = scheduler.plan(student_id)
+    session = SessionLog(session_id=session_id, student_id=student_id, question_plan=plan)
+    await _put(session)
+    limiter.started(session_id, request.scope)  # takes over the slot reserved on admission
+    if journal is not None:
+        journal.start(session)
 
     return {
         "session_id": session_id,
+        "voice_mode": VOICE_MODE,
         "agent_id": agent_id,
         "signed_url": signed_url,
-        "system_prompt": build_system_prompt(),
+        "prompt_version": get_prompt_version(),
+        "question_plan": plan,
+        "prompt_override": PROMPT_OVERRIDE,
+    }
+
+
+@app.get("/api/prompt/{version}")
+async def get_prompt(version: str, request: Request, plan: Annotated[list[int] | None, Query()] = None):
+    """Return the rendered system prompt for a version (immutable, cacheable).
+
+    With ``plan`` (repeated question IDs, as in a session's ``question_plan``)
+    the prompt lists only those questions, in that order; only the current
+    version can be rendered that way.
+    """
+    if plan:
+        prompt = build_system_prompt(plan) if version == get_prompt_version() else None
+    else:
+        prompt = get_cached_prompt(version)
+    if prompt is None:
+        raise HTTPException(status_code=404, detail="Prompt version not found")
+    tag = f"{version}-{'.'.join(map(str, plan))}" if plan else version
+    headers = {
+        "ETag": f'"{tag}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
     }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return PlainTextResponse(prompt, headers=headers)
 
 
 @app.post("/api/session/{session_id}/message")
-async def log_message(session_id: str, role: str, text: str, language: str = "en"):
+async def log_message(session_id: str, role: Role, text: str, language: Language | None = None):
     """Log a message from the conversation transcript."""
-    session = sessions.get(session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    session.add_message(role, text, language)
+    session = _get_open_session(session_id)
+    event = {"type": "message", "role": role, "text": text, "language": language}
+    session.add_events(_annotate(session, [event]))
+    await _save(session)
     return {"status": "ok"}
 
 
 @app.post("/api/session/{session_id}/switch")
 async def log_language_switch(session_id: str, question_id: int, reason: str):
     """Log a language switch event."""
-    session = sessions.get(session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
+    session = _get_open_session(session_id)
     session.add_language_switch(question_id, reason)
+    await _save(session)
     return {"status": "ok"}
 
 
+@app.post("/api/session/{session_id}/events")
+async def log_events(session_id: str, events: list[SessionEvent]):
+    """Log a batch of transcript messages and language switches in one request."""
+    session = _get_open_session(session_id)
+    applied = session.add_events(_annotate(session, (e.model_dump() for e in events)))
+    await _save(session)
+    return {"status": "ok", "applied": applied}
+
+
+@app.post("/api/session/{session_id}/events/stream")
+async def stream_events(session_id: str, request: Request):
+    """Log events sent as NDJSON; the client may keep the body open for the whole interview."""
+    session = _get_open_session(session_id)
+    applied = 0
+    line_no = 0
+    pending: list[dict] = []
+    buffer = b""
+
+    def parse(line: bytes):
+        try:
+            pending.append(_event_adapter.validate_json(line).model_dump())
+        except ValidationError as exc:
+            raise HTTPException(
+                status_code=422,
+                detail={"line": line_no, "applied": applied, "errors": json.loads(exc.json())},
+            )
+
+    def apply() -> int:
+        _check_open(session)  # the session may be ended by another request mid-stream
+        count = session.add_events(_annotate(session, pending))
+        pending.clear()
+        return count
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                parse(line)
+            if len(pending) >= STREAM_APPLY_BATCH:
+                applied += apply()
+        if pending:
+            applied += apply()
+        if lines:
+            await _save(session)
+    if buffer.strip():
+        line_no += 1
+        parse(buffer)
+        applied += apply()
+        await _save(session)
+    return {"status": "ok", "applied": applied}
+
+
 @app.post("/api/session/{session_id}/end")
 async def end_session(session_id: str):
     """End a session and return feedback summary."""
+    session = _get_session_or_404(session_id)
+    return await _end(session)
+
+
+@app.get("/api/session/{session_id}/feedback")
+async def get_live_feedback(session_id: str):
+    """Current feedback for a session that may still be in progress."""
+    session = _get_session_or_404(session_id)
+    return await feedback_service.get(session)
+
+
+@app.websocket("/ws/session/{session_id}")
+async def session_channel(websocket: WebSocket, session_id: str):
+    """Stream transcript events in and incremental feedback out over one connection.
+
+    Client frames are single events or arrays of events (message, switch, mode,
+    end). The server answers with ``{"type": "feedback"}`` frames as the session
+    changes and a ``{"type": "final"}`` frame once an ``end`` event arrives.
+    A session that has ended, here or over HTTP, is closed with code 4409.
+    """
     session = sessions.get(session_id)
     if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    session.end_session()
-    feedback = generate_feedback(session)
-    return feedback
+        await websocket.close(code=4404)
+        return
+    if session.end_time is not None:
+        await websocket.close(code=4409)
+        return
+    await websocket.accept()
+
+    changed = asyncio.Event()
+
+    async def push_feedback():
+        while True:
+            await changed.wait()
+            changed.clear()
+            feedback = await feedback_service.get(session)
+            await websocket.send_json({"type": "feedback", "feedback": feedback})
+            await asyncio.sleep(WS_FEEDBACK_INTERVAL)
+
+    sender = asyncio.create_task(push_feedback())
+    try:
+        while True:
+            text = await websocket.receive_text()
+            limiter.touch(session_id)
+            try:
+                parsed = _channel_adapter.validate_json(text)
+            except ValidationError as exc:
+                await websocket.send_json({"type": "error", "detail": json.loads(exc.json())})
+                continue
+            events = parsed if isinstance(parsed, list) else [parsed]
+            if len(events) > WS_MAX_EVENTS_PER_FRAME:
+                await websocket.close(code=1009, reason="Too many events in one frame")
+                return
+
+            # Agent mode changes carry no transcript data; the client uses them for UI only.
+            transcript_events = [
+                e.model_dump() for e in events if e.type in ("message", "switch", "question")
+            ]
+            if transcript_events:
+                if session.end_time is not None:  # ended by another request
+                    await websocket.close(code=4409, reason="Session has ended")
+                    return
+                session.add_events(_annotate(session, transcript_events))
+                await _save(session)
+                changed.set()
+
+            if any(e.type == "end" for e in events):
+                sender.cancel()
+                await asyncio.gather(sender, return_exceptions=True)
+                feedback = await _end(session)
+                await websocket.send_json({"type": "final", "feedback": feedback})
+                await websocket.close()
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+
+
+async def _speak(websocket: WebSocket, session: SessionLog, text: str, language: str = "en") -> float:
+    """Log an officer line, then send it sentence by sentence: a JSON header, then PCM16 audio.
+
+    Returns the seconds of audio sent, i.e. how long the client takes to play it.
+    """
+    session.add_message("agent", text, language)
+    await _save(session)
+    seconds = 0.0
+    try:
+        async for sentence, audio in speech.stream(text, language):
+            sample_rate = await speech.sample_rate(language)
+            await websocket.send_json({
+                "type": "speech",
+                "text": sentence,
+                "language": language,
+                "sample_rate": sample_rate,
+            })
+            await websocket.send_bytes(audio)
+            seconds += len(audio) / (2 * sample_rate)
+    except (RuntimeError, ValueError) as exc:
+        await websocket.send_json({"type": "error", "detail": f"TTS unavailable: {exc}"})
+    return seconds
+
+
+def _is_end_frame(text: str | None) -> bool:
+    try:
+        return bool(text) and json.loads(text).get("type") == "end"
+    except (ValueError, AttributeError):
+        return False
+
+
+@app.websocket("/ws/audio/{session_id}")
+async def audio_channel(websocket: WebSocket, session_id: str):
+    """Local voice mode: PCM16 audio in, partial and final transcripts out.
+
+    Binary frames carry 16 kHz mono PCM16 audio. A ``{"type": "end"}`` text
+    frame flushes the recognizer. Final transcripts are logged as student
+    messages on the session. Officer speech comes back as a ``speech`` JSON
+    frame followed by a binary PCM16 frame per sentence.
+
+    The officer's lines come from ``InterviewDialogue``: greeting, the
+    session's planned questions, follow-ups and re-asks are decided locally
+    after every final transcript.
+
+    Voice activity is reported as ``vad`` frames. When the student stays
+    silent too long, a language switch is logged for the current question
+    and the officer explains it in Hindi, then re-asks it in English.
+
+    With RECORDING_DIR set, the student's audio is also recorded for review
+    (see ``server.recording``). Once the session has ended the socket is
+    closed (code 4409 on connect) and nothing more is logged.
+    """
+    session = sessions.get(session_id)
+    if not session:
+        await websocket.close(code=4404)
+        return
+    if session.end_time is not None:
+        await websocket.close(code=4409)
+        return
+    await websocket.accept()
+
+    executor = get_executor()
+    try:
+        recognizer = await asyncio.get_running_loop().run_in_executor(executor, create_recognizer)
+    except (RuntimeError, ValueError) as exc:
+        await websocket.send_json({"type": "error", "detail": str(exc)})
+        await websocket.close(code=1011)
+        return
+    stream = SpeechStream(recognizer, executor)
+    recording = recorder.open(session_id) if recorder is not None else None
+
+    dialogue = InterviewDialogue(session, greeting=OFFICER_GREETING)
+
+    async def forward_results():
+        async for kind, text in stream.results():
+            if session.end_time is not None:
+                continue  # ended over HTTP: drain the recognizer without logging
+            if kind == "final":
+                detection = detect(text)
+                event = {"type": "message", "role": "student", "text": text}
+                session.add_events(annotate_message(session, event, detection))
+                await _save(session)
+            try:
+                await websocket.send_json({"type": kind, "text": text})
+            except (WebSocketDisconnect, RuntimeError):
+                pass
+            if kind == "final":
+                say(dialogue.respond(text, detection))
+
+    vad = create_vad()
+    speaking: set[asyncio.Task] = set()
+    turn_lock = asyncio.Lock()
+    loop = asyncio.get_running_loop()
+    playback_ends = 0.0  # loop time at which the client finishes playing what was sent
+
+    async def speak_turns(turns: list[Turn]):
+        nonlocal playback_ends
+        async with turn_lock:  # one officer turn at a time, in order
+            for turn in turns:
+                if session.end_time is not None:
+                    return
+                started = loop.time()
+                seconds = await _speak(websocket, session, turn.text, turn.language)
+                playback_ends = max(playback_ends, started) + seconds
+
+    def say(turns: list[Turn]):
+        if not turns:
+            return
+        task = asyncio.create_task(speak_turns(turns))
+        speaking.add(task)
+        task.add_done_callback(speaking.discard)
+        # The silence clock starts once the officer has finished talking: audio is
+        # sent faster than it plays, so count from when the client is done playing it.
+        task.add_done_callback(
+            lambda _: vad.restart_silence_timer(delay=max(0.0, playback_ends - loop.time()))
+        )
+
+    async def on_silence(event: dict):
+        question_id = session.current_question_id
+        turns = dialogue.on_silence()
+        if not turns:
+            return  # the interview is over: nothing was asked, so nothing to switch for
+        session.add_language_switch(
+            NO_QUESTION if question_id is None else question_id,
+            f"silence: {event['duration']:g}s",
+        )
+        await _save(session)
+        say(turns)
+
+    forwarder = asyncio.create_task(forward_results())
+    say(dialogue.start())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            limiter.touch(session_id)
+            if session.end_time is not None:  # ended over HTTP while the socket was open
+                break
+            if message.get("bytes"):
+                stream.push(message["bytes"])
+                if recording is not None:
+                    recording.write(message["bytes"])
+                for event in vad.process(message["bytes"]):
+                    state = event.pop("type")
+                    await websocket.send_json({"type": "vad", "state": state, **event})
+                    if state == SILENCE and not speaking:
+                        await on_silence(event)
+            elif _is_end_frame(message.get("text")):
+                break
+    finally:
+        for task in list(speaking):
+            task.cancel()
+        stream.close()
+        if recording is not None:
+            recording.close()
+        await forwarder
+    try:
+        await websocket.close()
+    except RuntimeError:
+        pass
+
+
+@app.get("/api/sessions/stats")
+async def session_store_stats():
+    """Live session store metrics: count, approximate bytes held, evictions."""
+    stats = sessions.metrics()
+    stats["scheduler"] = scheduler.stats()
+    stats["admission"] = limiter.stats()
+    if journal is not None:
+        stats["journal"] = {**journal.stats, "slot": journal.slot, "segments": journal.segment_count()}
+    return stats
+
+
+@app.get("/api/analytics")
+async def get_analytics(
+    since: float | None = None, until: float | None = None, days: float | None = None
+):
+    """Cohort rollups over sessions that ended in a time window (unix seconds).
+
+    ``days`` is shorthand for the window ending now. Per question and
+    category: switch rate, Hindi response ratio, average session duration and
+    the spread of proficiency ratings.
+    """
+    if days is not None:
+        since = time.time() - days * 86400
+    return analytics.rollup(since, until)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def _check_debug_token(request: Request):
+    if not DEBUG_TOKEN or request.headers.get("x-debug-token") != DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+
+
+@app.post("/debug/profiler")
+async def toggle_profiler(
+    request: Request, enabled: bool, threshold_ms: float | None = None, reset: bool = False
+):
+    """Turn the slow-request profiler on or off (needs the X-Debug-Token header)."""
+    _check_debug_token(request)
+    if reset:
+        metrics.profiler.reset()
+    if enabled:
+        threshold = threshold_ms / 1000 if threshold_ms is not None else None
+        metrics.profiler.enable(threshold=threshold)
+    else:
+        metrics.profiler.disable()
+    return {
+        "enabled": metrics.profiler.enabled,
+        "threshold_ms": metrics.profiler.threshold * 1000,
+        "samples": metrics.profiler.samples,
+    }
+
+
+@app.get("/debug/profiler")
+async def profiler_report(request: Request):
+    """Collapsed stacks sampled from slow requests, for flamegraph tools."""
+    _check_debug_token(request)
+    return PlainTextResponse(metrics.profiler.report())
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _ndjson_response(records, gzip: bool, headers: dict | None = None) -> StreamingResponse:
+    headers = dict(headers or {})
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        ndjson_chunks(records, compress=gzip), media_type=NDJSON_MEDIA_TYPE, headers=headers
+    )
+
+
+@app.get("/api/sessions/export")
+async def export_sessions(cursor: str | None = None, limit: int = 100, gzip: bool = False):
+    """Stream a page of sessions as NDJSON, ordered by session ID.
+
+    Pass the ``X-Next-Cursor`` header (also in the trailing ``page`` line) as
+    ``cursor`` to fetch the next page; it is absent on the last page.
+    """
+    if not 1 <= limit <= EXPORT_PAGE_LIMIT:
+        raise HTTPException(status_code=422, detail=f"limit must be 1-{EXPORT_PAGE_LIMIT}")
+    session_ids = sessions.scan_ids(cursor, limit)
+    next_cursor = session_ids[-1] if len(session_ids) == limit else None
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return _ndjson_response(page_records(sessions, session_ids, next_cursor), gzip, headers)
+
+
+@app.get("/api/session/{session_id}/export")
+async def export_session(session_id: str, gzip: bool = False):
+    """Stream one session as NDJSON: a header line, then messages and switches in order."""
+    session = _get_session_or_404(session_id)
+    return _ndjson_response(session_records(session), gzip)
+
+
+@app.get("/api/session/{session_id}/recording")
+async def get_recording(session_id: str, request: Request):
+    """The session's recorded student audio as WAV; a single Range header seeks within it."""
+    _get_session_or_404(session_id)
+    playback = recorder.open_playback(session_id) if recorder is not None else None
+    if playback is None:
+        raise HTTPException(status_code=404, detail="No recording for this session")
+    try:
+        byte_range = parse_range(request.headers.get("range"), playback.size)
+    except ValueError:
+        size = playback.size
+        playback.close()
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    start, stop = byte_range or (0, playback.size)
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(stop - start)}
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{stop - 1}/{playback.size}"
+    return StreamingResponse(
+        playback.iter_bytes(start, stop),
+        status_code=206 if byte_range is not None else 200,
+        media_type="audio/wav",
+        headers=headers,
+        # The generator closes the mapping when it runs to the end; this also
+        # covers a client that disconnects before it starts.
+        background=BackgroundTask(playback.close),
+    )
+
+
+@app.get("/api/session/{session_id}/recording/utterances")
+async def get_recording_utterances(session_id: str):
+    """Byte ranges of each student answer in the session's recording, for Range requests."""
+    session = _get_session_or_404(session_id)
+    playback = recorder.open_playback(session_id) if recorder is not None else None
+    if playback is None:
+        raise HTTPException(status_code=404, detail="No recording for this session")
+    try:
+        return {
+            "sample_rate": playback.sample_rate,
+            "bytes": playback.size,
+            "utterances": playback.utterances(session),
+        }
+    finally:
+        playback.close()
 
 
 @app.get("/api/session/{session_id}")
 async def get_session(session_id: str):
     """Get session details."""
-    session = sessions.get(session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
+    session = _get_session_or_404(session_id)
     return session.to_dict()
 
 
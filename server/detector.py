@@ -0,0 +1,273 @@
+"""Fast Hindi/English language tagging and confusion detection for student utterances.
+
+Utterances are tokenized once with a single regex. Confusion phrases and
+explicit requests for Hindi are matched in one pass with an Aho-Corasick
+automaton over word tokens. The language is scored per token: Devanagari
+tokens count as Hindi, common romanized Hindi and English words come from
+small lexicons, and any other word is scored with character trigram
+log-odds (memoized per word, since vocabulary repeats heavily).
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from typing import NamedTuple
+
+from server.agent import NO_QUESTION
+from server.questions import question_bank
+
+# Devanagari letters and signs, but not the danda punctuation (U+0964, U+0965).
+_TOKEN = re.compile(r"[a-z0-9\u0900-\u0963\u0966-\u097f]+")
+_STRIP = str.maketrans("", "", "'’")
+
+CONFUSION = "confusion"
+HINDI_REQUEST = "hindi_request"
+
+PHRASES = {
+    CONFUSION: [
+        "i don't understand", "i do not understand", "i didn't understand",
+        "i didn't get", "i did not get", "didn't get that", "not clear to me",
+        "question is not clear", "question was not clear",
+        "what do you mean", "can you repeat", "could you repeat", "please repeat",
+        "repeat the question", "say that again", "sorry what", "beg your pardon", "pardon me",
+        "samajh nahi aaya", "samajh nahin aaya", "samjha nahi", "samjhi nahi",
+        "kya matlab", "matlab kya", "phir se boliye", "dobara boliye", "dubara boliye",
+        "समझ नहीं आया", "मतलब क्या", "फिर से बोलिए", "दोबारा बोलिए",
+    ],
+    HINDI_REQUEST: [
+        "hindi mein samjhao", "hindi mein samjhaiye", "hindi mein boliye",
+        "hindi mein bataiye", "hindi me samjhao", "hindi me boliye",
+        "in hindi please", "explain in hindi", "can you speak hindi", "speak in hindi",
+        "हिंदी में समझाओ", "हिंदी में समझाइए", "हिंदी में बोलिए",
+    ],
+}
+
+# Replies that show confusion only as the whole utterance ("Pardon?"), not
+# inside an answer.
+REPLIES = {
+    CONFUSION: ["pardon", "pardon sir", "sorry pardon", "come again", "sorry come again"],
+}
+
+# Romanized Hindi words that are not also English words ("the", "to", "so").
+HINDI_WORDS = frozenset("""
+    hai hain tha thi ho hoga hogi mein mai mera meri mere mujhe mujhko hum
+    humara hamara humari aap aapka aapki aapke apna apni apne tum tumhara kya
+    kyun kyon kaise kaisa kaun kab kahan kitna kitne kitni nahi nahin na haan
+    ji ka ki ke ko se bhi toh aur lekin kyunki agar yeh ye woh wo vo kuch sab
+    bahut acha accha theek thik karna karunga karungi karenge karega karti
+    karta kar raha rahi rahe padhai padhna padhunga padhungi samajh samjhao
+    samjha samjhi matlab baat bolo boliye bataiye wapas ghar paisa paise
+    naukri kaam saal liye wala wali wale abhi phir dobara baad pehle wahan
+    yahan jahan chahta chahti chahte hoon hun aaunga aaungi jaunga jaungi
+""".split())
+
+ENGLISH_WORDS = frozenset("""
+    the is are was were be been am i you he she it we they my your his her our
+    their this that these those what which who whom why how when where will
+    would shall should can could may might must do does did have has had a an
+    and or but if because so of in on at to for from with by about after before
+    study studies studying university college course program degree master
+    masters bachelor plan plans return country family father mother job work
+    loan scholarship fund funding money pay expenses income score test ielts
+    toefl english yes no not please thank thanks sir madam want going pardon
+""".split())
+
+# A few seed sentences per language train the trigram scorer; the question
+# bank's English questions and Hindi hints are added, and the scorer is
+# rebuilt whenever the bank is reloaded.
+_HINDI_SEED = """
+    mera naam rahul hai aur main engineering padhna chahta hoon mere papa
+    business karte hain aur woh meri padhai ka kharcha uthayenge padhai
+    khatam hone ke baad main india wapas aaunga kyunki mera parivaar yahan hai
+    mujhe yeh sawaal samajh nahi aaya kripya phir se samjhaiye
+"""
+_ENGLISH_SEED = """
+    my name is rahul and i want to study engineering my father runs a business
+    and he will sponsor my education after completing my degree i will return
+    to india because my family is here i did not understand the question could
+    you please explain it again
+"""
+
+_PER_TOKEN_CAP = 2.0
+_DEVANAGARI_WEIGHT = 3.0
+_LEXICON_WEIGHT = 3.0
+
+
+class Detection(NamedTuple):
+    language: str
+    confused: bool
+    hindi_request: bool
+    phrases: tuple
+
+    @property
+    def needs_hindi_help(self) -> bool:
+        return self.confused or self.hindi_request
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower().translate(_STRIP))
+
+
+class PhraseAutomaton:
+    """Aho-Corasick automaton over word tokens, built once from labeled phrases."""
+
+    def __init__(self, phrases: dict[str, list[str]]):
+        self._goto: list[dict] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple] = [()]
+        for label, texts in phrases.items():
+            for text in texts:
+                self._add(tuple(tokenize(text)), (label, text))
+        self._link()
+
+    def _add(self, tokens: tuple, output: tuple):
+        state = 0
+        for token in tokens:
+            nxt = self._goto[state].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] += (output,)
+
+    def _link(self):
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def search(self, tokens: list[str]) -> list[tuple]:
+        """Return (label, phrase) for every phrase occurring in ``tokens``."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        found = []
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if out[state]:
+                found.extend(out[state])
+        return found
+
+
+class TrigramScorer:
+    """Character trigram log-odds of a word being romanized Hindi rather than English."""
+
+    def __init__(self, hindi_text: str, english_text: str, cache_size: int = 50_000):
+        self._hindi = self._model(hindi_text)
+        self._english = self._model(english_text)
+        self._cache: dict[str, float] = {}
+        self._cache_size = cache_size
+
+    @staticmethod
+    def _grams(word: str):
+        padded = f"^{word}$"
+        return (padded[i:i + 3] for i in range(len(padded) - 2))
+
+    def _model(self, text: str) -> tuple[Counter, int, int]:
+        counts = Counter(g for word in tokenize(text) for g in self._grams(word))
+        return counts, sum(counts.values()), len(counts) + 1
+
+    def score(self, word: str) -> float:
+        cached = self._cache.get(word)
+        if cached is not None:
+            return cached
+        (h_counts, h_total, h_vocab), (e_counts, e_total, e_vocab) = self._hindi, self._english
+        score = 0.0
+        for gram in self._grams(word):
+            score += math.log((h_counts[gram] + 1) / (h_total + h_vocab))
+            score -= math.log((e_counts[gram] + 1) / (e_total + e_vocab))
+        score = max(-_PER_TOKEN_CAP, min(_PER_TOKEN_CAP, score))
+        if len(self._cache) < self._cache_size:
+            self._cache[word] = score
+        return score
+
+
+def _build_scorer(questions: list[dict]) -> TrigramScorer:
+    hindi = " ".join([_HINDI_SEED, *HINDI_WORDS, *(q["hint_hi"] for q in questions)])
+    english = " ".join([_ENGLISH_SEED, *ENGLISH_WORDS, *(q["question_en"] for q in questions)])
+    return TrigramScorer(hindi, english)
+
+
+_automaton = PhraseAutomaton(PHRASES)
+_replies = {
+    tuple(tokenize(text)): (label, text) for label, texts in REPLIES.items() for text in texts
+}
+_scorer_cache: tuple[str, TrigramScorer] | None = None
+
+
+def _current_scorer() -> TrigramScorer:
+    global _scorer_cache
+    bank = question_bank.current()
+    if _scorer_cache is None or _scorer_cache[0] != bank.version:
+        _scorer_cache = (bank.version, _build_scorer(bank.questions))
+    return _scorer_cache[1]
+
+
+def detect(text: str) -> Detection:
+    """Tag an utterance's language ("hi" or "en") and flag confusion / Hindi requests."""
+    tokens = tokenize(text)
+    scorer = _current_scorer()
+    score = 0.0
+    for token in tokens:
+        if token[0] >= "ऀ":
+            score += _DEVANAGARI_WEIGHT
+        elif token in HINDI_WORDS:
+            score += _LEXICON_WEIGHT
+        elif token in ENGLISH_WORDS:
+            score -= _LEXICON_WEIGHT
+        elif not token.isdigit():
+            score += scorer.score(token)
+
+    matches = _automaton.search(tokens) if tokens else []
+    reply = _replies.get(tuple(tokens))
+    if reply is not None:
+        matches.append(reply)
+    labels = {label for label, _ in matches}
+    return Detection(
+        language="hi" if score > 0 else "en",
+        confused=CONFUSION in labels,
+        hindi_request=HINDI_REQUEST in labels,
+        phrases=tuple(phrase for _, phrase in matches),
+    )
+
+
+def annotate_events(session, events):
+    """Tag student messages with a detected language and add a language switch after
+    any that show confusion or ask for Hindi.
+
+    Yields lazily so ``SessionLog.add_events`` has applied earlier question
+    events by the time a switch reads ``session.current_question_id``.
+    """
+    for event in events:
+        if event["type"] != "message" or event["role"] != "student":
+            yield event
+            continue
+        yield from annotate_message(session, event, detect(event["text"]))
+
+
+def annotate_message(session, event, detection: Detection):
+    """``annotate_events`` for one student message whose ``detection`` the caller already has."""
+    if not event.get("language"):
+        event = {**event, "language": detection.language}
+    yield event
+    if detection.needs_hindi_help:
+        label = "hindi request" if detection.hindi_request else "confusion"
+        question_id = session.current_question_id
+        yield {
+            "type": "switch",
+            "question_id": NO_QUESTION if question_id is None else question_id,
+            "reason": f"{label}: {detection.phrases[0]}",
+            "timestamp": event.get("timestamp"),
+        }
@@ -0,0 +1,144 @@
+"""Deterministic interview flow: what the officer says next.
+
+``InterviewDialogue`` replays the rules of the officer's system prompt as a
+small state machine over the session's question plan, so local voice mode
+decides each turn without a language-model round trip:
+
+* greet, then ask the plan's questions in order;
+* after a vague answer (short, or missing most of what the category
+  expects), ask the question's next unused follow-up;
+* when the student is confused, asks for Hindi, or stays silent, explain
+  the question with its Hindi hint, then re-ask it in English; a second
+  time on the same question, move on;
+* close the interview after the last question.
+
+A free-form follow-up is only requested (from ``follow_up_writer``, e.g. a
+language-model client) once a question's written follow-ups are used up.
+The app ships without a writer, so its officer only asks the question
+bank's written follow-ups.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, NamedTuple
+
+from server.agent import CLOSING_LINE, OFFICER_GREETING, REASK_LINE, SessionLog
+from server.detector import Detection, detect, tokenize
+from server.questions import get_all_questions, get_question_by_id
+from server.scoring import MIN_WORDS, score_answer
+
+# Turn kinds.
+GREETING = "greeting"
+QUESTION = "question"
+FOLLOW_UP = "follow_up"
+HINDI_HELP = "hindi_help"
+REASK = "reask"
+NUDGE = "nudge"
+CLOSING = "closing"
+
+MAX_FOLLOW_UPS = 2
+MAX_HINDI_HELP = 1
+# An answer covering less than this share of its category's concepts is vague.
+VAGUE_COVERAGE = 0.5
+ENGLISH_NUDGE = "Please try to answer in English."
+
+
+class Turn(NamedTuple):
+    kind: str
+    text: str
+    language: str = "en"
+    question_id: int | None = None
+
+
+class InterviewDialogue:
+    """Officer turn decisions for one session, driven by the question bank."""
+
+    def __init__(
+        self,
+        session: SessionLog,
+        greeting: str = OFFICER_GREETING,
+        follow_up_writer: Callable[[dict, str], str | None] | None = None,
+    ):
+        self.session = session
+        self.greeting = greeting
+        self.follow_up_writer = follow_up_writer
+        self.plan = list(session.question_plan) or [q["id"] for q in get_all_questions()]
+        self.position = -1  # index into plan of the current question
+        self.question: dict | None = None
+        self.prompt = ""  # the last thing asked in English, re-asked after Hindi help
+        self.follow_ups_used = 0
+        self.hindi_help = 0
+        self.finished = False
+
+    def start(self) -> list[Turn]:
+        """Greeting and the first question."""
+        return [Turn(GREETING, self.greeting), *self._next_question()]
+
+    def respond(self, text: str, detection: Detection | None = None) -> list[Turn]:
+        """Officer turns after a student utterance (``detection`` is ``detect(text)``, if already run)."""
+        if self.finished:
+            return []
+        if self.question is None:
+            return self._next_question()
+        if detection is None:
+            detection = detect(text)
+        if detection.needs_hindi_help:
+            return self._help_or_move_on()
+
+        turns = []
+        if detection.language == "hi":
+            turns.append(Turn(NUDGE, ENGLISH_NUDGE, question_id=self.question["id"]))
+        if self._is_vague(text) and self.follow_ups_used < MAX_FOLLOW_UPS:
+            follow_up = self._follow_up(text)
+            if follow_up is not None:
+                self.follow_ups_used += 1
+                self.prompt = follow_up
+                return [*turns, Turn(FOLLOW_UP, follow_up, question_id=self.question["id"])]
+        return [*turns, *self._next_question()]
+
+    def on_silence(self) -> list[Turn]:
+        """Officer turns after the student stayed silent too long."""
+        if self.finished or self.question is None:
+            return []
+        return self._help_or_move_on()
+
+    def _is_vague(self, text: str) -> bool:
+        tokens = tokenize(text)
+        if len(tokens) < MIN_WORDS:
+            return True
+        coverage = score_answer(tokens, self.question["category"]).coverage
+        return coverage is not None and coverage < VAGUE_COVERAGE
+
+    def _follow_up(self, answer: str) -> str | None:
+        written = self.question["follow_ups"]
+        if self.follow_ups_used < len(written):
+            return written[self.follow_ups_used]
+        if self.follow_up_writer is not None:
+            return self.follow_up_writer(self.question, answer)
+        return None
+
+    def _help_or_move_on(self) -> list[Turn]:
+        question = self.question
+        if self.hindi_help >= MAX_HINDI_HELP:
+            return self._next_question()
+        self.hindi_help += 1
+        return [
+            Turn(HINDI_HELP, question["hint_hi"], "hi", question["id"]),
+            Turn(REASK, f"{REASK_LINE} {self.prompt}", question_id=question["id"]),
+        ]
+
+    def _next_question(self) -> list[Turn]:
+        while self.position + 1 < len(self.plan):
+            self.position += 1
+            question = get_question_by_id(self.plan[self.position])
+            if question is None:
+                continue  # removed from the bank since the plan was made
+            self.question = question
+            self.prompt = question["question_en"]
+            self.follow_ups_used = 0
+            self.hindi_help = 0
+            self.session.mark_question(question["id"])
+            return [Turn(QUESTION, self.prompt, question_id=question["id"])]
+        self.question = None
+        self.finished = True
+        return [Turn(CLOSING, CLOSING_LINE)]
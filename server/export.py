@@ -0,0 +1,83 @@
+"""Streaming NDJSON export of session transcripts.
+
+A session is written as one ``session`` header line followed by its
+``message`` and ``switch`` lines merged in time order, so the export can be
+replayed event by event. Lines are packed into chunks of about
+``EXPORT_CHUNK_BYTES`` and optionally gzip-compressed as they are produced,
+so memory use depends on the chunk size, not on the size or number of
+sessions exported.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import zlib
+from typing import AsyncIterator, Iterable, Iterator
+
+from server.agent import SessionLog
+
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_PAGE_LIMIT = 1000
+
+
+def session_records(session: SessionLog) -> Iterator[dict]:
+    """Header, then messages and switches in timestamp order."""
+    session_id = session.session_id
+    yield {
+        "type": "session",
+        "session_id": session_id,
+        "student_id": session.student_id,
+        "start_time": session.start_time,
+        "end_time": session.end_time,
+        "duration_minutes": session.duration_minutes(),
+        "question_plan": list(session.question_plan),
+        "questions_asked": list(session.questions_asked),
+        "student_language_usage": dict(session.student_language_usage),
+    }
+    messages = (
+        {"type": "message", "session_id": session_id, **entry}
+        for entry in session.transcript.iter_live()
+    )
+    switches = (
+        {"type": "switch", "session_id": session_id, **switch}
+        for switch in list(session.language_switches)
+    )
+    yield from heapq.merge(messages, switches, key=lambda record: record["timestamp"])
+
+
+async def ndjson_chunks(
+    records: Iterable[dict], compress: bool = False, chunk_bytes: int = EXPORT_CHUNK_BYTES
+) -> AsyncIterator[bytes]:
+    """Encode records as NDJSON and yield them in chunks (gzip-framed if ``compress``).
+
+    Runs on the event loop, so a session is never read while another request
+    is half-way through changing it.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer = bytearray()
+    for record in records:
+        buffer += json.dumps(record, ensure_ascii=False).encode()
+        buffer += b"\n"
+        if len(buffer) >= chunk_bytes:
+            chunk = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+            buffer.clear()
+            if chunk:
+                yield chunk
+    tail = bytes(buffer)
+    if compressor:
+        tail = compressor.compress(tail) + compressor.flush()
+    if tail:
+        yield tail
+
+
+def page_records(store, session_ids: list[str], next_cursor: str | None) -> Iterator[dict]:
+    """Every session in ``session_ids`` (read one at a time), then a ``page`` trailer."""
+    exported = 0
+    for session_id in session_ids:
+        session = store.peek(session_id)
+        if session is None:
+            continue  # evicted or deleted since the page was listed
+        exported += 1
+        yield from session_records(session)
+    yield {"type": "page", "sessions": exported, "next_cursor": next_cursor}
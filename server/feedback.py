@@ -1,12 +1,111 @@
 """Post-session feedback summary generator."""
 
+import asyncio
+import bisect
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 from server.agent import SessionLog
+from server.metrics import FEEDBACK_SECONDS
+from server.questions import get_category_label, get_question_by_id
+from server import scoring
+
+# Score each answer's content (see server.scoring); set ANSWER_SCORING=off to
+# report the language ratio only.
+ANSWER_SCORING = os.getenv("ANSWER_SCORING", "on").lower() not in ("0", "off", "false", "no")
+
+
+# Proficiency ratings, weakest first, and the English ratio each one starts at.
+PROFICIENCY_LEVELS = ("Weak — practice answering in English", "Needs Improvement", "Good", "Strong")
+PROFICIENCY_THRESHOLDS = (0.5, 0.7, 0.9)
+
+
+def proficiency_level(english_ratio: float) -> int:
+    """Index into PROFICIENCY_LEVELS for a share of answers given in English."""
+    return bisect.bisect_right(PROFICIENCY_THRESHOLDS, english_ratio)
 
 
 def generate_feedback(session: SessionLog) -> dict:
-    """Generate a structured feedback report from a session log."""
+    """Generate a structured feedback report from a session log.
+
+    Apart from answer scoring (one pass over the retained transcript), reads
+    only the session's running aggregates, so it is cheap enough to poll
+    mid-interview.
+    """
+    with FEEDBACK_SECONDS.time():
+        return _build_feedback(session)
+
+
+class FeedbackService:
+    """Feedback memoized per session content version, with concurrent requests coalesced.
+
+    Requests for a version already computed return the cached report; ones
+    arriving while it is being computed wait for that computation. The
+    report is built from a snapshot taken together with the version, so it
+    is never cached under a version newer than its content. With answer
+    scoring on, it is built in a worker thread, so the event loop is never
+    blocked by a long transcript.
+    """
+
+    def __init__(self, max_entries: int = 10_000, workers: int | None = None):
+        self.max_entries = max_entries
+        self.workers = workers or int(os.getenv("FEEDBACK_WORKERS", "2"))
+        self.computations = 0
+        self._cache: OrderedDict = OrderedDict()  # session id -> (version, feedback)
+        self._pending: dict[tuple, asyncio.Future] = {}
+        self._executor: ThreadPoolExecutor | None = None
+
+    async def get(self, session: SessionLog) -> dict:
+        version = session.content_version()
+        if session.end_time is None:
+            version += (session.duration_minutes(),)  # live reports show the running duration
+        cached = self._cache.get(session.session_id)
+        if cached is not None and cached[0] == version:
+            self._cache.move_to_end(session.session_id)
+            return cached[1]
+        key = (session.session_id, version)
+        pending = self._pending.get(key)
+        if pending is None:
+            compute = self._compute(session.session_id, session.snapshot(), version)
+            pending = self._pending[key] = asyncio.ensure_future(compute)
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        # Shielded: one caller going away must not cancel the others' result.
+        return await asyncio.shield(pending)
+
+    async def _compute(self, session_id: str, snapshot: SessionLog, version: tuple) -> dict:
+        self.computations += 1
+        if ANSWER_SCORING:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="feedback")
+            feedback, elapsed = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _timed_build, snapshot
+            )
+            FEEDBACK_SECONDS.observe(elapsed)
+        else:
+            feedback = generate_feedback(snapshot)
+        self._cache[session_id] = (version, feedback)
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return feedback
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _timed_build(session: SessionLog) -> tuple[dict, float]:
+    started = time.perf_counter()
+    feedback = _build_feedback(session)
+    return feedback, time.perf_counter() - started
+
+
+def _build_feedback(session: SessionLog) -> dict:
     total_switches = len(session.language_switches)
-    total_messages = len([t for t in session.transcript if t["role"] == "student"])
+    total_messages = session.role_counts.get("student", 0)
     hindi_responses = session.student_language_usage.get("hindi", 0)
     english_responses = session.student_language_usage.get("english", 0)
 
@@ -16,28 +115,21 @@ def generate_feedback(session: SessionLog) -> dict:
     else:
         english_ratio = english_responses / total_messages
 
-    if english_ratio >= 0.9:
-        proficiency = "Strong"
-    elif english_ratio >= 0.7:
-        proficiency = "Good"
-    elif english_ratio >= 0.5:
-        proficiency = "Needs Improvement"
-    else:
-        proficiency = "Weak — practice answering in English"
+    proficiency = PROFICIENCY_LEVELS[proficiency_level(english_ratio)]
 
     # Questions that needed Hindi help
-    questions_needing_help = list({s["question_id"] for s in session.language_switches})
+    questions_needing_help = list({qid for qid in session.switch_counts})
 
     # Build improvement areas
     improvements = []
     if total_switches > 0:
-        improvements.append(
-            f"You needed Hindi help on {total_switches} occasion(s). "
-            f"Practice answering questions about: "
-            + ", ".join(
+        note = f"You needed Hindi help on {total_switches} occasion(s)."
+        # Switches before any question was asked have no question to name.
+        if questions_needing_help:
+            note += " Practice answering questions about: " + ", ".join(
                 _category_for_question(qid) for qid in questions_needing_help
             )
-        )
+        improvements.append(note)
     if hindi_responses > 0:
         improvements.append(
             f"You answered {hindi_responses} question(s) in Hindi. "
@@ -48,7 +140,11 @@ def generate_feedback(session: SessionLog) -> dict:
             "You gave very few responses. Practice giving detailed answers."
         )
 
-    return {
+    answer_scores = scoring.score_transcript(session.transcript) if ANSWER_SCORING else None
+    if answer_scores:
+        improvements.extend(scoring.improvement_notes(answer_scores))
+
+    feedback = {
         "session_id": session.session_id,
         "duration_minutes": session.duration_minutes(),
         "total_questions_faced": total_messages,
@@ -62,18 +158,17 @@ def generate_feedback(session: SessionLog) -> dict:
             proficiency, total_switches, improvements, session.duration_minutes()
         ),
     }
+    if answer_scores is not None:
+        feedback["answer_quality"] = scoring.summarize(answer_scores)
+    return feedback
 
 
 def _category_for_question(question_id: int) -> str:
     """Map question ID to its category name."""
-    category_map = {
-        1: "study plans",
-        2: "financial capability",
-        3: "return intent",
-        4: "academic background",
-        5: "English proficiency",
-    }
-    return category_map.get(question_id, "general")
+    question = get_question_by_id(question_id)
+    if question is None:
+        return "general"
+    return get_category_label(question["category"])
 
 
 def _build_summary_text(
@@ -0,0 +1,403 @@
+"""Append-only session journal for crash recovery.
+
+Every session mutation is appended to the current segment file of a per-node
+journal directory as a length-prefixed, checksummed record::
+
+    <u32 payload length> <u32 crc32 of payload> <payload: compact JSON>
+
+Callers only encode the record and queue it; a background thread writes
+queued records in one ``write`` and fsyncs at most once per
+``fsync_interval``, so a crash loses at most that window of events and the
+request path never waits on the disk.
+
+Worker processes sharing the directory each claim a slot by holding an
+exclusive ``flock`` on ``journal-<slot>.lock`` (the lowest free slot), and
+only ever read, write or compact ``journal-<slot>-<seq>.log`` segments. A
+restarted worker takes over a slot left by one that exited, with its sessions.
+
+On startup ``recover`` replays every segment of the slot in order to rebuild
+the sessions that had not ended, cutting off a torn record at the tail of the
+last segment. Once every session with records in a closed segment has
+ended, the segment is deleted; a closed segment that is mostly dead is
+rewritten in place with only its live records. With ``max_idle`` set, a
+session nothing was appended for in that long counts as ended too, the same
+cutoff ``recover`` applies, so sessions abandoned without ``/end`` do not pin
+their segments.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from server.agent import SessionLog
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<II")
+SEGMENT_PREFIX = "journal-"
+SEGMENT_SUFFIX = ".log"
+LOCK_SUFFIX = ".lock"
+
+# Record "op" codes.
+START = "start"
+MESSAGE = "m"
+SWITCH = "w"
+QUESTION = "q"
+END = "e"
+
+
+def _encode(record: dict) -> bytes:
+    payload = json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode()
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_segment(path: str) -> tuple[list[tuple[dict, bytes]], int]:
+    """Return ([(record, raw bytes)], bytes of valid data) for one segment file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    records = []
+    pos = 0
+    while pos + _HEADER.size <= len(data):
+        length, crc = _HEADER.unpack_from(data, pos)
+        end = pos + _HEADER.size + length
+        payload = data[pos + _HEADER.size:end]
+        if end > len(data) or zlib.crc32(payload) != crc:
+            break
+        try:
+            records.append((json.loads(payload), data[pos:end]))
+        except ValueError:
+            break
+        pos = end
+    return records, pos
+
+
+class _Segment:
+    __slots__ = ("seq", "path", "sessions", "live")
+
+    def __init__(self, seq: int, path: str):
+        self.seq = seq
+        self.path = path
+        self.sessions: set[str] = set()  # every session with records here
+        self.live: set[str] = set()  # those not yet ended
+
+
+class SessionJournal:
+    """Per-node segment log of session events with a background writer."""
+
+    def __init__(
+        self,
+        directory: str,
+        fsync_interval: float = 0.05,
+        segment_bytes: int = 64 << 20,
+        max_idle: float | None = None,
+    ):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.segment_bytes = segment_bytes
+        self.max_idle = max_idle
+        self.stats = {
+            "appended": 0, "bytes": 0, "fsyncs": 0, "compacted": 0, "deleted": 0, "expired": 0,
+        }
+        self._queue: list[tuple[str, bool, bytes]] = []
+        self._cond = threading.Condition()
+        self._stop = False
+        self._written = 0  # records handed to the OS and fsynced
+        self._unsynced = 0  # records written since the last fsync
+        self._ended: list[str] = []  # sessions whose end record awaits an fsync
+        self._segments: dict[int, _Segment] = {}
+        self._session_segments: dict[str, set[int]] = {}
+        # Sessions not yet ended, least recently appended to first; writer thread only.
+        self._last_append: OrderedDict = OrderedDict()
+        self._current: _Segment | None = None
+        self._file = None
+        self._file_bytes = 0
+        self._writer: threading.Thread | None = None
+        self.slot: int | None = None
+        self._lock = None
+        os.makedirs(directory, exist_ok=True)
+
+    # -- recovery -----------------------------------------------------------
+
+    def _claim_slot(self):
+        """Lock the lowest slot no other live process holds."""
+        slot = 0
+        while True:
+            lock = open(os.path.join(self.directory, f"{SEGMENT_PREFIX}{slot}{LOCK_SUFFIX}"), "ab")
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                slot += 1
+                continue
+            self.slot, self._lock = slot, lock
+            return
+
+    def _segment_paths(self) -> list[tuple[int, str]]:
+        prefix = f"{SEGMENT_PREFIX}{self.slot}-"
+        paths = []
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith(SEGMENT_SUFFIX):
+                seq = int(name[len(prefix):-len(SEGMENT_SUFFIX)])
+                paths.append((seq, os.path.join(self.directory, name)))
+        return sorted(paths)
+
+    def recover(self) -> list[SessionLog]:
+        """Replay the journal, start the writer and return the sessions still in progress.
+
+        Must run before any session method journals (``SessionLog.journal`` unset).
+        """
+        self._claim_slot()
+        sessions: dict[str, SessionLog] = {}
+        last_seen: dict[str, float] = {}
+        ended: set[str] = set()
+        paths = self._segment_paths()
+        for index, (seq, path) in enumerate(paths):
+            records, valid = read_segment(path)
+            if valid < os.path.getsize(path):
+                logger.warning("Journal %s: dropping %d torn bytes", path, os.path.getsize(path) - valid)
+                if index == len(paths) - 1:
+                    with open(path, "r+b") as f:
+                        f.truncate(valid)
+            segment = self._segments[seq] = _Segment(seq, path)
+            for record, _ in records:
+                session_id = record["s"]
+                segment.sessions.add(session_id)
+                self._session_segments.setdefault(session_id, set()).add(seq)
+                last_seen[session_id] = record.get("t", last_seen.get(session_id, 0.0))
+                _apply(sessions, ended, record)
+            segment.live = segment.sessions - ended
+
+        # Sessions the store would have evicted as idle are not brought back.
+        if self.max_idle is not None:
+            cutoff = time.time() - self.max_idle
+            for session_id in [s for s in sessions if last_seen.get(s, 0.0) < cutoff]:
+                del sessions[session_id]
+                ended.add(session_id)
+        for segment in self._segments.values():
+            segment.live -= ended
+        for session_id in ended:
+            self._session_segments.pop(session_id, None)
+        for session_id in sorted(sessions, key=lambda s: last_seen.get(s, 0.0)):
+            self._last_append[session_id] = last_seen.get(session_id, 0.0)
+
+        self._open_segment(paths[-1][0] + 1 if paths else 1)
+        for segment in list(self._segments.values()):
+            if segment is not self._current:
+                self._maybe_compact(segment)
+        self._writer = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self._writer.start()
+        return list(sessions.values())
+
+    # -- appending ----------------------------------------------------------
+
+    def _append(self, session_id: str, record: dict, ends: bool = False):
+        data = _encode(record)
+        with self._cond:
+            self._queue.append((session_id, ends, data))
+            self._cond.notify()
+
+    def start(self, session: SessionLog):
+        self._append(session.session_id, {
+            "op": START, "s": session.session_id, "t": session.start_time,
+            "b": session.transcript_budget_bytes, "u": session.student_id,
+            "p": session.question_plan,
+        })
+
+    def message(self, session_id: str, role: str, text: str, language: str, timestamp: float):
+        self._append(session_id, {
+            "op": MESSAGE, "s": session_id, "r": role, "x": text, "l": language, "t": timestamp,
+        })
+
+    def switch(self, session_id: str, question_id: int, reason: str, timestamp: float):
+        self._append(session_id, {
+            "op": SWITCH, "s": session_id, "q": question_id, "why": reason, "t": timestamp,
+        })
+
+    def question(self, session_id: str, question_id: int):
+        self._append(session_id, {"op": QUESTION, "s": session_id, "q": question_id, "t": time.time()})
+
+    def end(self, session_id: str, timestamp: float | None = None):
+        self._append(session_id, {"op": END, "s": session_id, "t": timestamp or time.time()}, ends=True)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything appended so far is written and fsynced."""
+        with self._cond:
+            target = self._written + len(self._queue)
+            self._cond.notify()
+            return self._cond.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._lock is not None:
+            self._lock.close()  # releases the slot
+            self._lock = None
+
+    # -- writer thread --------------------------------------------------------
+
+    def _open_segment(self, seq: int):
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{self.slot}-{seq:08d}{SEGMENT_SUFFIX}")
+        self._current = self._segments[seq] = _Segment(seq, path)
+        self._file = open(path, "ab")
+        self._file_bytes = 0
+
+    def _run(self):
+        next_sync = 0.0
+        dirty = False
+        while True:
+            with self._cond:
+                if not self._queue and not self._stop:
+                    timeout = max(0.0, next_sync - time.monotonic()) if dirty else None
+                    self._cond.wait(timeout)
+                batch, self._queue = self._queue, []
+                stopping = self._stop
+            if batch:
+                self._write(batch)
+                dirty = True
+            now = time.monotonic()
+            if dirty and (now >= next_sync or stopping):
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self.stats["fsyncs"] += 1
+                dirty = False
+                next_sync = now + self.fsync_interval
+                with self._cond:
+                    self._written += self._unsynced
+                    self._unsynced = 0
+                    self._cond.notify_all()
+                self._after_sync()
+            if stopping and not dirty:
+                with self._cond:
+                    if not self._queue:
+                        return
+
+    def _write(self, batch: list[tuple[str, bool, bytes]]):
+        segment = self._current
+        ended = []
+        now = time.time()
+        for session_id, ends, _ in batch:
+            if session_id not in segment.sessions:
+                segment.sessions.add(session_id)
+                self._session_segments.setdefault(session_id, set()).add(segment.seq)
+            if ends:
+                ended.append(session_id)
+                self._last_append.pop(session_id, None)
+            else:
+                segment.live.add(session_id)
+                self._last_append[session_id] = now
+                self._last_append.move_to_end(session_id)
+        data = b"".join(item[2] for item in batch)
+        self._file.write(data)
+        self._file_bytes += len(data)
+        self._unsynced += len(batch)
+        self.stats["appended"] += len(batch)
+        self.stats["bytes"] += len(data)
+        self._ended.extend(ended)
+
+    def _after_sync(self):
+        """Bookkeeping once records are durable: retire ended and idle sessions, roll and compact."""
+        ended, self._ended = self._ended, []
+        if self.max_idle is not None:
+            cutoff = time.time() - self.max_idle
+            while self._last_append:
+                session_id, last = next(iter(self._last_append.items()))
+                if last >= cutoff:
+                    break
+                del self._last_append[session_id]
+                ended.append(session_id)
+                self.stats["expired"] += 1
+        touched = set()
+        for session_id in ended:
+            for seq in self._session_segments.pop(session_id, ()):
+                segment = self._segments.get(seq)
+                if segment is not None:
+                    segment.live.discard(session_id)
+                    touched.add(seq)
+        if self._file_bytes >= self.segment_bytes:
+            self._file.close()
+            touched.add(self._current.seq)
+            self._open_segment(self._current.seq + 1)
+        for seq in sorted(touched):
+            segment = self._segments.get(seq)
+            if segment is not None and segment is not self._current:
+                self._maybe_compact(segment)
+
+    def _maybe_compact(self, segment: _Segment):
+        if not segment.live:
+            os.remove(segment.path)
+            del self._segments[segment.seq]
+            self.stats["deleted"] += 1
+            return
+        if len(segment.live) * 2 > len(segment.sessions):
+            return
+        records, _ = read_segment(segment.path)
+        kept = b"".join(raw for record, raw in records if record["s"] in segment.live)
+        tmp = f"{segment.path}.compact"
+        with open(tmp, "wb") as f:
+            f.write(kept)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, segment.path)
+        for session_id in segment.sessions - segment.live:
+            segments = self._session_segments.get(session_id)
+            if segments is not None:
+                segments.discard(segment.seq)
+        segment.sessions = set(segment.live)
+        self.stats["compacted"] += 1
+
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+
+def _apply(sessions: dict[str, SessionLog], ended: set, record: dict):
+    session_id = record["s"]
+    op = record["op"]
+    if op == END:
+        sessions.pop(session_id, None)
+        ended.add(session_id)
+        return
+    ended.discard(session_id)
+    session = sessions.get(session_id)
+    if session is None:
+        session = sessions[session_id] = SessionLog(
+            session_id=session_id, start_time=record["t"]
+        )
+    if op == START:
+        session.start_time = record["t"]
+        session.transcript_budget_bytes = record.get("b")
+        session.student_id = record.get("u")
+        session.question_plan = list(record.get("p", ()))
+    elif op == MESSAGE:
+        session.add_message(record["r"], record["x"], record["l"], timestamp=record["t"])
+    elif op == SWITCH:
+        session.add_language_switch(record["q"], record["why"], timestamp=record["t"])
+    elif op == QUESTION:
+        session.mark_question(record["q"])
+
+
+def create_journal() -> SessionJournal | None:
+    """Build the journal configured by JOURNAL_DIR (None when journaling is off)."""
+    directory = os.getenv("JOURNAL_DIR")
+    if not directory:
+        return None
+    return SessionJournal(
+        directory,
+        fsync_interval=float(os.getenv("JOURNAL_FSYNC_INTERVAL", "0.05")),
+        segment_bytes=int(os.getenv("JOURNAL_SEGMENT_BYTES", str(64 << 20))),
+        max_idle=float(os.getenv("SESSION_IDLE_TTL", "3600")),
+    )
@@ -0,0 +1,276 @@
+"""Admission control and per-client rate limiting.
+
+Requests are sorted into lanes by path before routing:
+
+* ``start`` (``POST /api/session/start``): a strict per-IP token bucket,
+  then a global cap on concurrent active interviews (503 when full);
+* ``priority`` (``/end`` and transcript writes of a session already in
+  progress): their own generous per-IP bucket and never the global cap, so
+  running interviews can finish while new ones are being turned away;
+* ``general``: every other API request, with a per-IP bucket.
+
+WebSocket connects are never rejected, but like every request naming a
+session they count as activity on it. The app also calls ``touch`` for each
+frame a socket receives, so an interview run entirely over a socket stays
+active while it runs.
+
+Rejections are answered by the middleware itself with a small precomputed
+JSON body and ``Retry-After``; the app is never called. A bucket rate of 0
+turns that lane's limit off, and everything is off unless configured.
+
+An interview counts as active from ``started`` until ``ended`` or until no
+request has touched it for ``idle_seconds``, so abandoned sessions give
+their slot back. A start request admitted under the cap reserves its slot
+in ``check`` itself, before the app awaits anything, so concurrent starts
+cannot all see the same free slot. The app turns the reservation into the
+new session with ``started(session_id, scope)``; the middleware releases it
+if the request finishes without doing so.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+
+from server import metrics
+
+START = "start"
+PRIORITY = "priority"
+GENERAL = "general"
+
+SESSION_PREFIX = "/api/session/"
+START_PATH = "/api/session/start"
+# Session sub-resources that let an interview in progress finish.
+PRIORITY_ACTIONS = frozenset({"end", "events", "events/stream", "message", "switch"})
+EXEMPT_PREFIXES = ("/static/", "/metrics", "/debug/")
+# ASGI scope key holding an admitted start request's slot reservation.
+RESERVATION = "interview.reservation"
+
+LIMITED = metrics.Counter(
+    "interview_requests_limited_total", "Requests rejected by admission control.", ("lane", "reason"),
+)
+
+
+class TokenBuckets:
+    """One token bucket per key, refilled lazily; least recently used keys are dropped."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_keys = max_keys
+        self._buckets: OrderedDict = OrderedDict()  # key -> [tokens, updated]
+
+    def take(self, key: str, now: float) -> float:
+        """Take a token; returns 0 on success, otherwise seconds until one is available."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class ActiveSessions:
+    """Interviews in progress, ordered by last activity so idle ones expire cheaply."""
+
+    def __init__(self, idle_seconds: float):
+        self.idle_seconds = idle_seconds
+        self._last_seen: OrderedDict = OrderedDict()
+        self._reservations = itertools.count()
+
+    def started(self, session_id: str, now: float):
+        self._last_seen[session_id] = now
+
+    def reserve(self, now: float) -> str:
+        """Hold a slot for an interview being started; ``ended(key)`` gives it back."""
+        key = f"reserved:{next(self._reservations)}"  # never a session id (no ":")
+        self._last_seen[key] = now
+        return key
+
+    def touch(self, session_id: str, now: float):
+        if session_id in self._last_seen:
+            self._last_seen[session_id] = now
+            self._last_seen.move_to_end(session_id)
+
+    def ended(self, session_id: str):
+        self._last_seen.pop(session_id, None)
+
+    def count(self, now: float) -> int:
+        cutoff = now - self.idle_seconds
+        while self._last_seen:
+            oldest = next(iter(self._last_seen.values()))
+            if oldest >= cutoff:
+                break
+            self._last_seen.popitem(last=False)
+        return len(self._last_seen)
+
+
+def classify(method: str, path: str) -> tuple[str | None, str | None]:
+    """(lane, session id) for a request; lane None means the request is not limited."""
+    if path.startswith(SESSION_PREFIX):
+        if path == START_PATH:
+            return (START if method == "POST" else GENERAL), None
+        session_id, _, action = path[len(SESSION_PREFIX):].partition("/")
+        if method == "POST" and action in PRIORITY_ACTIONS:
+            return PRIORITY, session_id
+        return GENERAL, session_id
+    if path.startswith("/ws/"):
+        return PRIORITY, path.rpartition("/")[2]
+    if path == "/" or path.startswith(EXEMPT_PREFIXES):
+        return None, None
+    return GENERAL, None
+
+
+def _body(detail: str) -> bytes:
+    return json.dumps({"detail": detail}).encode()
+
+
+_RATE_LIMITED = _body("Too many requests")
+_FULL = _body("Too many interviews in progress, try again shortly")
+
+
+class Limiter:
+    """Per-IP token buckets per lane plus the global cap on active interviews."""
+
+    def __init__(
+        self,
+        start_rate: float = 0.0,
+        start_burst: float = 5.0,
+        rate: float = 0.0,
+        burst: float = 50.0,
+        priority_rate: float = 0.0,
+        priority_burst: float = 200.0,
+        max_active: int = 0,
+        idle_seconds: float = 300.0,
+        full_retry_after: int = 5,
+        trust_proxy: bool = False,
+        clock=time.monotonic,
+    ):
+        self.buckets = {
+            START: TokenBuckets(start_rate, start_burst) if start_rate > 0 else None,
+            GENERAL: TokenBuckets(rate, burst) if rate > 0 else None,
+            PRIORITY: TokenBuckets(priority_rate, priority_burst) if priority_rate > 0 else None,
+        }
+        self.max_active = max_active
+        self.active = ActiveSessions(idle_seconds)
+        self.full_retry_after = full_retry_after
+        self.trust_proxy = trust_proxy
+        self.clock = clock
+
+    def started(self, session_id: str, scope=None):
+        """Count ``session_id`` as active, in the slot reserved for ``scope``'s request if any."""
+        if scope is not None:
+            self.release(scope)
+        self.active.started(session_id, self.clock())
+
+    def touch(self, session_id: str):
+        """Count activity on ``session_id`` that arrived without a new request."""
+        self.active.touch(session_id, self.clock())
+
+    def ended(self, session_id: str):
+        self.active.ended(session_id)
+
+    def release(self, scope):
+        """Give back the slot reserved for a start request that did not start an interview."""
+        reservation = scope.pop(RESERVATION, None)
+        if reservation is not None:
+            self.active.ended(reservation)
+
+    def _client(self, scope) -> str:
+        if self.trust_proxy:
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    return value.split(b",", 1)[0].strip().decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else ""
+
+    def check(self, scope) -> tuple[int, int, bytes] | None:
+        """None to let the request through, else (status, Retry-After seconds, body)."""
+        lane, session_id = classify(scope.get("method", "GET"), scope["path"])
+        if lane is None:
+            return None
+        now = self.clock()
+        if session_id is not None:
+            self.active.touch(session_id, now)
+        if scope["type"] != "http":
+            return None  # WebSockets only count as activity
+        buckets = self.buckets[lane]
+        if buckets is not None:
+            wait = buckets.take(self._client(scope), now)
+            if wait:
+                LIMITED.inc(lane, "rate")
+                return 429, math.ceil(wait), _RATE_LIMITED
+        if lane == START and self.max_active:
+            if self.active.count(now) >= self.max_active:
+                LIMITED.inc(lane, "capacity")
+                return 503, self.full_retry_after, _FULL
+            scope[RESERVATION] = self.active.reserve(now)
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "active_interviews": self.active.count(self.clock()),
+            "max_active": self.max_active,
+            "tracked_clients": {
+                lane: len(buckets) for lane, buckets in self.buckets.items() if buckets is not None
+            },
+        }
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying a ``Limiter`` before routing."""
+
+    def __init__(self, app, limiter: Limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            rejected = self.limiter.check(scope)
+            if rejected is not None:
+                status, retry_after, body = rejected
+                await send({
+                    "type": "http.response.start",
+                    "status": status,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"retry-after", str(retry_after).encode()),
+                    ],
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(scope)
+
+
+def create_limiter() -> Limiter:
+    """Build the limiter from RATE_LIMIT_* / MAX_ACTIVE_SESSIONS (all limits off by default)."""
+    env = os.getenv
+    return Limiter(
+        start_rate=float(env("RATE_LIMIT_START_RATE", "0")),
+        start_burst=float(env("RATE_LIMIT_START_BURST", "5")),
+        rate=float(env("RATE_LIMIT_RATE", "0")),
+        burst=float(env("RATE_LIMIT_BURST", "50")),
+        priority_rate=float(env("RATE_LIMIT_PRIORITY_RATE", "0")),
+        priority_burst=float(env("RATE_LIMIT_PRIORITY_BURST", "200")),
+        max_active=int(env("MAX_ACTIVE_SESSIONS", "0")),
+        idle_seconds=float(env("ACTIVE_SESSION_IDLE_SECONDS", "300")),
+        trust_proxy=env("RATE_LIMIT_TRUST_PROXY", "").lower() in ("1", "true", "yes", "on"),
+    )
@@ -0,0 +1,373 @@
+"""Prometheus-style metrics and a sampling profiler for slow requests.
+
+Metrics are plain in-process counters updated from the event loop (no locks;
+with several uvicorn workers each process exposes its own values, which is
+how Prometheus expects to scrape them). ``render()`` produces the text
+exposition format served on ``/metrics``.
+
+The profiler is off by default. Once enabled, a background thread samples
+the coroutine stack of every request that has been running longer than the
+threshold and aggregates them as collapsed stacks (one ``frame;frame count``
+line per stack, the input format of flamegraph tools).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import math
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: tuple) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return labels
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, or is read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = {}
+        self._function = None
+
+    def set(self, value: float, *labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set_function(self, function):
+        """Read the (unlabelled) value from ``function()`` whenever metrics are rendered."""
+        self._function = function
+
+    def value(self, *labels) -> float:
+        if self._function is not None:
+            return self._function()
+        return self._values.get(labels, 0)
+
+    def _samples(self) -> list[str]:
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Bucketed distribution with a running sum and count per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: tuple = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last one is +Inf), sum, count].
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[self._key(labels)] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.",
+    ("method", "route", "status"),
+)
+SESSIONS_ACTIVE = Gauge(
+    "interview_sessions_active", "Interviews started on this worker and not yet ended or idle."
+)
+SESSIONS_STORED = Gauge("interview_sessions_stored", "Sessions held by the session store.")
+SIGNED_URL_SECONDS = Histogram(
+    "elevenlabs_signed_url_duration_seconds", "Upstream get-signed-url latency."
+)
+SIGNED_URL_ERRORS = Counter(
+    "elevenlabs_signed_url_errors_total", "Failed get-signed-url calls by cause.", ("reason",)
+)
+SIGNED_URL_SOURCE = Counter(
+    "interview_signed_url_source_total",
+    "How session starts got their connection: pool, upstream or public agent_id fallback.",
+    ("source",),
+)
+FEEDBACK_SECONDS = Histogram(
+    "interview_feedback_duration_seconds", "Time to generate session feedback.",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+TRANSCRIPT_MESSAGES = Histogram(
+    "interview_transcript_messages", "Transcript length in messages at session end.",
+    buckets=(5, 10, 20, 50, 100, 200, 500, 1000, 5000),
+)
+TRANSCRIPT_BYTES = Histogram(
+    "interview_transcript_bytes", "Approximate session size in bytes at session end.",
+    buckets=(1e3, 5e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6),
+)
+
+
+class SlowRequestProfiler:
+    """Samples the coroutine stacks of requests running longer than ``threshold`` seconds."""
+
+    def __init__(self, threshold: float = 0.5, interval: float = 0.01, max_depth: int = 64):
+        self.threshold = threshold
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: _Tally = _Tally()
+        self.samples = 0
+        self._inflight: dict[int, tuple[float, str, asyncio.Task, int]] = {}
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def enable(self, threshold: float | None = None, interval: float | None = None):
+        if threshold is not None:
+            self.threshold = threshold
+        if interval is not None:
+            self.interval = interval
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="slow-profiler", daemon=True)
+            self._thread.start()
+
+    def disable(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self._inflight.clear()
+
+    def reset(self):
+        self.stacks.clear()
+        self.samples = 0
+
+    def begin(self, route: str) -> int | None:
+        """Register the current request; returns a token for ``end``."""
+        task = asyncio.current_task()
+        if task is None:
+            return None
+        token = id(task)
+        self._inflight[token] = (time.monotonic(), route, task, threading.get_ident())
+        return token
+
+    def end(self, token: int | None):
+        if token is not None:
+            self._inflight.pop(token, None)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            cutoff = time.monotonic() - self.threshold
+            for started, route, task, thread_id in list(self._inflight.values()):
+                if started <= cutoff:
+                    self._sample(route, task, thread_id)
+
+    def _sample(self, route: str, task: asyncio.Task, thread_id: int):
+        frames = []
+        coro = task.get_coro()
+        # Follow the await chain: Task.get_stack() stops at the outermost coroutine.
+        while len(frames) < self.max_depth:
+            if hasattr(coro, "cr_frame"):
+                frame, awaiting = coro.cr_frame, coro.cr_await
+            elif hasattr(coro, "gi_frame"):
+                frame, awaiting = coro.gi_frame, coro.gi_yieldfrom
+            else:
+                break  # a Future or other awaitable: the bottom of the chain
+            if frame is None:
+                return  # finished while we were looking
+            frames.append(frame)
+            coro = awaiting
+        if frames and getattr(task.get_coro(), "cr_running", False):
+            # Running right now: add the synchronous calls below the innermost coroutine.
+            current = sys._current_frames().get(thread_id)
+            below = []
+            while current is not None and current is not frames[-1]:
+                below.append(current)
+                current = current.f_back
+            if current is not None:
+                frames.extend(reversed(below))
+        parts = [route]
+        for frame in frames[:self.max_depth]:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+        self.stacks[";".join(parts)] += 1
+        self.samples += 1
+
+    def report(self) -> str:
+        """Collapsed stacks, most frequent first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+profiler = SlowRequestProfiler()
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route template."""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: dict | None = None
+
+    def _route_path(self, scope) -> str:
+        if self._routes is None:
+            router = scope.get("router")
+            if router is None:
+                return "unmatched"
+            # Mounts (static files) have no endpoint; their app stands in for it.
+            self._routes = {
+                getattr(route, "endpoint", None) or getattr(route, "app", None): route.path
+                for route in router.routes
+            }
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        return self._routes.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = profiler.begin(scope["path"]) if profiler.enabled else None
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.end(token)
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started, scope["method"], self._route_path(scope), str(status)
+            )
@@ -1,72 +1,121 @@
-"""Core visa interview questions bank."""
-
-VISA_QUESTIONS = [
-    {
-        "id": 1,
-        "question_en": "Why have you chosen to study in this country instead of studying in India?",
-        "hint_hi": "Aapne is desh mein padhne ka faisla kyun kiya? India mein kyun nahi padh rahe?",
-        "category": "study_plans",
-        "follow_ups": [
-            "What specific program have you been accepted into?",
-            "How did you hear about this university?",
-        ],
-    },
-    {
-        "id": 2,
-        "question_en": "How will you fund your education and living expenses?",
-        "hint_hi": "Aap apni padhai aur rehne ka kharcha kaise uthayenge? Kaun pay karega?",
-        "category": "financial",
-        "follow_ups": [
-            "Do you have a scholarship or education loan?",
-            "What is your family's annual income?",
-        ],
-    },
-    {
-        "id": 3,
-        "question_en": "What are your plans after completing your studies? Will you return to India?",
-        "hint_hi": "Padhai khatam hone ke baad aap kya karenge? Kya aap India wapas aayenge?",
-        "category": "return_intent",
-        "follow_ups": [
-            "Do you have any family ties in the destination country?",
-            "What job opportunities exist for you back in India?",
-        ],
-    },
-    {
-        "id": 4,
-        "question_en": "Can you tell me about your academic background and how it relates to your chosen course?",
-        "hint_hi": "Apni padhai ke baare mein bataiye aur yeh course aapke liye kaise relevant hai?",
-        "category": "academic",
-        "follow_ups": [
-            "What was your percentage or GPA in your last qualification?",
-            "Have you done any internships or projects in this field?",
-        ],
-    },
-    {
-        "id": 5,
-        "question_en": "Have you taken any English proficiency tests like IELTS or TOEFL? What was your score?",
-        "hint_hi": "Kya aapne IELTS ya TOEFL diya hai? Kitne marks aaye the?",
-        "category": "english_proficiency",
-        "follow_ups": [
-            "Which section did you find most challenging?",
-            "How long have you been preparing for this interview?",
-        ],
-    },
-]
+"""Core visa interview questions bank.
+
+Questions live in a JSON file (``server/data/questions.json`` by default,
+override with QUESTION_BANK_PATH) and are indexed by ID, category and country
+when loaded. The file is re-read when its mtime changes, so the bank can be
+edited without restarting the server.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUESTION_BANK_PATH = os.path.join(os.path.dirname(__file__), "data", "questions.json")
+REQUIRED_FIELDS = ("id", "question_en", "hint_hi", "category", "follow_ups")
+ANY_COUNTRY = "any"
+
+
+class QuestionBank:
+    """Question bank loaded from a JSON file with prebuilt lookup indexes."""
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._mtime_ns = None
+        self._next_check = 0.0
+        self.load()
+
+    def load(self):
+        """Read the file and rebuild every index."""
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        data = json.loads(raw)
+
+        questions = data["questions"]
+        by_id = {}
+        by_category: dict[str, list] = {}
+        by_country: dict[str, list] = {ANY_COUNTRY: []}
+        for q in questions:
+            missing = [name for name in REQUIRED_FIELDS if name not in q]
+            if missing:
+                raise ValueError(f"Question {q.get('id')!r} is missing {', '.join(missing)}")
+            if q["id"] in by_id:
+                raise ValueError(f"Duplicate question id {q['id']!r}")
+            q.setdefault("country", ANY_COUNTRY)
+            by_id[q["id"]] = q
+            by_category.setdefault(q["category"], []).append(q)
+            by_country.setdefault(q["country"], []).append(q)
+        # Country-specific lists also carry the questions that apply everywhere.
+        for country, country_questions in by_country.items():
+            if country != ANY_COUNTRY:
+                country_questions.extend(by_country[ANY_COUNTRY])
+
+        self.questions = questions
+        self.by_id = by_id
+        self.by_category = by_category
+        self.by_country = by_country
+        self.category_labels = data.get("categories", {})
+        self.version = hashlib.sha256(raw).hexdigest()[:16]
+        self._mtime_ns = mtime_ns
+
+    def current(self) -> "QuestionBank":
+        """Reload if the file changed (checked at most every ``check_interval`` s)."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            try:
+                changed = os.stat(self.path).st_mtime_ns != self._mtime_ns
+                if changed:
+                    self.load()
+            except (OSError, ValueError, KeyError) as exc:
+                logger.warning("Keeping previous question bank; reload failed: %s", exc)
+        return self
+
+
+question_bank = QuestionBank(
+    os.getenv("QUESTION_BANK_PATH", DEFAULT_QUESTION_BANK_PATH),
+    check_interval=float(os.getenv("QUESTION_BANK_CHECK_INTERVAL", "1.0")),
+)
+
+
+def __getattr__(name):
+    # VISA_QUESTIONS used to be a module constant; keep it pointing at the live bank.
+    if name == "VISA_QUESTIONS":
+        return question_bank.current().questions
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_all_questions():
     """Return all visa questions."""
-    return VISA_QUESTIONS
+    return question_bank.current().questions
 
 
 def get_question_by_id(question_id: int):
     """Return a specific question by ID."""
-    for q in VISA_QUESTIONS:
-        if q["id"] == question_id:
-            return q
-    return None
+    return question_bank.current().by_id.get(question_id)
 
 
 def get_questions_by_category(category: str):
     """Return questions filtered by category."""
-    return [q for q in VISA_QUESTIONS if q["category"] == category]
+    return question_bank.current().by_category.get(category, [])
+
+
+def get_questions_by_country(country: str):
+    """Return questions for a destination country, including ones that apply everywhere."""
+    bank = question_bank.current()
+    return bank.by_country.get(country, bank.by_country[ANY_COUNTRY])
+
+
+def get_category_label(category: str) -> str:
+    """Return the human-readable name of a category."""
+    return question_bank.current().category_labels.get(category, "general")
+
+
+def get_question_bank_version() -> str:
+    """Return a short content hash of the question bank."""
+    return question_bank.current().version
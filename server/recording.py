@@ -0,0 +1,372 @@
+"""Chunked on-disk recording of local voice mode audio, with indexed playback.
+
+Student audio from ``/ws/audio`` (16 kHz mono PCM16) is written per session
+to ``<RECORDING_DIR>/<session id>.wav`` in fixed-size chunks. The WebSocket
+handler only appends frames to an in-memory buffer; each full chunk is
+queued for a background writer thread, so recording never waits on the disk.
+When the socket closes, the last chunk is padded with silence to full size,
+and a reconnect appends to the same file.
+
+``<session id>.idx`` holds the wall-clock time at which each chunk's first
+sample was captured, as float64s after a small header. Chunk ``i`` starts at
+byte ``44 + i * chunk_bytes`` of the WAV file, so a transcript timestamp
+maps to a byte offset with one binary search.
+
+Playback maps the file with ``mmap`` and serves single HTTP byte ranges
+from it, so seeking to an utterance touches only that utterance's pages. The
+44-byte WAV header is generated at serving time with the sizes of that
+moment, so a recording still in progress is playable too.
+
+Playback needs the session, so a recording is only reachable while the
+session store holds it. With ``max_age`` set, the writer thread deletes
+recordings not written to for that long, at startup and every
+``sweep_interval`` seconds after that.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+from server import metrics
+from server.stt import SAMPLE_RATE
+
+WAV_HEADER_BYTES = 44
+# One second of 16 kHz PCM16 audio.
+DEFAULT_CHUNK_BYTES = 32_000
+# Audio kept after a student message's timestamp (the recognizer finalizes slightly late).
+UTTERANCE_TAIL_SECONDS = 0.5
+READ_BLOCK_BYTES = 64 * 1024
+
+_INDEX_HEADER = struct.Struct("<4sII")  # magic, sample rate, chunk bytes
+_INDEX_MAGIC = b"RIDX"
+_TIMESTAMP = struct.Struct("<d")
+_SESSION_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+_SWEEP = (None, None, b"")  # queue entry asking the writer to delete expired recordings
+
+RECORDED_BYTES = metrics.Counter(
+    "interview_recorded_audio_bytes_total", "Student audio bytes queued for recording.",
+)
+
+
+def wav_header(data_bytes: int, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Header of a mono PCM16 WAV file holding ``data_bytes`` of samples."""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", data_bytes,
+    )
+
+
+class SessionRecording:
+    """Write side of one session's recording; used from the event loop only."""
+
+    def __init__(self, recorder: "AudioRecorder", session_id: str):
+        self.recorder = recorder
+        self.session_id = session_id
+        self._buffer = bytearray()
+        self._chunk_started = 0.0
+
+    def write(self, frame: bytes, now: float | None = None):
+        """Append a frame of audio that finished arriving at ``now``."""
+        now = time.time() if now is None else now
+        chunk_bytes = self.recorder.chunk_bytes
+        byte_rate = self.recorder.sample_rate * 2
+        pos = 0
+        while pos < len(frame):
+            if not self._buffer:
+                self._chunk_started = now - (len(frame) - pos) / byte_rate
+            take = min(chunk_bytes - len(self._buffer), len(frame) - pos)
+            self._buffer += frame[pos:pos + take]
+            pos += take
+            if len(self._buffer) == chunk_bytes:
+                self.recorder._enqueue(self.session_id, self._chunk_started, bytes(self._buffer))
+                self._buffer.clear()
+        RECORDED_BYTES.inc(amount=len(frame))
+
+    def close(self):
+        """Queue the buffered audio, padded with silence to a whole chunk, and close the file."""
+        if self._buffer:
+            self._buffer += bytes(self.recorder.chunk_bytes - len(self._buffer))
+            self.recorder._enqueue(self.session_id, self._chunk_started, bytes(self._buffer))
+            self._buffer.clear()
+        self.recorder._enqueue(self.session_id, None, b"")
+
+
+class Playback:
+    """Read side of a recording: a memory-mapped WAV file and its chunk time index."""
+
+    def __init__(self, wav_path: str, index_path: str):
+        with open(index_path, "rb") as f:
+            index = f.read()
+        magic, self.sample_rate, self.chunk_bytes = _INDEX_HEADER.unpack_from(index)
+        if magic != _INDEX_MAGIC:
+            raise ValueError(f"Not a recording index: {index_path}")
+        self._file = open(wav_path, "rb")
+        file_bytes = os.fstat(self._file.fileno()).st_size
+        # Only whole chunks that are both written and indexed.
+        chunks = min(
+            (len(index) - _INDEX_HEADER.size) // _TIMESTAMP.size,
+            max(0, file_bytes - WAV_HEADER_BYTES) // self.chunk_bytes,
+        )
+        start = _INDEX_HEADER.size
+        self.times = memoryview(index)[start:start + chunks * _TIMESTAMP.size].cast("d")
+        self.data_bytes = chunks * self.chunk_bytes
+        self.size = WAV_HEADER_BYTES + self.data_bytes
+        self._map = mmap.mmap(self._file.fileno(), self.size, access=mmap.ACCESS_READ) if chunks else None
+
+    def offset_at(self, timestamp: float) -> int:
+        """Byte offset in the served file of the audio captured at ``timestamp``."""
+        chunk = bisect.bisect_right(self.times, timestamp) - 1
+        if chunk < 0:
+            return WAV_HEADER_BYTES
+        into = round((timestamp - self.times[chunk]) * self.sample_rate) * 2
+        return WAV_HEADER_BYTES + chunk * self.chunk_bytes + max(0, min(into, self.chunk_bytes))
+
+    def utterances(self, session) -> list[dict]:
+        """Byte ranges of the student's messages, each from the entry before it to its end."""
+        result = []
+        previous = session.start_time
+        for index, entry in enumerate(session.transcript.iter_live()):
+            if entry["role"] == "student":
+                start = self.offset_at(previous)
+                stop = min(self.size, self.offset_at(entry["timestamp"] + UTTERANCE_TAIL_SECONDS))
+                result.append({
+                    "index": index,
+                    "text": entry["text"],
+                    "timestamp": entry["timestamp"],
+                    "start": start,
+                    "stop": max(start, stop),
+                    "seconds": round((start - WAV_HEADER_BYTES) / (self.sample_rate * 2), 3),
+                })
+            previous = entry["timestamp"]
+        return result
+
+    def iter_bytes(self, start: int, stop: int):
+        """Bytes ``start``..``stop`` (exclusive) of the served file; closes the mapping at the end."""
+        try:
+            if start < WAV_HEADER_BYTES:
+                yield wav_header(self.data_bytes, self.sample_rate)[start:min(stop, WAV_HEADER_BYTES)]
+                start = WAV_HEADER_BYTES
+            while start < stop:
+                end = min(stop, start + READ_BLOCK_BYTES)
+                yield self._map[start:end]
+                start = end
+        finally:
+            self.close()
+
+    def close(self):
+        """Release the mapping and the file; safe to call more than once."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+def parse_range(value: str | None, size: int) -> tuple[int, int] | None:
+    """(start, stop) for a single ``bytes=`` Range header, None to send the whole file.
+
+    Malformed and multi-range headers are ignored; raises ValueError when the
+    range cannot be satisfied.
+    """
+    if not value or not value.startswith("bytes="):
+        return None
+    first, dash, last = value[len("bytes="):].strip().partition("-")
+    if not dash or not (first or last) or not all(p.isdigit() for p in (first, last) if p):
+        return None
+    if not first:
+        if int(last) == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - int(last)), size
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError(f"range {value!r} starts past {size} bytes")
+    return start, min(size, int(last) + 1) if last else size
+
+
+class AudioRecorder:
+    """Per-session chunked WAV files written by one background thread."""
+
+    def __init__(
+        self,
+        directory: str,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+        sample_rate: int = SAMPLE_RATE,
+        max_age: float | None = None,
+        sweep_interval: float = 300.0,
+    ):
+        self.directory = directory
+        self.chunk_bytes = max(2, chunk_bytes - chunk_bytes % 2)
+        self.sample_rate = sample_rate
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self.stats = {"chunks": 0, "bytes": 0, "expired": 0}
+        self._queue: list[tuple[str, float | None, bytes]] = []
+        self._cond = threading.Condition()
+        self._stop = False
+        self._queued = 0
+        self._written = 0
+        self._files: dict[str, tuple] = {}  # session id -> (wav file, index file); writer thread only
+        self._writer: threading.Thread | None = None
+        os.makedirs(directory, exist_ok=True)
+        if max_age:
+            self.expire()  # recordings left by earlier runs
+
+    def _paths(self, session_id: str) -> tuple[str, str] | None:
+        if not _SESSION_ID.fullmatch(session_id):
+            return None
+        base = os.path.join(self.directory, session_id)
+        return f"{base}.wav", f"{base}.idx"
+
+    def open(self, session_id: str) -> SessionRecording:
+        if self._paths(session_id) is None:
+            raise ValueError(f"Invalid session id for a recording: {session_id!r}")
+        return SessionRecording(self, session_id)
+
+    def open_playback(self, session_id: str) -> Playback | None:
+        """The session's recording, or None if nothing has been recorded for it."""
+        paths = self._paths(session_id)
+        if paths is None or not os.path.exists(paths[1]):
+            return None
+        try:
+            return Playback(*paths)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def expire(self):
+        """Queue deletion of recordings older than ``max_age``; ``flush`` waits for it."""
+        self._enqueue(*_SWEEP)
+
+    def _enqueue(self, session_id: str | None, started: float | None, data: bytes):
+        """Queue a chunk starting at ``started``; ``started`` None closes the session's files."""
+        with self._cond:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="recording-writer", daemon=True)
+                self._writer.start()
+            self._queue.append((session_id, started, data))
+            self._queued += 1
+            self._cond.notify()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far is written."""
+        with self._cond:
+            target = self._queued
+            return self._cond.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+
+    def _run(self):
+        timeout = self.sweep_interval if self.max_age else None
+        while True:
+            with self._cond:
+                while not self._queue and not self._stop:
+                    if not self._cond.wait(timeout):
+                        self._queue.append(_SWEEP)
+                        self._queued += 1
+                batch, self._queue = self._queue, []
+                stopping = self._stop
+            self._write(batch)
+            with self._cond:
+                self._written += len(batch)
+                self._cond.notify_all()
+            if stopping and not batch:
+                for session_id in list(self._files):
+                    self._close_files(session_id)
+                return
+
+    def _write(self, batch: list[tuple[str, float | None, bytes]]):
+        touched = set()
+        for session_id, started, data in batch:
+            if session_id is None:
+                self._expire()
+                continue
+            if started is None:
+                self._close_files(session_id)
+                touched.discard(session_id)
+                continue
+            wav, index = self._files.get(session_id) or self._open_files(session_id)
+            wav.write(data)
+            index.write(_TIMESTAMP.pack(started))
+            touched.add(session_id)
+            self.stats["chunks"] += 1
+            self.stats["bytes"] += len(data)
+        for session_id in touched:
+            wav, index = self._files[session_id]
+            wav.flush()  # audio before its index entry, so readers never index past the data
+            index.flush()
+
+    def _expire(self):
+        if not self.max_age:
+            return
+        cutoff = time.time() - self.max_age
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                session_id, extension = os.path.splitext(entry.name)
+                if extension != ".idx" or session_id in self._files:
+                    continue
+                try:
+                    if entry.stat().st_mtime >= cutoff:
+                        continue
+                    os.remove(entry.path)  # index first: playback needs it to find the audio
+                except FileNotFoundError:
+                    continue
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.directory, f"{session_id}.wav"))
+                self.stats["expired"] += 1
+
+    def _open_files(self, session_id: str) -> tuple:
+        wav_path, index_path = self._paths(session_id)
+        if os.path.exists(index_path):
+            wav = open(wav_path, "r+b")
+            wav.seek(0, os.SEEK_END)
+        else:
+            wav = open(wav_path, "w+b")
+            wav.write(wav_header(0, self.sample_rate))
+            with open(index_path, "wb") as f:
+                f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, self.sample_rate, self.chunk_bytes))
+        index = open(index_path, "ab")
+        self._files[session_id] = (wav, index)
+        return wav, index
+
+    def _close_files(self, session_id: str):
+        files = self._files.pop(session_id, None)
+        if files is None:
+            return
+        wav, index = files
+        data_bytes = wav.seek(0, os.SEEK_END) - WAV_HEADER_BYTES
+        wav.seek(0)
+        wav.write(wav_header(data_bytes, self.sample_rate))  # so the file plays on its own
+        wav.close()
+        index.close()
+
+
+def create_audio_recorder() -> AudioRecorder | None:
+    """Build the recorder configured by RECORDING_DIR (None when recording is off).
+
+    Recordings are kept for RECORDING_MAX_AGE seconds, by default as long as an
+    idle session stays in the store (SESSION_IDLE_TTL); 0 keeps them forever.
+    """
+    directory = os.getenv("RECORDING_DIR")
+    if not directory:
+        return None
+    max_age = float(os.getenv("RECORDING_MAX_AGE") or os.getenv("SESSION_IDLE_TTL", "3600"))
+    return AudioRecorder(
+        directory,
+        chunk_bytes=int(os.getenv("RECORDING_CHUNK_BYTES", str(DEFAULT_CHUNK_BYTES))),
+        max_age=max_age or None,
+    )
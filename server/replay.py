@@ -0,0 +1,195 @@
+"""Replay of recorded sessions through the ingestion path, at recorded pace or faster.
+
+A recording is a session export (see ``server.export``): a ``session``
+header followed by its messages and switches in time order, as NDJSON,
+optionally gzipped. Replays feed the recording back the way a client sent it:
+
+* switches that ingestion derives from a student message (reasons starting
+  ``confusion:`` or ``hindi request:``) are dropped, since replaying the
+  message regenerates them;
+* an officer line asking a bank question (or one of its follow-ups) is
+  preceded by a ``question`` event, as the client marks questions live;
+* events are grouped into the batches a client would have posted together,
+  and each batch is released at its recorded offset divided by ``speed``
+  (0 replays as fast as possible).
+
+``rebuild`` replays a recording in-process with its original timestamps,
+so the feedback it produces is deterministic and can be compared across
+code changes; ``replay_http`` drives the session API instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+from typing import AsyncIterator, Iterable, Iterator, NamedTuple
+
+from server.agent import SessionLog
+from server.detector import annotate_events
+from server.scoring import match_question
+
+# Events recorded within this many seconds of a batch's first event are sent with it.
+BATCH_WINDOW = 0.5
+DERIVED_SWITCH_REASONS = ("confusion: ", "hindi request: ")
+
+
+class Recording(NamedTuple):
+    session_id: str
+    student_id: str | None
+    start_time: float
+    end_time: float | None
+    questions_asked: list
+    records: list  # message and switch records, in time order
+    question_plan: tuple = ()  # exports from before plans were recorded have none
+
+
+def read_recordings(lines: Iterable[bytes | str]) -> Iterator[Recording]:
+    """Recordings in an NDJSON export (``page`` trailers and blank lines are skipped)."""
+    header = None
+    records: list[dict] = []
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        kind = record["type"]
+        if kind == "session":
+            if header is not None:
+                yield _recording(header, records)
+            header, records = record, []
+        elif kind in ("message", "switch"):
+            if header is None or record["session_id"] != header["session_id"]:
+                raise ValueError(f"{kind} record outside its session: {record['session_id']!r}")
+            records.append(record)
+    if header is not None:
+        yield _recording(header, records)
+
+
+def _recording(header: dict, records: list) -> Recording:
+    return Recording(
+        session_id=header["session_id"],
+        student_id=header.get("student_id"),
+        start_time=header["start_time"],
+        end_time=header["end_time"],
+        questions_asked=list(header.get("questions_asked", ())),
+        records=records,
+        question_plan=tuple(header.get("question_plan", ())),
+    )
+
+
+def load_recordings(path: str) -> list[Recording]:
+    """Read an export file; gzip is recognised by its magic bytes."""
+    with open(path, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+    with (gzip.open(path, "rb") if compressed else open(path, "rb")) as f:
+        return list(read_recordings(f))
+
+
+def replay_events(recording: Recording) -> list[dict]:
+    """The events a client sent for the recording, with their recorded timestamps."""
+    events = []
+    current = None
+    for record in recording.records:
+        timestamp = record["timestamp"]
+        if record["type"] == "switch":
+            if not record["reason"].startswith(DERIVED_SWITCH_REASONS):
+                events.append({
+                    "type": "switch",
+                    "question_id": record["question_id"],
+                    "reason": record["reason"],
+                    "timestamp": timestamp,
+                })
+            continue
+        if record["role"] != "student":
+            asked = match_question(record["text"])
+            if asked is not None and asked[0] != current:
+                current = asked[0]
+                events.append({"type": "question", "question_id": current, "timestamp": timestamp})
+        events.append({
+            "type": "message",
+            "role": record["role"],
+            "text": record["text"],
+            "language": record["language"],
+            "timestamp": timestamp,
+        })
+    return events
+
+
+def batches(recording: Recording, window: float = BATCH_WINDOW) -> list[tuple[float, list[dict]]]:
+    """(offset from session start in seconds, events) for each request a client sent."""
+    grouped: list[tuple[float, list[dict]]] = []
+    first = None
+    for event in replay_events(recording):
+        timestamp = event["timestamp"]
+        if first is None or timestamp - first > window:
+            first = timestamp
+            grouped.append((max(0.0, timestamp - recording.start_time), []))
+        grouped[-1][1].append(event)
+    return grouped
+
+
+def duration(recording: Recording) -> float:
+    """Recorded length in seconds (up to the last event for sessions never ended)."""
+    end = recording.end_time
+    if end is None:
+        end = recording.records[-1]["timestamp"] if recording.records else recording.start_time
+    return max(0.0, end - recording.start_time)
+
+
+async def paced(
+    grouped: list[tuple[float, list[dict]]], speed: float = 1.0
+) -> AsyncIterator[list[dict]]:
+    """Yield each batch once ``offset / speed`` seconds have passed (at once if speed is 0)."""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for offset, events in grouped:
+        if speed > 0:
+            delay = started + offset / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield events
+
+
+def rebuild(recording: Recording) -> SessionLog:
+    """The session as ingestion builds it from the recording, with recorded timestamps."""
+    session = SessionLog(
+        session_id=recording.session_id,
+        student_id=recording.student_id,
+        start_time=recording.start_time,
+        questions_asked=list(recording.questions_asked),
+        question_plan=list(recording.question_plan),
+    )
+    session.add_events(annotate_events(session, replay_events(recording)))
+    session.end_time = recording.start_time + duration(recording)
+    return session
+
+
+async def _request(client, name: str, method: str, url: str, **kwargs):
+    return await client.request(method, url, **kwargs)
+
+
+async def replay_http(client, recording: Recording, speed: float = 1.0, call=_request) -> dict | None:
+    """Replay against the session API; returns the feedback from ``/end`` (None on failure).
+
+    ``call(client, name, method, url, **kwargs)`` lets a caller time each
+    request (see ``benchmarks.loadgen.Recorder.call``); it returns the
+    response, or None on a transport error.
+    """
+    params = {"student_id": recording.student_id} if recording.student_id else {}
+    response = await call(client, "POST /api/session/start", "POST", "/api/session/start", params=params)
+    if response is None or response.status_code != 200:
+        return None
+    base = f"/api/session/{response.json()['session_id']}"
+    grouped = batches(recording)
+    async for events in paced(grouped, speed):
+        body = [{k: v for k, v in event.items() if k != "timestamp"} for event in events]
+        await call(client, "POST /api/session/{id}/events", "POST", f"{base}/events", json=body)
+    if speed > 0:
+        # The silence between the last event and the end is part of the recording too.
+        remaining = duration(recording) - (grouped[-1][0] if grouped else 0.0)
+        if remaining > 0:
+            await asyncio.sleep(remaining / speed)
+    response = await call(client, "POST /api/session/{id}/end", "POST", f"{base}/end")
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()
@@ -0,0 +1,255 @@
+"""Adaptive question plans built from each student's weakness history.
+
+Every student has a small ``StudentStats`` record: a decayed weakness score
+per category and a review queue of the questions they struggled with
+(needed Hindi help on, or answered poorly). The queue is a heap with lazy
+invalidation, so recording a finished session only pushes the questions
+that changed.
+
+A plan takes the top of the review queue first and fills the remaining
+slots category by category, drawing categories with probability
+proportional to ``1 + weakness``. Within a category, questions come from a
+per-student cursor into a shuffled rotation of the bank's questions, so
+students keep seeing fresh questions. Building a plan costs
+O(plan size x categories), independent of how many questions or students
+there are. Stats live in this process (like analytics), for at most ``max_students``
+students (least recently seen dropped first), and are saved to
+SCHEDULER_PATH on shutdown.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import os
+import random
+from collections import OrderedDict
+
+from server.questions import question_bank
+
+logger = logging.getLogger(__name__)
+
+PLAN_SIZE = 8
+# Share of a plan that may be spent re-asking questions from the review queue.
+REVIEW_SHARE = 0.5
+# Weight of old evidence after each session (weakness and review priorities).
+DECAY = 0.7
+# Struggle added per language switch on a question.
+SWITCH_WEIGHT = 1.0
+# Review entries below this priority are considered mastered and dropped.
+MIN_PRIORITY = 0.1
+REVIEW_CAP = 64
+# Students kept; the least recently seen are forgotten beyond this.
+MAX_STUDENTS = 100_000
+
+
+class StudentStats:
+    """Weakness history of one student."""
+
+    __slots__ = ("sessions", "weakness", "priority", "_heap", "cursors")
+
+    def __init__(self):
+        self.sessions = 0
+        self.weakness: dict[str, float] = {}
+        self.priority: dict[int, float] = {}  # review queue: question id -> priority
+        self._heap: list[tuple[float, int]] = []  # (-priority, question id), may hold stale entries
+        self.cursors: dict[str, int] = {}
+
+    def set_priority(self, question_id: int, priority: float):
+        if priority < MIN_PRIORITY:
+            self.priority.pop(question_id, None)
+            return
+        self.priority[question_id] = priority
+        heapq.heappush(self._heap, (-priority, question_id))
+        if len(self.priority) > REVIEW_CAP:
+            weakest = min(self.priority, key=self.priority.get)
+            del self.priority[weakest]
+        if len(self._heap) > 2 * len(self.priority) + 16:
+            self._heap = [(-p, qid) for qid, p in self.priority.items()]
+            heapq.heapify(self._heap)
+
+    def top_review(self, count: int) -> list[int]:
+        """The ``count`` highest-priority review questions (the queue is left intact)."""
+        taken = []
+        seen = set()
+        while self._heap and len(taken) < count:
+            entry = heapq.heappop(self._heap)
+            if entry[1] not in seen and self.priority.get(entry[1]) == -entry[0]:
+                seen.add(entry[1])
+                taken.append(entry)
+        for entry in taken:
+            heapq.heappush(self._heap, entry)
+        return [qid for _, qid in taken]
+
+    def to_json(self) -> dict:
+        return {
+            "sessions": self.sessions,
+            "weakness": self.weakness,
+            "priority": {str(qid): p for qid, p in self.priority.items()},
+            "cursors": self.cursors,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "StudentStats":
+        stats = cls()
+        stats.sessions = data.get("sessions", 0)
+        stats.weakness = dict(data.get("weakness", {}))
+        stats.cursors = dict(data.get("cursors", {}))
+        for qid, priority in data.get("priority", {}).items():
+            stats.set_priority(int(qid), priority)
+        return stats
+
+
+class _Rotation:
+    """Per-category question orders for one bank version."""
+
+    def __init__(self, bank):
+        self.version = bank.version
+        self.by_id = bank.by_id
+        self.categories: list[str] = []
+        self.orders: dict[str, list[int]] = {}
+        rng = random.Random(bank.version)
+        for q in bank.questions:
+            if q["category"] not in self.orders:
+                self.categories.append(q["category"])
+                self.orders[q["category"]] = []
+            self.orders[q["category"]].append(q["id"])
+        for order in self.orders.values():
+            rng.shuffle(order)
+        self.rank = {category: i for i, category in enumerate(self.categories)}
+
+
+class QuestionScheduler:
+    """Per-student weakness statistics and plan generation."""
+
+    def __init__(
+        self, path: str | None = None, plan_size: int = PLAN_SIZE, rng=None, max_students: int = MAX_STUDENTS,
+    ):
+        self.path = path
+        self.plan_size = plan_size
+        self.rng = rng or random.Random()
+        self.max_students = max_students
+        self.students: OrderedDict[str, StudentStats] = OrderedDict()
+        self._rotation: _Rotation | None = None
+        if path and os.path.exists(path):
+            try:
+                self.load(path)
+            except (OSError, ValueError, KeyError) as exc:
+                logger.warning("Starting with empty scheduler stats; could not load %s: %s", path, exc)
+
+    def _current_rotation(self) -> _Rotation:
+        bank = question_bank.current()
+        if self._rotation is None or self._rotation.version != bank.version:
+            self._rotation = _Rotation(bank)
+        return self._rotation
+
+    def _student(self, student_id: str) -> StudentStats:
+        stats = self.students.get(student_id)
+        if stats is None:
+            stats = self.students[student_id] = StudentStats()
+            if len(self.students) > self.max_students:
+                self.students.popitem(last=False)
+        else:
+            self.students.move_to_end(student_id)
+        return stats
+
+    def plan(self, student_id: str | None = None, size: int | None = None) -> list[int]:
+        """Question IDs for a new session, in interview order (by category)."""
+        rotation = self._current_rotation()
+        size = self.plan_size if size is None else size
+        # A new student gets uniform weights and random rotation starts.
+        stats = self._student(student_id) if student_id else StudentStats()
+
+        chosen: dict[int, int] = {}  # question id -> pick order
+        for qid in stats.top_review(int(size * REVIEW_SHARE)):
+            if qid in rotation.by_id:
+                chosen[qid] = len(chosen)
+
+        remaining = {c: len(order) for c, order in rotation.orders.items()}
+        for qid in chosen:
+            remaining[rotation.by_id[qid]["category"]] -= 1
+        categories = [c for c in rotation.categories if remaining[c] > 0]
+        weights = [1.0 + stats.weakness.get(c, 0.0) for c in categories]
+        while len(chosen) < size and categories:
+            index = self.rng.choices(range(len(categories)), weights)[0]
+            category = categories[index]
+            order = rotation.orders[category]
+            cursor = stats.cursors.get(category)
+            if cursor is None:
+                cursor = self.rng.randrange(len(order))
+            while order[cursor % len(order)] in chosen:
+                cursor += 1
+            chosen[order[cursor % len(order)]] = len(chosen)
+            stats.cursors[category] = (cursor + 1) % len(order)
+            remaining[category] -= 1
+            if not remaining[category]:
+                del categories[index], weights[index]
+
+        def interview_order(qid):
+            return rotation.rank[rotation.by_id[qid]["category"]], chosen[qid]
+
+        return sorted(chosen, key=interview_order)
+
+    def record(self, student_id: str, session, answers=()):
+        """Fold a finished session into the student's stats.
+
+        ``answers`` are the per-question entries of the session feedback's
+        ``answer_quality`` section.
+        """
+        stats = self._student(student_id)
+        stats.sessions += 1
+        by_id = self._current_rotation().by_id
+
+        # Only questions the student actually reached; the rest of the plan says nothing.
+        struggle = {qid: 0.0 for qid in session.question_responses}
+        for qid, switches in session.switch_counts.items():
+            struggle[qid] = struggle.get(qid, 0.0) + SWITCH_WEIGHT * switches
+        for answer in answers:
+            qid = answer["question_id"]
+            if qid is not None:
+                struggle[qid] = struggle.get(qid, 0.0) + 1 - answer["score"]
+
+        per_category: dict[str, list[float]] = {}
+        for qid, amount in struggle.items():
+            question = by_id.get(qid)
+            if question is None:
+                continue  # NO_QUESTION or no longer in the bank
+            per_category.setdefault(question["category"], []).append(amount)
+            stats.set_priority(qid, stats.priority.get(qid, 0.0) * DECAY + amount)
+        for category, amounts in per_category.items():
+            stats.weakness[category] = (
+                stats.weakness.get(category, 0.0) * DECAY + sum(amounts) / len(amounts)
+            )
+
+    def stats(self) -> dict:
+        return {
+            "students": len(self.students),
+            "review_questions": sum(len(s.priority) for s in self.students.values()),
+        }
+
+    def save(self, path: str | None = None):
+        """Write a snapshot (atomically replacing the previous one)."""
+        path = path or self.path
+        if not path:
+            return
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({sid: s.to_json() for sid, s in self.students.items()}, f)
+        os.replace(tmp, path)
+
+    def load(self, path: str):
+        with open(path) as f:
+            data = json.load(f)
+        self.students = OrderedDict((sid, StudentStats.from_json(s)) for sid, s in data.items())
+        while len(self.students) > self.max_students:
+            self.students.popitem(last=False)
+
+
+def create_scheduler() -> QuestionScheduler:
+    """Build the scheduler, restoring the SCHEDULER_PATH snapshot if there is one."""
+    return QuestionScheduler(
+        os.getenv("SCHEDULER_PATH") or None,
+        plan_size=int(os.getenv("SCHEDULER_PLAN_SIZE", str(PLAN_SIZE))),
+        max_students=int(os.getenv("SCHEDULER_MAX_STUDENTS", str(MAX_STUDENTS))),
+    )
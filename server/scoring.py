@@ -0,0 +1,287 @@
+"""Answer-quality scoring of student replies against their question's expectations.
+
+Each question category lists the concepts a good answer covers (a funding
+source, ties to India, the program name, ...) as short phrases. Phrases for
+every category, plus filler words, are compiled once into one word-level
+``PhraseAutomaton`` per category, so scoring an answer is a single pass over
+its tokens.
+
+``score_transcript`` walks a transcript once. Officer lines are matched
+against the question bank (questions and their follow-ups) through an
+inverted token index to find the question being answered; the student's
+replies until the next recognised question are pooled into one answer, which
+is scored on concept coverage, length and filler-word rate.
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple
+
+from server.detector import PhraseAutomaton, tokenize
+from server.questions import get_category_label, question_bank
+
+FILLER = "filler"
+
+# Per category: how many distinct concepts a complete answer mentions, and
+# the phrases that count as mentioning each concept.
+EXPECTATIONS = {
+    "financial": (2, {
+        "funding source": [
+            "father", "mother", "parents", "papa", "family", "uncle", "brother", "sister",
+            "sponsor", "sponsored", "sponsoring", "myself", "my savings", "self funded",
+        ],
+        "loan or scholarship": [
+            "loan", "education loan", "bank loan", "scholarship", "assistantship",
+            "grant", "fellowship", "tuition waiver",
+        ],
+        "amount or proof": [
+            "lakh", "lakhs", "crore", "rupees", "dollars", "income", "salary", "savings",
+            "fixed deposit", "bank statement", "bank balance", "funds", "itr",
+        ],
+    }),
+    "return_intent": (2, {
+        "family ties": [
+            "family", "parents", "father", "mother", "wife", "husband", "siblings",
+            "grandparents", "take care",
+        ],
+        "career in india": [
+            "job", "job offer", "career", "company", "companies", "startup", "business",
+            "family business", "opportunities in india", "indian market", "work in india",
+        ],
+        "assets": ["property", "house", "land", "farm", "own home"],
+        "return plan": [
+            "return", "come back", "go back", "back to india", "after graduation",
+            "after my degree", "after completing", "wapas",
+        ],
+    }),
+    "study_plans": (2, {
+        "program name": [
+            "masters", "master's", "ms", "msc", "mba", "mtech", "bachelors", "bachelor's",
+            "phd", "degree", "program", "programme", "course", "major", "specialization",
+            "computer science", "data science", "engineering", "business analytics",
+        ],
+        "university": ["university", "college", "institute", "school", "campus"],
+        "reason": [
+            "research", "faculty", "ranking", "ranked", "curriculum", "labs", "quality",
+            "opportunities", "exposure", "industry", "internship", "internships",
+        ],
+    }),
+    "academic": (2, {
+        "prior degree": [
+            "btech", "b tech", "bsc", "bcom", "bachelors", "bachelor's",
+            "graduated", "graduation", "degree", "undergraduate",
+        ],
+        "grades": ["cgpa", "gpa", "percentage", "percent", "marks", "grade", "first class"],
+        "field": [
+            "computer science", "engineering", "commerce", "science", "mathematics",
+            "physics", "electronics", "mechanical", "biology", "economics",
+        ],
+    }),
+    "english_proficiency": (2, {
+        "test": ["ielts", "toefl", "pte", "duolingo", "gre", "gmat"],
+        "score": ["score", "scored", "band", "bands", "overall", "points", "marks"],
+        "medium": ["english medium", "medium of instruction", "studied in english"],
+    }),
+}
+
+FILLERS = [
+    "um", "umm", "uh", "uhh", "er", "erm", "hmm", "basically", "actually", "literally",
+    "you know", "i mean", "kind of", "sort of", "so yeah", "like i said", "matlab",
+]
+
+# A pooled answer scores full marks for length between these word counts.
+MIN_WORDS = 12
+MAX_WORDS = 90
+# Filler rate at which the filler component reaches zero.
+MAX_FILLER_RATE = 0.15
+# Weights of coverage, length and filler components.
+WEIGHTS = (0.5, 0.3, 0.2)
+# Share of a bank prompt's tokens an officer line must contain to count as asking it.
+QUESTION_MATCH = 0.6
+
+
+class AnswerScore(NamedTuple):
+    question_id: int | None
+    category: str | None
+    score: float
+    coverage: float | None
+    covered: tuple
+    missing: tuple
+    words: int
+    filler_rate: float
+
+
+def _build_matchers() -> dict:
+    matchers = {}
+    for category, (_, concepts) in EXPECTATIONS.items():
+        matchers[category] = PhraseAutomaton({**concepts, FILLER: FILLERS})
+    matchers[None] = PhraseAutomaton({FILLER: FILLERS})
+    return matchers
+
+
+_matchers = _build_matchers()
+
+
+class _QuestionIndex:
+    """Inverted index from tokens to question-bank prompts, built once per bank version."""
+
+    def __init__(self, questions: list[dict]):
+        self.prompts: list[tuple[int, str, int]] = []  # (question id, category, token count)
+        self.postings: dict[str, list[int]] = {}
+        for q in questions:
+            for text in (q["question_en"], *q["follow_ups"]):
+                tokens = set(tokenize(text))
+                if not tokens:
+                    continue
+                index = len(self.prompts)
+                self.prompts.append((q["id"], q["category"], len(tokens)))
+                for token in tokens:
+                    self.postings.setdefault(token, []).append(index)
+
+    def match(self, tokens: list[str]) -> tuple[int, str] | None:
+        hits: dict[int, int] = {}
+        postings = self.postings
+        for token in set(tokens):
+            for index in postings.get(token, ()):
+                hits[index] = hits.get(index, 0) + 1
+        best, best_share = None, QUESTION_MATCH
+        for index, count in hits.items():
+            share = count / self.prompts[index][2]
+            if share >= best_share:
+                best, best_share = index, share
+        if best is None:
+            return None
+        question_id, category, _ = self.prompts[best]
+        return question_id, category
+
+
+_index_cache: tuple[str, _QuestionIndex] | None = None
+
+
+def _question_index() -> _QuestionIndex:
+    global _index_cache
+    bank = question_bank.current()
+    if _index_cache is None or _index_cache[0] != bank.version:
+        _index_cache = (bank.version, _QuestionIndex(bank.questions))
+    return _index_cache[1]
+
+
+def match_question(text: str) -> tuple[int, str] | None:
+    """(question id, category) of the bank question or follow-up an officer line asks, if any."""
+    return _question_index().match(tokenize(text))
+
+
+def score_answer(tokens: list[str], category: str | None, question_id: int | None = None) -> AnswerScore:
+    """Score one (pooled) answer given as word tokens."""
+    matcher = _matchers.get(category)
+    if matcher is None:
+        category, matcher = None, _matchers[None]
+    fillers = 0
+    concepts = set()
+    for label, _ in matcher.search(tokens):
+        if label == FILLER:
+            fillers += 1
+        else:
+            concepts.add(label)
+
+    words = len(tokens)
+    if words < MIN_WORDS:
+        length = words / MIN_WORDS
+    elif words > MAX_WORDS:
+        length = max(0.5, MAX_WORDS / words)
+    else:
+        length = 1.0
+    filler_rate = fillers / words if words else 0.0
+    fluency = max(0.0, 1 - filler_rate / MAX_FILLER_RATE)
+
+    w_coverage, w_length, w_fluency = WEIGHTS
+    if category is None:
+        coverage = None
+        covered = missing = ()
+        score = (w_length * length + w_fluency * fluency) / (w_length + w_fluency)
+    else:
+        expected, all_concepts = EXPECTATIONS[category]
+        coverage = min(1.0, len(concepts) / expected)
+        covered = tuple(c for c in all_concepts if c in concepts)
+        missing = tuple(c for c in all_concepts if c not in concepts)
+        score = w_coverage * coverage + w_length * length + w_fluency * fluency
+    return AnswerScore(
+        question_id=question_id,
+        category=category,
+        score=round(score, 2),
+        coverage=None if coverage is None else round(coverage, 2),
+        covered=covered,
+        missing=missing,
+        words=words,
+        filler_rate=round(filler_rate, 3),
+    )
+
+
+def score_transcript(transcript) -> list[AnswerScore]:
+    """Score every student answer in ``transcript``, one result per question answered."""
+    index = _question_index()
+    answers: list[tuple[int | None, str | None, list[str]]] = []
+    current: tuple[int | None, str | None] = (None, None)
+    pooled: list[str] | None = None
+    for entry in transcript.iter_live():
+        tokens = tokenize(entry["text"])
+        if entry["role"] == "student":
+            if pooled is None:
+                pooled = []
+                answers.append((*current, pooled))
+            pooled.extend(tokens)
+        else:
+            asked = index.match(tokens)
+            if asked is not None and asked != current:
+                current = asked
+                pooled = None
+    return [score_answer(tokens, category, qid) for qid, category, tokens in answers if tokens]
+
+
+def summarize(scores: list[AnswerScore]) -> dict:
+    """Feedback section for a list of answer scores."""
+    total_words = sum(s.words for s in scores)
+    return {
+        "overall": round(sum(s.score for s in scores) / len(scores), 2) if scores else None,
+        "average_words": round(total_words / len(scores), 1) if scores else 0,
+        "filler_rate": round(
+            sum(s.filler_rate * s.words for s in scores) / total_words, 3
+        ) if total_words else 0.0,
+        "answers": [
+            {
+                "question_id": s.question_id,
+                "category": s.category,
+                "score": s.score,
+                "coverage": s.coverage,
+                "covered": list(s.covered),
+                "missing": list(s.missing),
+                "words": s.words,
+                "filler_rate": s.filler_rate,
+            }
+            for s in scores
+        ],
+    }
+
+
+def improvement_notes(scores: list[AnswerScore]) -> list[str]:
+    """Advice for the weakest parts of the student's answers."""
+    notes = []
+    missing_by_category: dict[str, set] = {}
+    for s in scores:
+        if s.coverage is not None and s.coverage < 1.0:
+            missing_by_category.setdefault(s.category, set()).update(s.missing)
+    for category, missing in missing_by_category.items():
+        ordered = [c for c in EXPECTATIONS[category][1] if c in missing]
+        notes.append(
+            f"Your {get_category_label(category)} answers could be more complete. "
+            f"Mention: {', '.join(ordered)}."
+        )
+    short = sum(1 for s in scores if s.words < MIN_WORDS)
+    if short and short * 2 >= len(scores):
+        notes.append(
+            f"Most answers were under {MIN_WORDS} words. Give the officer specific details."
+        )
+    words = sum(s.words for s in scores)
+    if words and sum(s.filler_rate * s.words for s in scores) / words > MAX_FILLER_RATE / 2:
+        notes.append("Cut filler words (um, basically, you know) so your answers sound confident.")
+    return notes
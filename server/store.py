@@ -0,0 +1,340 @@
+"""Session storage backends."""
+
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from server.agent import SessionLog
+
+
+class SessionStore:
+    """Interface for session storage backends."""
+
+    def get(self, session_id: str) -> SessionLog | None:
+        raise NotImplementedError
+
+    def put(self, session: SessionLog):
+        raise NotImplementedError
+
+    def save(self, session: SessionLog) -> Future | None:
+        """Persist changes made to a session returned by ``get``.
+
+        Shared backends return a future that completes once the change is
+        visible to other processes. In-process backends hand out live objects,
+        so this is a no-op for them.
+        """
+        return None
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def peek(self, session_id: str) -> SessionLog | None:
+        """Read a session without counting it as activity (for exports)."""
+        return self.get(session_id)
+
+    def scan_ids(self, after: str | None, limit: int) -> list[str]:
+        """Up to ``limit`` session IDs greater than ``after``, in ascending order."""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def metrics(self) -> dict:
+        raise NotImplementedError
+
+    def close(self):
+        """Flush pending writes and release resources."""
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store with idle TTL, LRU eviction and a per-session transcript budget.
+
+    Sessions are kept in access order, so both the least recently used and the
+    longest idle session are always at the front.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10_000,
+        idle_ttl: float = 3600.0,
+        max_transcript_bytes: int | None = 1_000_000,
+        clock=time.monotonic,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_transcript_bytes = max_transcript_bytes
+        self._clock = clock
+        self._sessions: OrderedDict[str, tuple[SessionLog, float]] = OrderedDict()
+        self.evictions = {"idle": 0, "lru": 0}
+
+    def get(self, session_id: str) -> SessionLog | None:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        now = self._clock()
+        session, last_seen = entry
+        if now - last_seen > self.idle_ttl:
+            del self._sessions[session_id]
+            self.evictions["idle"] += 1
+            return None
+        self._sessions[session_id] = (session, now)
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def put(self, session: SessionLog):
+        if session.transcript_budget_bytes is None:
+            session.transcript_budget_bytes = self.max_transcript_bytes
+        now = self._clock()
+        self._sessions[session.session_id] = (session, now)
+        self._sessions.move_to_end(session.session_id)
+        self._evict(now)
+
+    def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def peek(self, session_id: str) -> SessionLog | None:
+        entry = self._sessions.get(session_id)
+        if entry is None or self._clock() - entry[1] > self.idle_ttl:
+            return None
+        return entry[0]
+
+    def scan_ids(self, after: str | None, limit: int) -> list[str]:
+        self._evict(self._clock())
+        ids = self._sessions.keys() if after is None else (k for k in self._sessions if k > after)
+        return heapq.nsmallest(limit, ids)
+
+    def _evict(self, now: float):
+        cutoff = now - self.idle_ttl
+        while self._sessions:
+            _, (_, last_seen) = next(iter(self._sessions.items()))
+            if last_seen >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self.evictions["idle"] += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions["lru"] += 1
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def metrics(self) -> dict:
+        self._evict(self._clock())
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "approx_bytes": sum(session.approx_bytes() for session, _ in self._sessions.values()),
+            "evictions": dict(self.evictions),
+            "max_sessions": self.max_sessions,
+        }
+
+
+class SqliteSessionStore(SessionStore):
+    """SQLite (WAL mode) store shared by every worker process on the host.
+
+    Writes are queued and committed by a background thread in one transaction
+    per ``flush_interval`` (group commit), coalescing repeated saves of the same
+    session. Sessions are serialized in ``save`` on the caller's thread, so the
+    writer never reads a session the event loop is changing. ``save`` returns a future that completes after the commit, so a
+    request that waits on it is visible to every worker once it returns. Reads
+    see this process's queued writes and still-referenced sessions first, then
+    the database. Each commit writes whole sessions, so concurrent changes to
+    one session from two workers resolve as last writer wins.
+    """
+
+    def __init__(
+        self,
+        path: str = "sessions.db",
+        idle_ttl: float = 3600.0,
+        max_transcript_bytes: int | None = 1_000_000,
+        flush_interval: float = 0.005,
+    ):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.max_transcript_bytes = max_transcript_bytes
+        self.flush_interval = flush_interval
+        self.evictions = {"idle": 0}
+        self._local = threading.local()
+        # session id -> (session, serialized record), or None for a delete
+        self._pending: dict[str, tuple[SessionLog, str] | None] = {}
+        self._waiters: list[Future] = []
+        self._live: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " record TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+        conn.commit()
+        self._writer = threading.Thread(target=self._run_writer, name="session-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str) -> SessionLog | None:
+        with self._lock:
+            if session_id in self._pending:
+                pending = self._pending[session_id]
+                return None if pending is None else pending[0]
+        session = self._live.get(session_id)
+        if session is not None:
+            return session
+        row = self._connect().execute(
+            "SELECT record, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.idle_ttl:
+            return None
+        session = SessionLog.from_record(json.loads(row[0]))
+        self._live[session_id] = session
+        return session
+
+    def put(self, session: SessionLog) -> Future:
+        if session.transcript_budget_bytes is None:
+            session.transcript_budget_bytes = self.max_transcript_bytes
+        return self.save(session)
+
+    def _enqueue(self, session_id: str, pending: tuple[SessionLog, str] | None) -> Future:
+        done: Future = Future()
+        with self._lock:
+            self._pending[session_id] = pending
+            self._waiters.append(done)
+        self._wakeup.set()
+        return done
+
+    def save(self, session: SessionLog) -> Future:
+        self._live[session.session_id] = session
+        record = json.dumps(session.to_record())
+        return self._enqueue(session.session_id, (session, record))
+
+    def delete(self, session_id: str) -> Future:
+        self._live.pop(session_id, None)
+        return self._enqueue(session_id, None)
+
+    def scan_ids(self, after: str | None, limit: int) -> list[str]:
+        rows = self._connect().execute(
+            "SELECT session_id FROM sessions WHERE session_id > ? AND updated_at >= ?"
+            " ORDER BY session_id LIMIT ?",
+            (after or "", time.time() - self.idle_ttl, limit),
+        ).fetchall()
+        ids = {row[0] for row in rows}
+        # Sessions queued but not yet committed are visible to this process too.
+        with self._lock:
+            pending = [
+                session_id for session_id, queued in self._pending.items()
+                if (after is None or session_id > after) and queued is not None
+            ]
+            deleted = {session_id for session_id, queued in self._pending.items() if queued is None}
+        ids.update(pending)
+        return heapq.nsmallest(limit, ids - deleted)
+
+    def flush(self):
+        """Write every queued change to the database now."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            waiters, self._waiters = self._waiters, []
+        if not pending:
+            return
+        try:
+            self._write(pending)
+        except Exception as exc:
+            for done in waiters:
+                done.set_exception(exc)
+        else:
+            for done in waiters:
+                done.set_result(None)
+
+    def _write(self, pending: dict):
+        now = time.time()
+        upserts = [
+            (session_id, queued[1], now) for session_id, queued in pending.items() if queued is not None
+        ]
+        deletes = [(session_id,) for session_id, queued in pending.items() if queued is None]
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO sessions (session_id, record, updated_at) VALUES (?, ?, ?)",
+                upserts,
+            )
+            conn.executemany("DELETE FROM sessions WHERE session_id = ?", deletes)
+
+    def _evict_idle(self):
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.idle_ttl,)
+            )
+        self.evictions["idle"] += cursor.rowcount
+
+    def _run_writer(self):
+        last_sweep = time.monotonic()
+        while not self._stop.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self._stop.wait(self.flush_interval)
+            self.flush()
+            if time.monotonic() - last_sweep > 60:
+                self._evict_idle()
+                last_sweep = time.monotonic()
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def metrics(self) -> dict:
+        count, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(record)), 0) FROM sessions"
+        ).fetchone()
+        return {
+            "backend": "sqlite",
+            "sessions": count,
+            "approx_bytes": size,
+            "pending_writes": len(self._pending),
+            "evictions": dict(self.evictions),
+        }
+
+    def close(self):
+        self._stop.set()
+        self._wakeup.set()
+        self._writer.join()
+        self.flush()
+
+
+def create_session_store() -> SessionStore:
+    """Build the session store selected by the SESSION_STORE environment variable."""
+    backend = os.getenv("SESSION_STORE", "memory")
+    idle_ttl = float(os.getenv("SESSION_IDLE_TTL", "3600"))
+    budget = int(os.getenv("SESSION_TRANSCRIPT_BUDGET", "1000000")) or None
+    if backend == "memory":
+        return InMemorySessionStore(
+            max_sessions=int(os.getenv("SESSION_MAX_COUNT", "10000")),
+            idle_ttl=idle_ttl,
+            max_transcript_bytes=budget,
+        )
+    if backend == "sqlite":
+        return SqliteSessionStore(
+            path=os.getenv("SESSION_DB_PATH", "sessions.db"),
+            idle_ttl=idle_ttl,
+            max_transcript_bytes=budget,
+            flush_interval=float(os.getenv("SESSION_FLUSH_INTERVAL", "0.005")),
+        )
+    raise ValueError(f"Unknown SESSION_STORE backend: {backend!r}")
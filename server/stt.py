@@ -0,0 +1,129 @@
+"""Local streaming speech-to-text for the self-hosted voice mode.
+
+The browser streams 16 kHz mono PCM16 audio over a WebSocket. Each connection
+gets a recognizer that decodes audio incrementally on a thread pool, yielding
+partial transcripts while the student is still talking and a final transcript
+per utterance. The default backend is Vosk (``pip install -r
+requirements-local.txt`` plus a model directory in STT_MODEL_PATH); it releases the GIL while decoding, so threads
+are enough to use every core.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+SAMPLE_RATE = 16000
+
+_model = None
+_executor: ThreadPoolExecutor | None = None
+
+
+class StreamingRecognizer:
+    """Interface for incremental recognizers fed with PCM16 chunks."""
+
+    def accept(self, pcm: bytes) -> tuple[str, str] | None:
+        """Decode a chunk; return ("partial" | "final", text) or None."""
+        raise NotImplementedError
+
+    def finish(self) -> str:
+        """Flush buffered audio and return the last final transcript."""
+        raise NotImplementedError
+
+
+class VoskRecognizer(StreamingRecognizer):
+    """Streaming recognizer backed by a Vosk (Kaldi) model."""
+
+    def __init__(self, model):
+        from vosk import KaldiRecognizer
+
+        self._recognizer = KaldiRecognizer(model, SAMPLE_RATE)
+
+    def accept(self, pcm: bytes) -> tuple[str, str] | None:
+        if self._recognizer.AcceptWaveform(pcm):
+            text = json.loads(self._recognizer.Result())["text"]
+            return ("final", text) if text else None
+        partial = json.loads(self._recognizer.PartialResult())["partial"]
+        return ("partial", partial) if partial else None
+
+    def finish(self) -> str:
+        return json.loads(self._recognizer.FinalResult())["text"]
+
+
+def _load_model():
+    global _model
+    if _model is None:
+        try:
+            from vosk import Model
+        except ImportError as exc:
+            raise RuntimeError("Local STT needs the vosk package: pip install -r requirements-local.txt") from exc
+        model_path = os.getenv("STT_MODEL_PATH")
+        if not model_path:
+            raise ValueError("STT_MODEL_PATH not set in environment")
+        _model = Model(model_path)
+    return _model
+
+
+def create_recognizer() -> StreamingRecognizer:
+    """Build a recognizer for one audio stream (loads the model on first use)."""
+    return VoskRecognizer(_load_model())
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Shared decoding pool, sized by STT_WORKERS (defaults to the CPU count)."""
+    global _executor
+    if _executor is None:
+        workers = int(os.getenv("STT_WORKERS", "0")) or os.cpu_count() or 1
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stt")
+    return _executor
+
+
+class SpeechStream:
+    """Feeds one connection's audio to its recognizer off the event loop.
+
+    Audio that arrives while a chunk is being decoded is buffered and decoded
+    together next, so a slow decoder falls behind by one chunk rather than by
+    an ever-growing queue.
+    """
+
+    def __init__(self, recognizer: StreamingRecognizer, executor=None):
+        self._recognizer = recognizer
+        self._executor = executor or get_executor()
+        self._buffer = bytearray()
+        self._ready = asyncio.Event()
+        self._closed = False
+
+    def push(self, pcm: bytes):
+        self._buffer += pcm
+        self._ready.set()
+
+    def close(self):
+        self._closed = True
+        self._ready.set()
+
+    async def results(self):
+        """Yield ("partial" | "final", text) pairs as decoding progresses."""
+        loop = asyncio.get_running_loop()
+        last_partial = ""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            if self._buffer:
+                chunk = bytes(self._buffer)
+                self._buffer.clear()
+                result = await loop.run_in_executor(self._executor, self._recognizer.accept, chunk)
+                if result is not None:
+                    kind, text = result
+                    if kind == "final":
+                        last_partial = ""
+                        yield result
+                    elif text != last_partial:
+                        last_partial = text
+                        yield result
+            if self._closed and not self._buffer:
+                text = await loop.run_in_executor(self._executor, self._recognizer.finish)
+                if text:
+                    yield ("final", text)
+                return
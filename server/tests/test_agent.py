@@ -1,6 +1,22 @@
 """Tests for the agent session management."""
 
-from server.agent import SessionLog, build_system_prompt
+import asyncio
+import json
+import os
+import shutil
+
+import pytest
+
+from server import questions
+from server.agent import (
+    SessionLog,
+    SignedUrlPool,
+    Transcript,
+    build_system_prompt,
+    get_cached_prompt,
+    get_prompt_version,
+    get_signed_url,
+)
 
 
 def test_session_log_creation():
@@ -33,6 +49,23 @@ def test_add_language_switch():
     assert session.language_switches[0]["question_id"] == 1
 
 
+def test_add_events_in_order():
+    session = SessionLog(session_id="abc")
+    applied = session.add_events([
+        {"type": "message", "role": "student", "text": "Hello", "language": "en"},
+        {"type": "switch", "question_id": 3, "reason": "silence"},
+    ])
+    assert applied == 2
+    assert session.transcript[0]["text"] == "Hello"
+    assert session.language_switches[0]["question_id"] == 3
+
+
+def test_add_events_rejects_unknown_type():
+    session = SessionLog(session_id="abc")
+    with pytest.raises(ValueError):
+        session.add_events([{"type": "bogus"}])
+
+
 def test_session_duration():
     session = SessionLog(session_id="abc")
     session.end_session()
@@ -49,9 +82,146 @@ def test_to_dict():
     assert "student_language_usage" in d
 
 
+def test_transcript_entries_match_dict_format():
+    transcript = Transcript()
+    transcript.append("student", "Namaste", "hi", 123.5)
+    transcript.append("agent", "Welcome", "en", 124.0)
+    assert transcript[0] == {"role": "student", "text": "Namaste", "language": "hi", "timestamp": 123.5}
+    assert transcript[-1]["role"] == "agent"
+    assert [t["text"] for t in transcript] == ["Namaste", "Welcome"]
+    assert transcript == Transcript(transcript.to_list())
+    with pytest.raises(IndexError):
+        transcript[2]
+
+
+def test_transcript_drop_oldest():
+    transcript = Transcript()
+    for i in range(5):
+        transcript.append("student", f"answer {i}", "en", float(i))
+    transcript.drop_oldest(3)
+    assert len(transcript) == 2
+    assert transcript[0]["text"] == "answer 3"
+
+
+def test_transcript_rejects_unknown_roles_and_languages():
+    transcript = Transcript()
+    with pytest.raises(ValueError):
+        transcript.append("narrator", "hello", "en", 0.0)
+    with pytest.raises(ValueError):
+        transcript.append("student", "bonjour", "fr", 0.0)
+    assert len(transcript) == 0
+
+
+def test_to_dict_transcript_is_plain_list():
+    session = SessionLog(session_id="abc")
+    session.add_message("student", "Hello", language="en")
+    transcript = session.to_dict()["transcript"]
+    assert isinstance(transcript, list)
+    assert set(transcript[0]) == {"role", "text", "language", "timestamp"}
+
+
+def test_record_round_trip():
+    session = SessionLog(session_id="abc")
+    session.add_message("student", "Namaste", language="hi")
+    session.add_language_switch(1, "confusion")
+    session.end_session()
+    restored = SessionLog.from_record(session.to_record())
+    assert restored.to_dict() == session.to_dict()
+    assert restored.end_time == session.end_time
+    assert restored.transcript_bytes == session.transcript_bytes
+
+
+def test_end_session_keeps_first_end_time():
+    session = SessionLog(session_id="test")
+    session.end_session()
+    first = session.end_time
+    session.end_session()
+    assert session.end_time == first
+
+
+def test_content_version_and_snapshot():
+    session = SessionLog(session_id="test")
+    session.add_message("student", "Hello", "en")
+    version = session.content_version()
+    snapshot = session.snapshot()
+    session.add_message("student", "More", "en")
+    session.add_language_switch(1, "confusion")
+    assert session.content_version() != version
+    assert snapshot.content_version() == version
+    assert [t["text"] for t in snapshot.transcript] == ["Hello"]
+    restored = SessionLog.from_record(json.loads(json.dumps(session.to_record())))
+    assert restored.content_version() == session.content_version()
+
+
 def test_system_prompt_contains_questions():
     prompt = build_system_prompt()
     assert "Why have you chosen to study" in prompt
     assert "How will you fund" in prompt
     assert "Hindi hint:" in prompt
     assert "visa officer" in prompt.lower()
+
+
+def test_system_prompt_lists_only_the_planned_questions_in_order():
+    prompt = build_system_prompt([4, 2, 999])
+    assert "How will you fund" in prompt
+    assert "Why have you chosen to study" not in prompt
+    assert prompt.index("\n4. ") < prompt.index("\n2. ")
+
+
+def test_prompt_version_is_cached():
+    version = get_prompt_version()
+    assert get_prompt_version() == version
+    assert get_cached_prompt(version) == build_system_prompt()
+
+
+def test_prompt_version_changes_with_question_bank(monkeypatch, tmp_path):
+    path = tmp_path / "questions.json"
+    shutil.copy(questions.DEFAULT_QUESTION_BANK_PATH, path)
+    monkeypatch.setattr(questions, "question_bank", questions.QuestionBank(str(path), 0))
+    old_version = get_prompt_version()
+
+    data = json.loads(path.read_text())
+    data["questions"][0]["question_en"] = "Why this university?"
+    path.write_text(json.dumps(data))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+
+    new_version = get_prompt_version()
+    assert new_version != old_version
+    assert "Why this university?" in get_cached_prompt(new_version)
+
+
+def test_get_signed_url_requires_api_key(monkeypatch):
+    monkeypatch.delenv("ELEVENLABS_API_KEY", raising=False)
+    with pytest.raises(ValueError):
+        asyncio.run(get_signed_url())
+
+
+def test_signed_url_pool_refill_and_pop():
+    counter = iter(range(100))
+
+    async def fetch():
+        return f"wss://signed/{next(counter)}"
+
+    pool = SignedUrlPool(size=3, fetch=fetch)
+    asyncio.run(pool.refill())
+    assert len(pool) == 3
+    assert pool.pop() == "wss://signed/0"
+    assert len(pool) == 2
+
+
+def test_signed_url_pool_evicts_expired_urls():
+    async def fetch():
+        return "wss://signed"
+
+    pool = SignedUrlPool(size=2, max_age=-1.0, fetch=fetch)
+    asyncio.run(pool.refill())
+    assert pool.pop() is None
+
+
+def test_signed_url_pool_skips_failed_fetches():
+    async def fetch():
+        raise RuntimeError("upstream down")
+
+    pool = SignedUrlPool(size=2, fetch=fetch)
+    asyncio.run(pool.refill())
+    assert pool.pop() is None
@@ -0,0 +1,82 @@
+"""Tests for the columnar cohort analytics store."""
+
+from server.agent import SessionLog
+from server.analytics import AnalyticsStore
+from server.feedback import PROFICIENCY_LEVELS
+
+
+def _session(session_id, start, end, answers, switches=()):
+    session = SessionLog(session_id=session_id, start_time=start)
+    for question_id, language in answers:
+        session.mark_question(question_id)
+        session.add_message("student", "answer", language)
+    for question_id in switches:
+        session.add_language_switch(question_id, "confused")
+    session.end_time = end
+    return session
+
+
+def test_rollup_by_question_and_category():
+    store = AnalyticsStore()
+    store.record(_session("a", 0, 600, [(1, "en"), (2, "hi")], switches=[2]))
+    store.record(_session("b", 100, 400, [(1, "en"), (2, "en")]))
+    report = store.rollup()
+
+    assert report["overall"]["sessions"] == 2
+    assert report["overall"]["avg_duration_minutes"] == 7.5
+    assert report["overall"]["switch_rate"] == 0.5
+    assert report["overall"]["hindi_response_ratio"] == 0.25
+
+    questions = {row["question_id"]: row for row in report["questions"]}
+    assert questions[1]["sessions"] == 2
+    assert questions[1]["switch_rate"] == 0.0
+    assert questions[2]["switch_rate"] == 0.5
+    assert questions[2]["hindi_response_ratio"] == 0.5
+    assert questions[2]["category"] == "financial"
+    assert questions[1]["proficiency"][PROFICIENCY_LEVELS[-1]] == 1
+
+    categories = {row["category"]: row for row in report["categories"]}
+    assert categories["financial"]["sessions"] == 2
+    assert categories["financial"]["switch_rate"] == 0.5
+
+
+def test_time_window_and_growth():
+    store = AnalyticsStore()
+    for i in range(3000):
+        store.record(_session(str(i), i * 10, i * 10 + 5, [(1 + i % 3, "en")]))
+    assert len(store.sessions) == 3000
+    report = store.rollup(since=10_000, until=20_000)
+    assert report["overall"]["sessions"] == 1000
+    assert sum(row["sessions"] for row in report["questions"]) == 1000
+    assert store.rollup(since=1e9)["overall"]["sessions"] == 0
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "analytics.npz")
+    store = AnalyticsStore(path)
+    store.record(_session("a", 0, 60, [(3, "hi")], switches=[3]))
+    store.save()
+
+    restored = AnalyticsStore(path)
+    assert restored.rollup() == store.rollup()
+    restored.record(_session("b", 60, 120, [(4, "en")]))
+    assert restored.rollup()["overall"]["sessions"] == 2
+
+
+def test_daily_aggregates_match_raw_rows():
+    store = AnalyticsStore()
+    day = 86400
+    for i in range(500):
+        ended = 10 * day + i * day / 50  # ten days, fifty sessions a day
+        store.record(_session(str(i), ended - 300, ended, [(1 + i % 5, ("en", "hi")[i % 3 == 0])],
+                              switches=[1 + i % 5] if i % 4 == 0 else []))
+    for since, until in [(None, None), (12.5 * day, 17.25 * day), (13 * day, 14 * day),
+                         (12.1 * day, 12.2 * day), (None, 15.5 * day), (11.9 * day, None)]:
+        fast = store.rollup(since, until)
+        lo, hi = store.questions.window(since, until)
+        assert sum(row["sessions"] for row in fast["questions"]) == hi - lo
+        s_lo, s_hi = store.sessions.window(since, until)
+        assert fast["overall"]["sessions"] == s_hi - s_lo
+        switched = int((store.sessions.column("switches", s_lo, s_hi) > 0).sum())
+        if s_hi > s_lo:
+            assert fast["overall"]["switch_rate"] == round(switched / (s_hi - s_lo), 3)
@@ -1,9 +1,24 @@
 """Tests for the FastAPI endpoints."""
 
+import asyncio
+import json
 from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import Request
 from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
 
+from server import app as app_module
+from server.agent import CLOSING_LINE
 from server.app import app
+from server.limits import ActiveSessions
+from server.recording import WAV_HEADER_BYTES, AudioRecorder
+from server.questions import get_question_by_id
+from server.tests.test_stt import ScriptedRecognizer
+from server.tts import PhraseAudioCache
+from server.vad import VoiceActivityDetector
 
 client = TestClient(app)
 
@@ -22,7 +37,33 @@ def test_start_session_with_signed_url(mock_signed_url):
     assert "session_id" in data
     assert "agent_id" in data
     assert data["signed_url"] == "wss://fake-signed-url"
-    assert "system_prompt" in data
+    assert "prompt_version" in data
+    assert "system_prompt" not in data
+    assert data["prompt_override"] is False  # agents must opt in to prompt overrides
+    with patch("server.app.PROMPT_OVERRIDE", True):
+        assert client.post("/api/session/start").json()["prompt_override"] is True
+
+
+@patch("server.app.get_signed_url", side_effect=Exception("skip"))
+def test_prompt_served_by_version(mock_signed_url):
+    version = app_module.get_prompt_version()
+    response = client.get(f"/api/prompt/{version}")
+    assert response.status_code == 200
+    assert "Why have you chosen to study" in response.text
+    assert response.headers["etag"] == f'"{version}"'
+    assert "immutable" in response.headers["cache-control"]
+
+
+@patch("server.app.get_signed_url", side_effect=Exception("skip"))
+def test_prompt_not_modified_for_matching_etag(mock_signed_url):
+    version = client.post("/api/session/start").json()["prompt_version"]
+    response = client.get(f"/api/prompt/{version}", headers={"If-None-Match": f'"{version}"'})
+    assert response.status_code == 304
+
+
+def test_unknown_prompt_version():
+    response = client.get("/api/prompt/doesnotexist")
+    assert response.status_code == 404
 
 
 @patch("server.app.get_signed_url", side_effect=Exception("401"))
@@ -55,3 +96,722 @@ def test_end_session_returns_feedback(mock_signed_url):
 def test_end_nonexistent_session():
     response = client.post("/api/session/nonexistent/end")
     assert response.status_code == 404
+
+
+def _start_session():
+    with patch("server.app.get_signed_url", side_effect=Exception("skip")):
+        return client.post("/api/session/start").json()["session_id"]
+
+
+def test_log_events_batch():
+    session_id = _start_session()
+    events = [
+        {"type": "message", "role": "agent", "text": "Why this country?"},
+        {"type": "message", "role": "student", "text": "Meri family pay karegi", "language": "hi"},
+        {"type": "switch", "question_id": 1, "reason": "student confused"},
+    ]
+    response = client.post(f"/api/session/{session_id}/events", json=events)
+    assert response.status_code == 200
+    assert response.json()["applied"] == 3
+    data = client.get(f"/api/session/{session_id}").json()
+    assert len(data["transcript"]) == 2
+    assert data["language_switches"][0]["question_id"] == 1
+    assert data["student_language_usage"]["hindi"] == 1
+
+
+def test_log_events_detects_language_and_confusion():
+    session_id = _start_session()
+    events = [
+        {"type": "question", "question_id": 3},
+        {"type": "message", "role": "student", "text": "Mujhe samajh nahi aaya"},
+        {"type": "message", "role": "student", "text": "I will return to India after my degree"},
+    ]
+    response = client.post(f"/api/session/{session_id}/events", json=events)
+    assert response.json()["applied"] == 4
+    data = client.get(f"/api/session/{session_id}").json()
+    assert [t["language"] for t in data["transcript"]] == ["hi", "en"]
+    assert 3 in data["questions_asked"]
+    assert data["language_switches"][0]["question_id"] == 3
+    assert data["language_switches"][0]["reason"].startswith("confusion")
+
+
+def test_officer_lines_mark_the_question_for_hosted_sessions():
+    session_id = _start_session()
+    events = [
+        {"type": "message", "role": "agent", "text": "How will you fund your education and living expenses?"},
+        {"type": "message", "role": "student", "text": "Sorry, I don't understand"},
+        {"type": "message", "role": "agent", "text": "Do you have a scholarship or education loan?"},
+    ]
+    client.post(f"/api/session/{session_id}/events", json=events)
+    data = client.get(f"/api/session/{session_id}").json()
+    assert data["questions_asked"] == [2]
+    assert data["language_switches"][0]["question_id"] == 2
+    feedback = client.post(f"/api/session/{session_id}/end").json()
+    assert feedback["questions_needing_hindi_help"] == [2]
+
+
+def test_log_message_detects_hindi_request():
+    session_id = _start_session()
+    client.post(
+        f"/api/session/{session_id}/message",
+        params={"role": "student", "text": "Hindi mein samjhao please"},
+    )
+    data = client.get(f"/api/session/{session_id}").json()
+    assert data["language_switches"][0]["reason"].startswith("hindi request")
+    assert data["language_switches"][0]["question_id"] == 0
+
+
+def test_log_events_rejects_unknown_type():
+    session_id = _start_session()
+    response = client.post(f"/api/session/{session_id}/events", json=[{"type": "bogus"}])
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("event", [
+    {"type": "message", "role": "narrator", "text": "hi"},
+    {"type": "message", "role": "student", "text": "bonjour", "language": "fr"},
+])
+def test_log_events_rejects_unknown_roles_and_languages(event):
+    session_id = _start_session()
+    response = client.post(f"/api/session/{session_id}/events", json=[event])
+    assert response.status_code == 422
+    response = client.post(
+        f"/api/session/{session_id}/message",
+        params={k: v for k, v in event.items() if k != "type"},
+    )
+    assert response.status_code == 422
+
+
+def test_log_events_nonexistent_session():
+    response = client.post("/api/session/nonexistent/events", json=[])
+    assert response.status_code == 404
+
+
+def test_stream_events_ndjson():
+    session_id = _start_session()
+    lines = [
+        '{"type": "message", "role": "student", "text": "I will study CS"}',
+        "",
+        '{"type": "switch", "question_id": 2, "reason": "silence"}',
+    ]
+
+    def body():
+        for line in lines:
+            yield (line + "\n").encode()
+
+    response = client.post(
+        f"/api/session/{session_id}/events/stream",
+        content=body(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.json()["applied"] == 2
+    data = client.get(f"/api/session/{session_id}").json()
+    assert data["transcript"][0]["text"] == "I will study CS"
+    assert data["language_switches"][0]["reason"] == "silence"
+
+
+def test_stream_events_reports_bad_line():
+    session_id = _start_session()
+    body = '{"type": "message", "role": "student", "text": "ok"}\nnot json\n'
+    response = client.post(f"/api/session/{session_id}/events/stream", content=body)
+    assert response.status_code == 422
+    assert response.json()["detail"]["line"] == 2
+
+
+def test_live_feedback_mid_interview():
+    session_id = _start_session()
+    client.post(
+        f"/api/session/{session_id}/events",
+        json=[{"type": "message", "role": "student", "text": "Loan", "language": "en"}],
+    )
+    response = client.get(f"/api/session/{session_id}/feedback")
+    assert response.status_code == 200
+    assert response.json()["total_questions_faced"] == 1
+
+
+def test_session_channel_streams_feedback():
+    session_id = _start_session()
+    with client.websocket_connect(f"/ws/session/{session_id}") as ws:
+        ws.send_json({"type": "mode", "mode": "speaking"})
+        ws.send_json([
+            {"type": "message", "role": "agent", "text": "How will you fund it?"},
+            {"type": "message", "role": "student", "text": "Education loan", "language": "en"},
+        ])
+        update = ws.receive_json()
+        assert update["type"] == "feedback"
+        assert update["feedback"]["total_questions_faced"] == 1
+
+        ws.send_json({"type": "switch", "question_id": 2, "reason": "confusion"})
+        ws.send_json({"type": "end"})
+        message = ws.receive_json()
+        while message["type"] != "final":
+            message = ws.receive_json()
+        assert message["feedback"]["language_switches"] == 1
+
+    data = client.get(f"/api/session/{session_id}").json()
+    assert len(data["transcript"]) == 2
+
+
+def test_session_channel_reports_invalid_events():
+    session_id = _start_session()
+    with client.websocket_connect(f"/ws/session/{session_id}") as ws:
+        ws.send_json({"type": "bogus"})
+        assert ws.receive_json()["type"] == "error"
+
+
+def test_ended_sessions_reject_further_events():
+    session_id = _start_session()
+    client.post(f"/api/session/{session_id}/message", params={"role": "student", "text": "Hello"})
+    first = client.post(f"/api/session/{session_id}/end").json()
+
+    message = {"type": "message", "role": "student", "text": "Hindi mein samjhao"}
+    assert client.post(
+        f"/api/session/{session_id}/message", params={"role": "student", "text": "One more"}
+    ).status_code == 409
+    assert client.post(
+        f"/api/session/{session_id}/switch", params={"question_id": 1, "reason": "late"}
+    ).status_code == 409
+    assert client.post(f"/api/session/{session_id}/events", json=[message]).status_code == 409
+    assert client.post(
+        f"/api/session/{session_id}/events/stream", content=json.dumps(message) + "\n"
+    ).status_code == 409
+    for channel in ("session", "audio"):
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with client.websocket_connect(f"/ws/{channel}/{session_id}") as ws:
+                ws.receive_json()
+        assert closed.value.code == 4409
+
+    assert client.post(f"/api/session/{session_id}/end").json() == first
+    assert len(client.get(f"/api/session/{session_id}").json()["transcript"]) == 1
+
+
+def test_session_channel_unknown_session():
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/ws/session/nonexistent") as ws:
+            ws.receive_json()
+
+
+class FakeSynthesizer:
+    sample_rate = 16000
+
+    def synthesize(self, text):
+        return b"\x00\x00" * len(text)
+
+
+@pytest.fixture
+def fake_tts():
+    with patch.object(app_module.speech, "_synthesizer_factory", lambda language: FakeSynthesizer()):
+        yield
+
+
+def _receive_text_frame(ws):
+    """Next JSON frame, skipping officer speech frames."""
+    while True:
+        message = ws.receive()
+        if message.get("text"):
+            data = json.loads(message["text"])
+            if data["type"] != "speech":
+                return data
+
+
+def test_audio_channel_speaks_greeting(fake_tts):
+    session_id = _start_session()
+    with patch("server.app.create_recognizer", return_value=ScriptedRecognizer([])):
+        with client.websocket_connect(f"/ws/audio/{session_id}") as ws:
+            header = ws.receive_json()
+            assert header["type"] == "speech"
+            assert header["sample_rate"] == 16000
+            audio = ws.receive_bytes()
+            assert len(audio) == 2 * len(header["text"])
+            ws.send_json({"type": "end"})
+
+    data = client.get(f"/api/session/{session_id}").json()
+    assert data["transcript"][0]["role"] == "agent"
+
+
+def test_audio_channel_logs_final_transcripts(fake_tts):
+    session_id = _start_session()
+    recognizer = ScriptedRecognizer([("partial", "my fa"), ("final", "my father will pay")])
+    with patch("server.app.create_recognizer", return_value=recognizer):
+        with client.websocket_connect(f"/ws/audio/{session_id}") as ws:
+            ws.send_bytes(b"\x00\x00" * 1600)
+            assert _receive_text_frame(ws) == {"type": "partial", "text": "my fa"}
+            ws.send_bytes(b"\x00\x00" * 1600)
+            assert _receive_text_frame(ws) == {"type": "final", "text": "my father will pay"}
+            ws.send_json({"type": "end"})
+
+    data = client.get(f"/api/session/{session_id}").json()
+    student = [t for t in data["transcript"] if t["role"] == "student"]
+    assert student[0]["text"] == "my father will pay"
+
+
+def test_audio_channel_offers_hindi_hint_after_silence(fake_tts):
+    session_id = _start_session()
+    vad = VoiceActivityDetector(silence_seconds=0.3)
+    with patch("server.app.create_recognizer", return_value=ScriptedRecognizer([])), \
+            patch("server.app.create_vad", return_value=vad), \
+            patch("server.app.OFFICER_GREETING", "Good morning."):
+        with client.websocket_connect(f"/ws/audio/{session_id}") as ws:
+            greeting, question = _receive_officer_lines(ws, 2)
+            assert greeting["text"] == "Good morning."
+            ws.send_bytes(b"\x00\x00" * 8000)
+            event = _receive_text_frame(ws)
+            assert event["type"] == "vad" and event["state"] == "silence"
+            hint = []
+            while not (line := _receive_officer_lines(ws, 1)[0])["text"].startswith("Let me ask"):
+                hint.append(line)
+            assert hint and all(h["language"] == "hi" for h in hint)
+            assert line["language"] == "en"
+            ws.send_json({"type": "end"})
+
+    data = client.get(f"/api/session/{session_id}").json()
+    first_question = data["questions_asked"][0]
+    assert data["language_switches"][0]["question_id"] == first_question
+    assert data["language_switches"][0]["reason"].startswith("silence")
+    assert [t["language"] for t in data["transcript"]][:3] == ["en", "en", "hi"]
+
+
+def test_silence_is_counted_from_the_end_of_officer_playback(fake_tts):
+    session_id = _start_session()
+    vad = VoiceActivityDetector(silence_seconds=0.3)
+
+    def one_second(text):
+        return b"\x00\x00" * 16000
+
+    with patch("server.app.create_recognizer", return_value=ScriptedRecognizer([])), \
+            patch("server.app.create_vad", return_value=vad), \
+            patch("server.app.OFFICER_GREETING", "Good morning."), \
+            patch.object(FakeSynthesizer, "synthesize", staticmethod(one_second)), \
+            patch.object(app_module.speech, "cache", PhraseAudioCache()):
+        with client.websocket_connect(f"/ws/audio/{session_id}") as ws:
+            _receive_officer_lines(ws, 2)
+            # Everything is sent, but the client is still playing two seconds of it.
+            ws.send_bytes(b"\x00\x00" * 8000)
+            ws.send_json({"type": "end"})
+
+    assert client.get(f"/api/session/{session_id}").json()["language_switches"] == []
+
+
+def test_audio_channel_records_answers_for_range_playback(fake_tts, monkeypatch, tmp_path):
+    recorder = AudioRecorder(str(tmp_path), chunk_bytes=3200)
+    monkeypatch.setattr(app_module, "recorder", recorder)
+    session_id = _start_session()
+    recognizer = ScriptedRecognizer([("final", "my father will pay")])
+    with patch("server.app.create_recognizer", return_value=recognizer):
+        with client.websocket_connect(f"/ws/audio/{session_id}") as ws:
+            ws.send_bytes(b"\x01\x00" * 4000)
+            assert _receive_text_frame(ws)["type"] == "final"
+            ws.send_json({"type": "end"})
+    assert recorder.flush()
+
+    full = client.get(f"/api/session/{session_id}/recording")
+    assert full.status_code == 200
+    assert full.headers["accept-ranges"] == "bytes"
+    assert len(full.content) == WAV_HEADER_BYTES + 3 * 3200  # padded to whole chunks
+    assert full.content[:4] == b"RIFF"
+
+    utterances = client.get(f"/api/session/{session_id}/recording/utterances").json()
+    assert [u["text"] for u in utterances["utterances"]] == ["my father will pay"]
+    assert utterances["bytes"] == len(full.content)
+
+    part = client.get(f"/api/session/{session_id}/recording", headers={"Range": "bytes=44-47"})
+    assert part.status_code == 206
+    assert part.headers["content-range"] == f"bytes 44-47/{len(full.content)}"
+    assert part.content == b"\x01\x00\x01\x00"
+
+    beyond = client.get(f"/api/session/{session_id}/recording", headers={"Range": "bytes=99999-"})
+    assert beyond.status_code == 416
+    assert client.get("/api/session/unknown1/recording").status_code == 404
+    recorder.close()
+
+
+def test_recording_requires_the_session_and_closes_without_streaming(monkeypatch, tmp_path):
+    recorder = AudioRecorder(str(tmp_path), chunk_bytes=3200)
+    monkeypatch.setattr(app_module, "recorder", recorder)
+    recording = recorder.open("ghost1")  # audio left behind by a session the store no longer has
+    recording.write(b"\x01\x00" * 1600)
+    recording.close()
+    assert recorder.flush()
+    assert client.get("/api/session/ghost1/recording").status_code == 404
+
+    session_id = _start_session()
+    recording = recorder.open(session_id)
+    recording.write(b"\x01\x00" * 1600)
+    recording.close()
+    assert recorder.flush()
+    opened = []
+    open_playback = recorder.open_playback
+
+    def tracked(sid):
+        opened.append(open_playback(sid))
+        return opened[-1]
+
+    monkeypatch.setattr(recorder, "open_playback", tracked)
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+    response = asyncio.run(app_module.get_recording(session_id, request))
+    asyncio.run(response.background())  # as if the client went away before the body was sent
+    assert opened[0]._map is None and opened[0]._file.closed
+    recorder.close()
+
+
+def _receive_officer_lines(ws, count):
+    """Headers of the next ``count`` officer sentences, consuming their audio."""
+    headers = []
+    while len(headers) < count:
+        header = ws.receive_json()
+        assert header["type"] == "speech"
+        ws.receive_bytes()
+        headers.append(header)
+    return headers
+
+
+def test_audio_channel_follows_the_dialogue(fake_tts):
+    session_id = _start_session()
+    recognizer = ScriptedRecognizer([("final", "Because of the universities")])
+    with patch("server.app.create_recognizer", return_value=recognizer), \
+            patch("server.app.OFFICER_GREETING", "Good morning."):
+        with client.websocket_connect(f"/ws/audio/{session_id}") as ws:
+            _, question = _receive_officer_lines(ws, 2)
+            ws.send_bytes(b"\x00\x00" * 1600)
+            assert _receive_text_frame(ws)["type"] == "final"
+            (follow_up,) = _receive_officer_lines(ws, 1)
+            ws.send_json({"type": "end"})
+
+    data = client.get(f"/api/session/{session_id}").json()
+    first = get_question_by_id(data["questions_asked"][0])
+    assert question["text"] == first["question_en"]
+    assert follow_up["text"] == first["follow_ups"][0]
+
+
+def test_silence_after_the_closing_line_is_not_a_switch(fake_tts):
+    session_id = _start_session()
+    app_module.sessions.get(session_id).question_plan = [2]
+    answer = (
+        "My father will sponsor my studies from his business income and we also have "
+        "an education loan of twenty lakh rupees approved by the bank."
+    )
+    vad = VoiceActivityDetector(silence_seconds=0.3)
+    with patch("server.app.create_recognizer", return_value=ScriptedRecognizer([("final", answer)])), \
+            patch("server.app.create_vad", return_value=vad), \
+            patch("server.app.OFFICER_GREETING", "Good morning."):
+        with client.websocket_connect(f"/ws/audio/{session_id}") as ws:
+            _receive_officer_lines(ws, 2)
+            ws.send_bytes(b"\x00\x00" * 1600)
+            assert _receive_text_frame(ws)["type"] == "final"
+            closing = _receive_officer_lines(ws, 2)  # one header per sentence
+            assert " ".join(line["text"] for line in closing) == CLOSING_LINE
+            ws.send_bytes(b"\x00\x00" * 8000)
+            event = _receive_text_frame(ws)
+            assert event["type"] == "vad" and event["state"] == "silence"
+            ws.send_json({"type": "end"})
+
+    assert client.get(f"/api/session/{session_id}").json()["language_switches"] == []
+
+
+def test_audio_channel_reports_missing_backend():
+    session_id = _start_session()
+    with patch("server.app.create_recognizer", side_effect=RuntimeError("no vosk")):
+        with client.websocket_connect(f"/ws/audio/{session_id}") as ws:
+            assert ws.receive_json() == {"type": "error", "detail": "no vosk"}
+
+
+def test_concurrent_session_lifecycles():
+    async def student(http, i):
+        session_id = (await http.post("/api/session/start")).json()["session_id"]
+        events = [
+            {"type": "question", "question_id": 1},
+            {"type": "message", "role": "student", "text": f"Answer {i}", "language": "en"},
+        ]
+        for _ in range(3):
+            assert (await http.post(f"/api/session/{session_id}/events", json=events)).status_code == 200
+        await http.post(f"/api/session/{session_id}/switch", params={"question_id": 1, "reason": "x"})
+        return session_id, (await http.post(f"/api/session/{session_id}/end")).json()
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(student(http, i) for i in range(50)))
+
+    results = asyncio.run(run())
+    assert len({session_id for session_id, _ in results}) == 50
+    for session_id, feedback in results:
+        assert feedback["session_id"] == session_id
+        assert feedback["total_questions_faced"] == 3
+        assert feedback["language_switches"] == 1
+
+
+def test_concurrent_end_requests_compute_feedback_once():
+    session_id = _start_session()
+    client.post(f"/api/session/{session_id}/message", params={"role": "student", "text": "Hello"})
+    before = app_module.feedback_service.computations
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(
+                *(http.post(f"/api/session/{session_id}/end") for _ in range(20))
+            )
+
+    responses = asyncio.run(run())
+    assert {r.status_code for r in responses} == {200}
+    assert all(r.json() == responses[0].json() for r in responses)
+    assert app_module.feedback_service.computations == before + 1
+
+    end_time = app_module.sessions.get(session_id).end_time
+    retry = client.post(f"/api/session/{session_id}/end").json()
+    assert retry == responses[0].json()
+    assert app_module.sessions.get(session_id).end_time == end_time
+    assert app_module.feedback_service.computations == before + 1
+
+
+def test_concurrent_starts_against_a_slow_upstream_respect_the_cap(monkeypatch):
+    monkeypatch.setattr(app_module.limiter, "active", ActiveSessions(idle_seconds=300))
+    monkeypatch.setattr(app_module.limiter, "max_active", 5)
+    monkeypatch.setattr(app_module.signed_url_pool, "pop", lambda: None)
+
+    async def slow_signed_url():
+        await asyncio.sleep(0.05)
+        return "wss://example.test/convai"
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(http.post("/api/session/start") for _ in range(50)))
+
+    with patch("server.app.get_signed_url", side_effect=slow_signed_url):
+        responses = asyncio.run(run())
+    statuses = [r.status_code for r in responses]
+    assert statuses.count(200) == 5 and statuses.count(503) == 45
+    assert app_module.limiter.stats()["active_interviews"] == 5
+
+    # A start that fails after admission gives its slot back.
+    for response in responses:
+        if response.status_code == 200:
+            client.post(f"/api/session/{response.json()['session_id']}/end")
+    with patch("server.app.scheduler.plan", side_effect=RuntimeError("boom")), \
+            pytest.raises(RuntimeError):
+        client.post("/api/session/start")
+    assert app_module.limiter.stats()["active_interviews"] == 0
+
+
+def test_full_server_turns_away_new_interviews_only(monkeypatch):
+    monkeypatch.setattr(app_module.limiter, "active", ActiveSessions(idle_seconds=300))
+    monkeypatch.setattr(app_module.limiter, "max_active", 1)
+    session_id = _start_session()
+    with patch("server.app.get_signed_url", side_effect=Exception("skip")):
+        rejected = client.post("/api/session/start")
+    assert rejected.status_code == 503
+    assert int(rejected.headers["retry-after"]) > 0
+
+    events = [{"type": "message", "role": "student", "text": "Hello", "language": "en"}]
+    assert client.post(f"/api/session/{session_id}/events", json=events).status_code == 200
+    assert client.post(f"/api/session/{session_id}/end").status_code == 200
+    assert _start_session()
+
+
+def test_socket_frames_keep_an_interview_active(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(app_module.limiter, "active", ActiveSessions(idle_seconds=10))
+    monkeypatch.setattr(app_module.limiter, "clock", lambda: now[0])
+    session_id = _start_session()
+    with client.websocket_connect(f"/ws/session/{session_id}") as ws:
+        for _ in range(3):
+            now[0] += 8
+            ws.send_json({"type": "message", "role": "student", "text": "Hello", "language": "en"})
+            assert ws.receive_json()["type"] == "feedback"
+        assert app_module.limiter.stats()["active_interviews"] == 1
+        now[0] += 11
+        assert app_module.limiter.stats()["active_interviews"] == 0
+
+
+def test_abandoned_sessions_leave_the_active_gauge(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(app_module.limiter, "active", ActiveSessions(idle_seconds=10))
+    monkeypatch.setattr(app_module.limiter, "clock", lambda: now[0])
+    ended, abandoned = _start_session(), _start_session()
+    assert "interview_sessions_active 2" in client.get("/metrics").text
+    client.post(f"/api/session/{ended}/end")
+    client.post(f"/api/session/{ended}/end")
+    assert "interview_sessions_active 1" in client.get("/metrics").text
+    now[0] += 11
+    assert "interview_sessions_active 0" in client.get("/metrics").text
+    assert app_module.sessions.get(abandoned) is not None
+
+
+def test_metrics_endpoint_reports_routes_and_sessions():
+    session_id = _start_session()
+    client.post(f"/api/session/{session_id}/message", params={"role": "student", "text": "Hello"})
+    client.post(f"/api/session/{session_id}/end")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert (
+        'http_request_duration_seconds_count{method="POST",'
+        'route="/api/session/{session_id}/message",status="200"}'
+    ) in text
+    assert "interview_sessions_active" in text
+    assert "interview_feedback_duration_seconds_count" in text
+    assert 'interview_signed_url_source_total{source="fallback"}' in text
+    assert "interview_transcript_messages_bucket" in text
+
+
+def test_profiler_endpoints_need_debug_token():
+    assert client.post("/debug/profiler", params={"enabled": True}).status_code == 404
+    with patch("server.app.DEBUG_TOKEN", "secret"):
+        headers = {"X-Debug-Token": "secret"}
+        response = client.post(
+            "/debug/profiler", params={"enabled": True, "threshold_ms": 1}, headers=headers
+        )
+        assert response.json()["enabled"] is True
+        assert response.json()["threshold_ms"] == 1
+        response = client.post("/debug/profiler", params={"enabled": False}, headers=headers)
+        assert response.json()["enabled"] is False
+        assert client.get("/debug/profiler", headers=headers).status_code == 200
+
+
+def test_analytics_includes_ended_sessions():
+    session_id = _start_session()
+    events = [
+        {"type": "question", "question_id": 2},
+        {"type": "message", "role": "student", "text": "My father will pay", "language": "en"},
+        {"type": "switch", "question_id": 2, "reason": "confusion"},
+    ]
+    client.post(f"/api/session/{session_id}/events", json=events)
+    before = client.get("/api/analytics").json()["overall"]["sessions"]
+    client.post(f"/api/session/{session_id}/end")
+
+    report = client.get("/api/analytics", params={"days": 1}).json()
+    assert report["overall"]["sessions"] == before + 1
+    question = next(row for row in report["questions"] if row["question_id"] == 2)
+    assert question["switch_rate"] > 0
+    assert client.get("/api/analytics", params={"until": 0}).json()["overall"]["sessions"] == 0
+
+
+def test_ending_is_recorded_even_if_the_caller_goes_away():
+    session_id = _start_session()
+    session = app_module.sessions.get(session_id)
+    session.add_message("student", "My father will pay", "en")
+    before = client.get("/api/analytics").json()["overall"]["sessions"]
+
+    async def run():
+        ending = asyncio.ensure_future(app_module._end(session))
+        await asyncio.sleep(0)  # _end is now waiting for the feedback
+        ending.cancel()
+        await asyncio.gather(*app_module._finishing)
+        return ending.cancelled()
+
+    assert asyncio.run(run())
+    assert client.get("/api/analytics").json()["overall"]["sessions"] == before + 1
+
+
+def test_sessions_survive_restart_with_journal(tmp_path, monkeypatch):
+    from server.agent import SessionLog
+    from server.journal import SessionJournal
+
+    journal = SessionJournal(str(tmp_path), fsync_interval=0.001)
+    with patch("server.app.journal", journal):
+        with TestClient(app) as restarted:
+            session_id = restarted.post("/api/session/start").json()["session_id"]
+            restarted.post(
+                f"/api/session/{session_id}/message",
+                params={"role": "student", "text": "I will study data science", "language": "en"},
+            )
+            assert journal.flush()  # the writer thread counts what it has written
+            assert restarted.get("/api/sessions/stats").json()["journal"]["appended"] >= 2
+        assert SessionLog.journal is None
+        app_module.sessions.delete(session_id)  # the process "restarts" with an empty store
+    monkeypatch.setattr(app_module.limiter, "active", ActiveSessions(idle_seconds=300))
+
+    with patch("server.app.journal", SessionJournal(str(tmp_path), fsync_interval=0.001)):
+        with TestClient(app) as restarted:
+            data = restarted.get(f"/api/session/{session_id}").json()
+            assert data["transcript"][0]["text"] == "I will study data science"
+            assert app_module.limiter.stats()["active_interviews"] == 1  # counts towards the cap
+
+
+def test_failed_prewarm_is_logged(caplog):
+    async def fail():
+        raise RuntimeError("synthesizer unavailable")
+
+    with patch("server.app.VOICE_MODE", "local"), patch.object(app_module.speech, "prewarm", fail):
+        with TestClient(app) as local:
+            assert local.get("/api/sessions/stats").status_code == 200
+            assert app.state.prewarm.done()
+    assert "synthesizer unavailable" in caplog.text
+
+
+def test_export_session_streams_ndjson():
+    session_id = _start_session()
+    client.post(f"/api/session/{session_id}/events", json=[
+        {"type": "message", "role": "agent", "text": "Why Canada?", "language": "en"},
+        {"type": "message", "role": "student", "text": "Good universities", "language": "en"},
+    ])
+    response = client.get(f"/api/session/{session_id}/export")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["type"] == "session"
+    assert [line["text"] for line in lines[1:]] == ["Why Canada?", "Good universities"]
+
+    compressed = client.get(f"/api/session/{session_id}/export", params={"gzip": True})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.text == response.text
+    assert client.get("/api/session/missing/export").status_code == 404
+
+
+def test_bulk_export_paginates_with_cursor():
+    started = {_start_session() for _ in range(5)}
+    seen = set()
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/sessions/export", params=params)
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        page_ids = [line["session_id"] for line in lines if line["type"] == "session"]
+        assert page_ids == sorted(page_ids)
+        assert not seen & set(page_ids)
+        seen.update(page_ids)
+        pages += 1
+        assert lines[-1]["type"] == "page"
+        cursor = response.headers.get("x-next-cursor")
+        assert lines[-1]["next_cursor"] == cursor
+        if cursor is None:
+            break
+    assert started <= seen
+    assert pages >= 3
+    assert client.get("/api/sessions/export", params={"limit": 0}).status_code == 422
+
+
+def test_start_session_plans_questions_for_weak_areas():
+    with patch("server.app.get_signed_url", side_effect=Exception("skip")):
+        first = client.post("/api/session/start", params={"student_id": "asha"}).json()
+    plan = first["question_plan"]
+    assert sorted(plan) == [1, 2, 3, 4, 5]
+    session_id = first["session_id"]
+    data = client.get(f"/api/session/{session_id}").json()
+    assert data["question_plan"] == plan
+    assert data["questions_asked"] == []  # nothing has been asked yet
+    client.post(f"/api/session/{session_id}/events", json=[
+        {"type": "question", "question_id": 2},
+        {"type": "message", "role": "student", "text": "Hindi mein samjhao"},
+    ])
+    client.post(f"/api/session/{session_id}/end")
+    assert app_module.scheduler.students["asha"].top_review(1) == [2]
+
+
+def test_start_session_rejects_malformed_student_ids():
+    response = client.post("/api/session/start", params={"student_id": "../" + "x" * 100})
+    assert response.status_code == 422
+
+
+def test_prompt_can_be_rendered_for_a_session_plan():
+    version = client.post("/api/session/start").json()["prompt_version"]
+    prompt = client.get(f"/api/prompt/{version}", params={"plan": [4, 2]})
+    assert prompt.status_code == 200
+    assert prompt.headers["etag"] == f'"{version}-4.2"'
+    assert "How will you fund" in prompt.text
+    assert "Why have you chosen to study" not in prompt.text
+    assert client.get("/api/prompt/stale", params={"plan": [4]}).status_code == 404
@@ -0,0 +1,106 @@
+"""Tests for the Hindi/English language and confusion detector."""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from server import detector, questions
+from server.agent import SessionLog
+from server.detector import NO_QUESTION, PhraseAutomaton, annotate_events, detect, tokenize
+
+CORPUS = os.path.join(
+    os.path.dirname(__file__), "..", "..", "benchmarks", "fixtures", "utterances.jsonl"
+)
+
+
+def test_tokenize_keeps_devanagari_and_drops_apostrophes():
+    assert tokenize("I don't know।") == ["i", "dont", "know"]
+    assert tokenize("समझ नहीं आया।") == ["समझ", "नहीं", "आया"]
+
+
+def test_automaton_finds_overlapping_phrases():
+    automaton = PhraseAutomaton({"x": ["a b c", "b c d", "c"]})
+    found = automaton.search(["a", "b", "c", "d"])
+    assert sorted(phrase for _, phrase in found) == ["a b c", "b c d", "c"]
+
+
+def test_detects_languages():
+    assert detect("I will study computer science in Canada").language == "en"
+    assert detect("Mere papa kharcha uthayenge").language == "hi"
+    assert detect("मेरे पिताजी खर्च उठाएंगे").language == "hi"
+
+
+def test_detects_confusion_and_hindi_requests():
+    assert detect("Sorry, I don't understand").confused
+    assert detect("Hindi mein samjhao").hindi_request
+    assert not detect("I understand the question").needs_hindi_help
+
+
+@pytest.mark.parametrize("text", [
+    "The cost of living is not clear yet, so my father set aside extra savings.",
+    "The visa rules are not clear about part-time work, so I read the official guide.",
+    "My uncle got a pardon for his traffic fine.",
+])
+def test_ordinary_answers_are_not_confusion(text):
+    detection = detect(text)
+    assert detection.language == "en"
+    assert not detection.needs_hindi_help
+
+
+def test_bare_replies_are_confusion_only_on_their_own():
+    assert detect("Pardon?").confused
+    assert detect("I beg your pardon, sir?").confused
+    assert not detect("Pardon the delay, I was reading the question.").confused
+
+
+def test_labeled_corpus_accuracy():
+    with open(CORPUS, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    correct = sum(
+        detect(r["text"]).language == r["language"]
+        and detect(r["text"]).needs_hindi_help == r["confused"]
+        for r in rows
+    )
+    assert correct / len(rows) >= 0.95
+
+
+def test_scorer_is_rebuilt_when_the_question_bank_reloads(monkeypatch, tmp_path):
+    path = tmp_path / "questions.json"
+    shutil.copy(questions.DEFAULT_QUESTION_BANK_PATH, path)
+    monkeypatch.setattr(detector, "question_bank", questions.QuestionBank(str(path), 0))
+    monkeypatch.setattr(detector, "_scorer_cache", None)
+    before = detector._current_scorer()
+    assert detector._current_scorer() is before
+
+    data = json.loads(path.read_text())
+    data["questions"][0]["hint_hi"] = "zindagi mein kuch banna hai"
+    path.write_text(json.dumps(data))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+
+    after = detector._current_scorer()
+    assert after is not before
+    assert after.score("zindagi") > before.score("zindagi")
+
+
+def test_annotate_events_adds_switch_for_current_question():
+    session = SessionLog(session_id="abc")
+    events = [
+        {"type": "question", "question_id": 2},
+        {"type": "message", "role": "student", "text": "Kya matlab?"},
+        {"type": "message", "role": "agent", "text": "I don't understand is fine to say."},
+    ]
+    session.add_events(annotate_events(session, events))
+    assert session.transcript[0]["language"] == "hi"
+    assert len(session.language_switches) == 1
+    assert session.language_switches[0]["question_id"] == 2
+
+
+def test_annotate_events_keeps_unmarked_switches_out_of_question_counts():
+    session = SessionLog(session_id="abc")
+    session.add_events(annotate_events(session, [
+        {"type": "message", "role": "student", "text": "Hindi mein samjhao please"},
+    ]))
+    assert session.language_switches[0]["question_id"] == NO_QUESTION
+    assert session.switch_counts == {}
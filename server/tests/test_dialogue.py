@@ -0,0 +1,115 @@
+"""Tests for the local interview dialogue engine."""
+
+from server.agent import CLOSING_LINE, SessionLog
+from server.dialogue import (
+    CLOSING,
+    FOLLOW_UP,
+    GREETING,
+    HINDI_HELP,
+    NUDGE,
+    QUESTION,
+    REASK,
+    InterviewDialogue,
+)
+from server.detector import detect
+from server.questions import get_question_by_id
+
+FULL_ANSWER = (
+    "My father will sponsor my studies from his business income and we also have "
+    "an education loan of twenty lakh rupees approved by the bank."
+)
+
+
+def _dialogue(plan=(2, 4)):
+    session = SessionLog(session_id="dlg", question_plan=list(plan))
+    return session, InterviewDialogue(session, greeting="Hello.")
+
+
+def test_starts_with_greeting_and_first_planned_question():
+    session, dialogue = _dialogue()
+    turns = dialogue.start()
+    assert [t.kind for t in turns] == [GREETING, QUESTION]
+    assert turns[1].text == get_question_by_id(2)["question_en"]
+    assert session.current_question_id == 2
+
+
+def test_vague_answers_get_written_follow_ups_then_move_on():
+    follow_ups = get_question_by_id(2)["follow_ups"]
+    _, dialogue = _dialogue()
+    dialogue.start()
+    first = dialogue.respond("My father.")
+    assert [(t.kind, t.text) for t in first] == [(FOLLOW_UP, follow_ups[0])]
+    second = dialogue.respond("Not sure.")
+    assert [(t.kind, t.text) for t in second] == [(FOLLOW_UP, follow_ups[1])]
+    third = dialogue.respond("No.")
+    assert [(t.kind, t.question_id) for t in third] == [(QUESTION, 4)]
+
+
+def test_complete_answer_moves_to_next_question_and_closes():
+    session, dialogue = _dialogue()
+    dialogue.start()
+    assert [t.kind for t in dialogue.respond(FULL_ANSWER)] == [QUESTION]
+    closing = dialogue.respond(
+        "After my degree I will come back to India to join my family business "
+        "because my parents and grandparents live here."
+    )
+    assert [(t.kind, t.text) for t in closing] == [(CLOSING, CLOSING_LINE)]
+    assert dialogue.respond("Thank you") == []
+    assert session.questions_asked == [2, 4]
+
+
+def test_confusion_gets_hindi_help_once_then_moves_on():
+    session, dialogue = _dialogue()
+    dialogue.start()
+    dialogue.respond("My father.")  # a follow-up is now the open prompt
+    help_turns = dialogue.respond("Sorry, samajh nahi aaya")
+    assert [(t.kind, t.language) for t in help_turns] == [(HINDI_HELP, "hi"), (REASK, "en")]
+    assert help_turns[0].text == get_question_by_id(2)["hint_hi"]
+    assert help_turns[1].text.endswith(get_question_by_id(2)["follow_ups"][0])
+    assert [t.question_id for t in dialogue.on_silence()] == [4]
+
+
+def test_hindi_answer_is_accepted_with_a_nudge():
+    _, dialogue = _dialogue()
+    dialogue.start()
+    turns = dialogue.respond("Mere papa pay karenge aur bank se loan bhi hai")
+    assert turns[0].kind == NUDGE
+
+
+def test_free_form_follow_up_only_after_written_ones(monkeypatch):
+    monkeypatch.setattr("server.dialogue.MAX_FOLLOW_UPS", 3)
+    session = SessionLog(session_id="dlg", question_plan=[2])
+    calls = []
+
+    def writer(question, answer):
+        calls.append((question["id"], answer))
+        return "Who exactly is your sponsor?"
+
+    dialogue = InterviewDialogue(session, follow_up_writer=writer)
+    dialogue.start()
+    dialogue.respond("My dad.")
+    dialogue.respond("No.")
+    assert calls == []
+    assert dialogue.respond("My dad.")[0].text == "Who exactly is your sponsor?"
+    assert calls == [(2, "My dad.")]
+
+
+def test_unplanned_session_asks_the_whole_bank_and_records_it():
+    session = SessionLog(session_id="dlg")
+    dialogue = InterviewDialogue(session)
+    dialogue.start()
+    while not dialogue.finished:
+        dialogue.respond(FULL_ANSWER * 2)
+    assert len(session.questions_asked) == 5
+
+
+def test_respond_reuses_the_callers_detection(monkeypatch):
+    _, dialogue = _dialogue()
+    dialogue.start()
+    detection = detect("Samajh nahi aaya")
+
+    def fail(text):
+        raise AssertionError("detected twice")
+
+    monkeypatch.setattr("server.dialogue.detect", fail)
+    assert dialogue.respond("Samajh nahi aaya", detection)[0].kind == HINDI_HELP
@@ -0,0 +1,65 @@
+"""Tests for streaming NDJSON session export."""
+
+import asyncio
+import gzip
+import json
+
+from server.agent import SessionLog
+from server.export import ndjson_chunks, page_records, session_records
+from server.store import InMemorySessionStore
+
+
+def _collect(records, **kwargs):
+    async def run():
+        return [chunk async for chunk in ndjson_chunks(records, **kwargs)]
+
+    return asyncio.run(run())
+
+
+def _session(session_id="abc"):
+    session = SessionLog(session_id=session_id)
+    session.add_message("agent", "Why this university?", "en", timestamp=1.0)
+    session.add_message("student", "Samajh nahi aaya", "hi", timestamp=2.0)
+    session.add_language_switch(1, "confusion", timestamp=2.5)
+    session.add_message("student", "For its research labs", "en", timestamp=3.0)
+    return session
+
+
+def test_session_records_merge_messages_and_switches_in_time_order():
+    records = list(session_records(_session()))
+    assert records[0]["type"] == "session"
+    assert [r["type"] for r in records[1:]] == ["message", "message", "switch", "message"]
+    assert all(r["session_id"] == "abc" for r in records)
+
+
+def test_chunks_are_bounded_and_gzip_round_trips():
+    session = SessionLog(session_id="big")
+    for i in range(2000):
+        session.add_message("student", f"Answer number {i} " * 5, "en", timestamp=float(i))
+    chunks = _collect(session_records(session), chunk_bytes=4096)
+    assert len(chunks) > 10
+    assert max(len(c) for c in chunks) < 4096 + 512
+    lines = b"".join(chunks).splitlines()
+    assert len(lines) == 2001
+
+    compressed = _collect(session_records(session), compress=True, chunk_bytes=4096)
+    assert gzip.decompress(b"".join(compressed)).splitlines() == lines
+
+
+def test_live_iteration_skips_trimmed_and_ignores_new_entries():
+    session = SessionLog(session_id="abc")
+    for i in range(10):
+        session.add_message("student", str(i), "en")
+    entries = session.transcript.iter_live()
+    assert next(entries)["text"] == "0"
+    session.transcript.drop_oldest(4)
+    session.add_message("student", "late", "en")
+    assert [e["text"] for e in entries] == ["4", "5", "6", "7", "8", "9"]
+
+
+def test_page_records_skip_missing_sessions():
+    store = InMemorySessionStore()
+    store.put(_session("a"))
+    records = list(page_records(store, ["a", "gone"], next_cursor="gone"))
+    assert records[-1] == {"type": "page", "sessions": 1, "next_cursor": "gone"}
+    assert json.dumps(records)
@@ -1,7 +1,13 @@
 """Tests for the feedback summary generator."""
 
-from server.agent import SessionLog
-from server.feedback import generate_feedback
+import asyncio
+import json
+import random
+
+import pytest
+
+from server.agent import NO_QUESTION, SessionLog
+from server.feedback import FeedbackService, generate_feedback
 
 
 def _make_session(session_id="test-001"):
@@ -53,6 +59,17 @@ def test_language_switches_tracked():
     assert len(fb["improvements"]) >= 1
 
 
+def test_switches_without_a_marked_question():
+    session = _make_session()
+    session.add_language_switch(NO_QUESTION, "confusion: pardon")
+    session.add_message("student", "Pardon?", language="en")
+    session.end_session()
+    fb = generate_feedback(session)
+    assert fb["language_switches"] == 1
+    assert fb["questions_needing_hindi_help"] == []
+    assert fb["improvements"][0] == "You needed Hindi help on 1 occasion(s)."
+
+
 def test_summary_text_includes_key_info():
     session = _make_session()
     session.add_message("student", "I study engineering", language="en")
@@ -71,3 +88,89 @@ def test_few_responses_improvement_note():
     session.end_session()
     fb = generate_feedback(session)
     assert any("very few responses" in imp for imp in fb["improvements"])
+
+
+def _legacy_counts(session):
+    """Counts as the original full-transcript scan computed them."""
+    total_messages = len([t for t in session.transcript if t["role"] == "student"])
+    questions_needing_help = list({s["question_id"] for s in session.language_switches})
+    return total_messages, questions_needing_help
+
+
+def test_running_aggregates_match_full_scan():
+    rng = random.Random(7)
+    for n in range(50):
+        session = _make_session(f"s{n}")
+        for _ in range(rng.randint(0, 40)):
+            if rng.random() < 0.25:
+                session.add_language_switch(rng.choice([1, 2, 3, 4, 5, 9, 17, 33]), "confusion")
+            else:
+                session.add_message(
+                    rng.choice(["student", "agent"]), "text", language=rng.choice(["en", "hi"])
+                )
+        session.end_session()
+        fb = generate_feedback(session)
+        total_messages, questions_needing_help = _legacy_counts(session)
+        assert fb["total_questions_faced"] == total_messages
+        assert fb["questions_needing_hindi_help"] == questions_needing_help
+
+
+def test_feedback_survives_record_round_trip():
+    session = _make_session()
+    session.add_message("student", "Answer", language="en")
+    session.add_language_switch(3, "silence")
+    session.end_session()
+    restored = SessionLog.from_record(json.loads(json.dumps(session.to_record())))
+    assert generate_feedback(restored) == generate_feedback(session)
+    assert restored.first_switch_at == session.first_switch_at
+
+
+def test_counts_stay_exact_after_transcript_trim():
+    session = SessionLog(session_id="long", transcript_budget_bytes=2_000)
+    for i in range(100):
+        session.add_message("student", f"answer {i}", language="en")
+    assert len(session.transcript) < 100
+    assert generate_feedback(session)["total_questions_faced"] == 100
+
+
+@pytest.mark.parametrize("answer_scoring", [True, False])
+def test_feedback_service_memoizes_and_coalesces(monkeypatch, answer_scoring):
+    monkeypatch.setattr("server.feedback.ANSWER_SCORING", answer_scoring)
+    service = FeedbackService()
+    session = _make_session()
+    session.add_message("student", "My father will sponsor me", language="en")
+    session.end_session()
+
+    async def run():
+        reports = await asyncio.gather(*(service.get(session) for _ in range(20)))
+        again = await service.get(session)
+        session.add_language_switch(2, "confusion")
+        changed = await service.get(session)
+        return reports, again, changed
+
+    reports, again, changed = asyncio.run(run())
+    service.close()
+    assert all(report is reports[0] for report in reports + [again])
+    assert reports[0]["language_switches"] == 0
+    assert changed["language_switches"] == 1
+    assert service.computations == 2
+
+
+@pytest.mark.parametrize("answer_scoring", [True, False])
+def test_feedback_service_reports_the_version_it_caches(monkeypatch, answer_scoring):
+    monkeypatch.setattr("server.feedback.ANSWER_SCORING", answer_scoring)
+    service = FeedbackService()
+    session = _make_session()
+    session.add_message("student", "My father will sponsor me", language="en")
+    session.end_session()
+
+    async def run():
+        pending = asyncio.ensure_future(service.get(session))
+        await asyncio.sleep(0)  # get() has taken the version and queued the computation
+        session.add_message("student", "Mere papa pay karenge", language="hi")
+        return await pending, await service.get(session)
+
+    first, second = asyncio.run(run())
+    service.close()
+    assert first["total_questions_faced"] == 1
+    assert second["total_questions_faced"] == 2
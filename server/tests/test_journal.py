@@ -0,0 +1,160 @@
+"""Tests for the append-only session journal and crash recovery."""
+
+import os
+import time
+
+import pytest
+
+from server.agent import SessionLog
+from server.journal import SessionJournal, read_segment
+
+
+@pytest.fixture
+def journaled(tmp_path):
+    """Open a journal on tmp_path and route SessionLog changes to it."""
+    journals = []
+
+    def open_journal(**kwargs):
+        journal = SessionJournal(str(tmp_path), fsync_interval=0.001, **kwargs)
+        recovered = journal.recover()
+        SessionLog.journal = journal
+        journals.append(journal)
+        return journal, recovered
+
+    yield open_journal
+    SessionLog.journal = None
+    for journal in journals:
+        journal.close()
+
+
+def _crash(journal):
+    """Stop journaling as a crash would, after the last fsync."""
+    assert journal.flush()
+    SessionLog.journal = None
+    journal.close()
+
+
+def _segments(path):
+    return sorted(name for name in os.listdir(path) if name.endswith(".log"))
+
+
+def test_recovers_sessions_in_progress(journaled):
+    journal, recovered = journaled()
+    assert recovered == []
+    session = SessionLog(
+        session_id="abc", student_id="asha", question_plan=[4, 2], transcript_budget_bytes=10_000
+    )
+    journal.start(session)
+    session.mark_question(2)
+    session.add_message("agent", "How will you fund your studies?", "en")
+    session.add_message("student", "Papa pay karenge", "hi")
+    session.add_language_switch(2, "confusion")
+    _crash(journal)
+
+    _, recovered = journaled()
+    assert len(recovered) == 1
+    restored = recovered[0]
+    assert restored.to_record() == session.to_record()
+
+
+def test_ended_sessions_are_not_recovered_and_segments_are_deleted(journaled, tmp_path):
+    journal, _ = journaled(segment_bytes=200)
+    for i in range(20):
+        session = SessionLog(session_id=f"s{i}")
+        journal.start(session)
+        session.add_message("student", "My father will sponsor my studies.", "en")
+        session.end_session()
+        journal.flush()
+    assert journal.stats["deleted"] > 0
+    assert len(_segments(tmp_path)) <= 2
+    _crash(journal)
+
+    _, recovered = journaled()
+    assert recovered == []
+
+
+def test_mostly_dead_segment_is_compacted(journaled, tmp_path):
+    journal, _ = journaled(segment_bytes=10_000_000)
+    sessions = [SessionLog(session_id=f"s{i}") for i in range(4)]
+    for session in sessions:
+        journal.start(session)
+        session.add_message("student", "Hello", "en")
+    for session in sessions[:3]:
+        session.end_session()
+    _crash(journal)
+
+    # Reopening closes the old segment; three of its four sessions have ended.
+    journal, recovered = journaled()
+    assert [s.session_id for s in recovered] == ["s3"]
+    assert journal.stats["compacted"] == 1
+    records, _ = read_segment(os.path.join(tmp_path, _segments(tmp_path)[0]))
+    assert {record["s"] for record, _ in records} == {"s3"}
+
+
+def test_torn_tail_is_truncated(journaled, tmp_path):
+    journal, _ = journaled()
+    session = SessionLog(session_id="abc")
+    journal.start(session)
+    session.add_message("student", "first", "en")
+    session.add_message("student", "second", "en")
+    _crash(journal)
+    [name] = _segments(tmp_path)
+    path = os.path.join(tmp_path, name)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 3)
+
+    _, recovered = journaled()
+    assert [entry["text"] for entry in recovered[0].transcript] == ["first"]
+
+
+def test_idle_sessions_are_dropped(journaled):
+    journal, _ = journaled()
+    session = SessionLog(session_id="old", start_time=0)
+    journal.start(session)
+    session.add_message("student", "hello", "en", timestamp=1.0)
+    _crash(journal)
+
+    _, recovered = journaled(max_idle=3600)
+    assert recovered == []
+
+
+def test_abandoned_sessions_do_not_pin_segments(journaled, tmp_path):
+    journal, _ = journaled(segment_bytes=200, max_idle=0.05)
+    abandoned = SessionLog(session_id="abandoned")
+    journal.start(abandoned)
+    abandoned.add_message("student", "My father will sponsor my studies.", "en")
+    assert journal.flush()
+    time.sleep(0.1)
+    for i in range(10):
+        session = SessionLog(session_id=f"s{i}")
+        journal.start(session)
+        session.add_message("student", "My father will sponsor my studies.", "en")
+        session.end_session()
+        assert journal.flush()
+    assert journal.stats["expired"] == 1
+    assert len(_segments(tmp_path)) <= 2
+    for name in _segments(tmp_path):
+        records, _ = read_segment(os.path.join(tmp_path, name))
+        assert "abandoned" not in {record["s"] for record, _ in records}
+
+
+def test_workers_sharing_a_directory_keep_to_their_own_slot(tmp_path):
+    first = SessionJournal(str(tmp_path), fsync_interval=0.001)
+    second = SessionJournal(str(tmp_path), fsync_interval=0.001)
+    assert first.recover() == [] and second.recover() == []
+    assert (first.slot, second.slot) == (0, 1)
+    SessionLog.journal = first
+    SessionLog(session_id="a").add_message("student", "hello", "en")
+    SessionLog.journal = second
+    SessionLog(session_id="b").add_message("student", "hello", "en")
+    SessionLog.journal = None
+    assert first.flush() and second.flush()
+    assert _segments(tmp_path) == ["journal-0-00000001.log", "journal-1-00000001.log"]
+    second.close()
+
+    # The slot a worker gave up is taken over, with its sessions, on restart.
+    restarted = SessionJournal(str(tmp_path), fsync_interval=0.001)
+    assert [s.session_id for s in restarted.recover()] == ["b"]
+    assert restarted.slot == 1
+    first.close()
+    restarted.close()
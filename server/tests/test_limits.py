@@ -0,0 +1,141 @@
+"""Tests for admission control and per-client rate limiting."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from server.limits import (
+    GENERAL,
+    PRIORITY,
+    START,
+    ActiveSessions,
+    Limiter,
+    RateLimitMiddleware,
+    TokenBuckets,
+    classify,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _scope(path, method="POST", client="1.2.3.4", headers=()):
+    return {"type": "http", "method": method, "path": path, "client": (client, 5000),
+            "headers": list(headers)}
+
+
+@pytest.mark.parametrize("method, path, expected", [
+    ("POST", "/api/session/start", (START, None)),
+    ("POST", "/api/session/ab12/end", (PRIORITY, "ab12")),
+    ("POST", "/api/session/ab12/events/stream", (PRIORITY, "ab12")),
+    ("GET", "/api/session/ab12/feedback", (GENERAL, "ab12")),
+    ("GET", "/api/session/ab12", (GENERAL, "ab12")),
+    ("GET", "/api/sessions/export", (GENERAL, None)),
+    ("GET", "/ws/audio/ab12", (PRIORITY, "ab12")),
+    ("GET", "/metrics", (None, None)),
+    ("GET", "/static/app.css", (None, None)),
+])
+def test_classify(method, path, expected):
+    assert classify(method, path) == expected
+
+
+def test_token_bucket_refills_and_reports_wait():
+    buckets = TokenBuckets(rate=2, burst=3)
+    assert [buckets.take("ip", 0.0) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("ip", 0.0) == pytest.approx(0.5)
+    assert buckets.take("ip", 0.5) == 0
+    assert buckets.take("other", 0.5) == 0
+
+
+def test_token_buckets_drop_least_recent_clients():
+    buckets = TokenBuckets(rate=1, burst=1, max_keys=2)
+    for key in ("a", "b", "c"):
+        buckets.take(key, 0.0)
+    assert len(buckets) == 2
+    assert buckets.take("a", 0.0) == 0  # forgotten, so it starts full again
+
+
+def test_start_is_rate_limited_per_client_with_retry_after():
+    limiter = Limiter(start_rate=0.5, start_burst=2, clock=FakeClock())
+    assert limiter.check(_scope("/api/session/start")) is None
+    assert limiter.check(_scope("/api/session/start")) is None
+    status, retry_after, _ = limiter.check(_scope("/api/session/start"))
+    assert (status, retry_after) == (429, 2)
+    assert limiter.check(_scope("/api/session/start", client="5.6.7.8")) is None
+
+
+def test_forwarded_client_only_when_proxy_is_trusted():
+    headers = [(b"x-forwarded-for", b"9.9.9.9, 10.0.0.1")]
+    trusted = Limiter(start_rate=1, start_burst=1, trust_proxy=True, clock=FakeClock())
+    assert trusted.check(_scope("/api/session/start", headers=headers)) is None
+    assert trusted.check(_scope("/api/session/start", client="other", headers=headers))[0] == 429
+
+
+def test_capacity_rejects_new_interviews_but_not_running_ones():
+    clock = FakeClock()
+    limiter = Limiter(max_active=2, rate=1, burst=1, clock=clock)
+    limiter.started("a")
+    limiter.started("b")
+    status, retry_after, _ = limiter.check(_scope("/api/session/start"))
+    assert (status, retry_after) == (503, 5)
+    for _ in range(5):
+        assert limiter.check(_scope("/api/session/a/events")) is None
+    assert limiter.check(_scope("/api/session/a/end")) is None
+    limiter.ended("a")
+    assert limiter.check(_scope("/api/session/start")) is None
+
+
+def test_admitted_starts_reserve_their_slot():
+    limiter = Limiter(max_active=2, clock=FakeClock())
+    first, second = _scope("/api/session/start"), _scope("/api/session/start")
+    assert limiter.check(first) is None
+    assert limiter.check(second) is None
+    assert limiter.check(_scope("/api/session/start"))[0] == 503  # both slots are held
+    limiter.started("a", first)
+    limiter.release(second)  # e.g. the request failed before creating a session
+    assert limiter.stats()["active_interviews"] == 1
+    limiter.release(first)  # already taken over by "a"
+    assert limiter.stats()["active_interviews"] == 1
+
+
+def test_idle_interviews_give_their_slot_back():
+    clock = FakeClock()
+    active = ActiveSessions(idle_seconds=60)
+    active.started("a", clock.now)
+    active.started("b", clock.now)
+    clock.now += 50
+    active.touch("a", clock.now)
+    clock.now += 20
+    assert active.count(clock.now) == 1
+    clock.now += 60
+    assert active.count(clock.now) == 0
+
+
+def test_middleware_short_circuits_rejections():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    limiter = Limiter(start_rate=1, start_burst=1, clock=FakeClock())
+    wrapped = RateLimitMiddleware(app, limiter)
+
+    async def run():
+        transport = httpx.ASGITransport(app=wrapped)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return [await http.post("/api/session/start") for _ in range(2)]
+
+    ok, limited = asyncio.run(run())
+    assert ok.status_code == 200
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "1"
+    assert limited.json() == {"detail": "Too many requests"}
+    assert calls == ["/api/session/start"]
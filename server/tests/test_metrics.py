@@ -0,0 +1,79 @@
+"""Tests for the metrics primitives and the slow-request profiler."""
+
+import asyncio
+
+import pytest
+
+from server.metrics import Counter, Gauge, Histogram, Registry, SlowRequestProfiler
+
+
+def test_counter_and_gauge_render():
+    registry = Registry()
+    requests = Counter("requests_total", "Requests.", ("route",), registry=registry)
+    requests.inc("/a")
+    requests.inc("/a", amount=2)
+    requests.inc('/b"')
+    depth = Gauge("depth", "Queue depth.", registry=registry)
+    depth.set_function(lambda: 7)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a"} 3' in text
+    assert 'requests_total{route="/b\\""} 1' in text
+    assert "depth 7" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_count 4" in lines
+    assert latency.count() == 4
+
+
+def test_label_count_is_checked():
+    registry = Registry()
+    counter = Counter("things_total", "Things.", ("kind",), registry=registry)
+    with pytest.raises(ValueError):
+        counter.inc()
+    with pytest.raises(ValueError):
+        Counter("things_total", "Again.", registry=registry)
+
+
+def test_profiler_samples_only_slow_requests():
+    profiler = SlowRequestProfiler(threshold=0.02, interval=0.002)
+
+    async def slow_handler():
+        await asyncio.sleep(0.1)
+
+    async def request(route, handler):
+        token = profiler.begin(route)
+        try:
+            await handler()
+        finally:
+            profiler.end(token)
+
+    async def run():
+        await asyncio.gather(
+            request("/slow", slow_handler),
+            request("/fast", lambda: asyncio.sleep(0)),
+        )
+
+    profiler.enable()
+    try:
+        asyncio.run(run())
+    finally:
+        profiler.disable()
+
+    report = profiler.report()
+    assert profiler.samples > 0
+    assert report.startswith("/slow;")
+    assert "slow_handler" in report
+    assert "/fast" not in report
+    assert not profiler.enabled
@@ -1,6 +1,18 @@
 """Tests for the visa question bank."""
 
-from server.questions import get_all_questions, get_question_by_id, get_questions_by_category
+import json
+import os
+
+import pytest
+
+from server.questions import (
+    QuestionBank,
+    get_all_questions,
+    get_category_label,
+    get_question_by_id,
+    get_questions_by_category,
+    get_questions_by_country,
+)
 
 
 def test_all_questions_returns_five():
@@ -38,3 +50,70 @@ def test_questions_cover_all_categories():
     categories = {q["category"] for q in get_all_questions()}
     expected = {"study_plans", "financial", "return_intent", "academic", "english_proficiency"}
     assert categories == expected
+
+
+def _write_bank(path, questions_data, categories=None):
+    path.write_text(json.dumps({"categories": categories or {}, "questions": questions_data}))
+
+
+def _touch_later(path):
+    mtime_ns = os.stat(path).st_mtime_ns + 1_000_000
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def _question(qid, category="financial", country="any"):
+    return {
+        "id": qid,
+        "question_en": f"Question {qid}?",
+        "hint_hi": f"Sawaal {qid}?",
+        "category": category,
+        "country": country,
+        "follow_ups": ["Why?"],
+    }
+
+
+def test_bank_indexes_by_country(tmp_path):
+    path = tmp_path / "questions.json"
+    _write_bank(path, [_question(1), _question(2, country="usa"), _question(3, country="uk")])
+    bank = QuestionBank(str(path))
+    assert [q["id"] for q in bank.by_country["usa"]] == [2, 1]
+    assert [q["id"] for q in bank.by_country["any"]] == [1]
+
+
+def test_get_questions_by_country_includes_generic_questions():
+    ids = {q["id"] for q in get_questions_by_country("canada")}
+    assert ids == {1, 2, 3, 4, 5}
+
+
+def test_bank_reloads_on_mtime_change(tmp_path):
+    path = tmp_path / "questions.json"
+    _write_bank(path, [_question(1)])
+    bank = QuestionBank(str(path), check_interval=0)
+    version = bank.version
+
+    _write_bank(path, [_question(1), _question(2, category="academic")])
+    _touch_later(path)
+    assert len(bank.current().questions) == 2
+    assert bank.by_id[2]["category"] == "academic"
+    assert bank.version != version
+
+
+def test_bank_keeps_previous_version_on_bad_file(tmp_path):
+    path = tmp_path / "questions.json"
+    _write_bank(path, [_question(1)])
+    bank = QuestionBank(str(path), check_interval=0)
+    path.write_text("{not json")
+    _touch_later(path)
+    assert bank.current().by_id[1]["question_en"] == "Question 1?"
+
+
+def test_bank_rejects_duplicate_ids(tmp_path):
+    path = tmp_path / "questions.json"
+    _write_bank(path, [_question(1), _question(1)])
+    with pytest.raises(ValueError):
+        QuestionBank(str(path))
+
+
+def test_category_labels():
+    assert get_category_label("financial") == "financial capability"
+    assert get_category_label("unknown") == "general"
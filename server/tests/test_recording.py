@@ -0,0 +1,121 @@
+"""Tests for chunked session audio recording and indexed playback."""
+
+import io
+import os
+import time
+import wave
+
+import pytest
+
+from server.agent import SessionLog
+from server.recording import WAV_HEADER_BYTES, AudioRecorder, parse_range
+
+CHUNK = 3200  # 0.1 s of 16 kHz PCM16
+
+
+def _frame(value: int, samples: int = 800) -> bytes:
+    return value.to_bytes(2, "little") * samples  # 0.05 s by default
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    recorder = AudioRecorder(str(tmp_path), chunk_bytes=CHUNK)
+    yield recorder
+    recorder.close()
+
+
+def _record(recorder, session_id, frames, start=100.0):
+    recording = recorder.open(session_id)
+    now = start
+    for frame in frames:
+        now += len(frame) / 32000
+        recording.write(frame, now=now)
+    recording.close()
+    assert recorder.flush()
+
+
+def test_chunks_are_padded_indexed_and_playable(recorder, tmp_path):
+    _record(recorder, "s1", [_frame(i) for i in range(1, 6)])  # 0.25 s -> 3 chunks
+    playback = recorder.open_playback("s1")
+    assert playback.data_bytes == 3 * CHUNK
+    assert list(playback.times) == pytest.approx([100.0, 100.1, 100.2])
+
+    served = b"".join(playback.iter_bytes(0, playback.size))
+    with wave.open(io.BytesIO(served)) as wav:
+        assert (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) == (16000, 1, 2)
+        assert wav.getnframes() == 3 * CHUNK // 2
+    # The file on disk gets its final header when the recording closes.
+    with wave.open(str(tmp_path / "s1.wav")) as wav:
+        assert wav.getnframes() == 3 * CHUNK // 2
+    assert served[-2:] == b"\x00\x00"  # silence padding
+
+
+def test_offsets_follow_capture_time_and_reconnects_append(recorder):
+    _record(recorder, "s1", [_frame(1)] * 4)  # 100.0 .. 100.2
+    _record(recorder, "s1", [_frame(2)] * 2, start=200.0)  # after a reconnect
+    playback = recorder.open_playback("s1")
+    assert playback.data_bytes == 3 * CHUNK
+    assert playback.offset_at(50.0) == WAV_HEADER_BYTES
+    assert playback.offset_at(100.05) == WAV_HEADER_BYTES + 1600
+    assert playback.offset_at(150.0) == WAV_HEADER_BYTES + 2 * CHUNK  # end of the first connection
+    assert playback.offset_at(200.0) == WAV_HEADER_BYTES + 2 * CHUNK
+    start = playback.offset_at(200.0)
+    assert b"".join(playback.iter_bytes(start, start + 4)) == _frame(2, 2)
+
+
+def test_utterance_ranges_come_from_transcript_timestamps(recorder):
+    _record(recorder, "s1", [_frame(1)] * 40)  # 2 s of audio from t=100
+    session = SessionLog(session_id="s1", start_time=100.0)
+    session.add_message("agent", "Why this university?", "en", timestamp=100.2)
+    session.add_message("student", "For its research", "en", timestamp=101.0)
+    playback = recorder.open_playback("s1")
+    (utterance,) = playback.utterances(session)
+    assert utterance["index"] == 1
+    assert utterance["start"] == WAV_HEADER_BYTES + int(0.2 * 32000)
+    assert utterance["stop"] == WAV_HEADER_BYTES + int(1.5 * 32000)
+    assert utterance["seconds"] == pytest.approx(0.2)
+    playback.close()
+
+
+def test_missing_or_unsafe_sessions_have_no_recording(recorder):
+    assert recorder.open_playback("nothing") is None
+    assert recorder.open_playback("../etc/passwd") is None
+    with pytest.raises(ValueError):
+        recorder.open("../escape")
+
+
+def test_old_recordings_are_deleted(tmp_path):
+    recorder = AudioRecorder(str(tmp_path), chunk_bytes=CHUNK, max_age=3600)
+    try:
+        _record(recorder, "old", [_frame(1)] * 2)
+        _record(recorder, "new", [_frame(1)] * 2)
+        stale = time.time() - 7200
+        for name in ("old.wav", "old.idx"):
+            os.utime(tmp_path / name, (stale, stale))
+        recorder.expire()
+        assert recorder.flush()
+        assert recorder.open_playback("old") is None
+        assert sorted(os.listdir(tmp_path)) == ["new.idx", "new.wav"]
+        assert recorder.stats["expired"] == 1
+    finally:
+        recorder.close()
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", (0, 100)),
+    ("bytes=100-", (100, 1000)),
+    ("bytes=-200", (800, 1000)),
+    ("bytes=900-5000", (900, 1000)),
+    ("bytes=5-2", None),
+    ("bytes=0-1,4-5", None),
+    ("items=0-1", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=-0"])
+def test_parse_range_rejects_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1000)
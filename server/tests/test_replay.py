@@ -0,0 +1,117 @@
+"""Tests for replaying recorded sessions."""
+
+import asyncio
+import gzip
+import json
+import time
+from unittest.mock import patch
+
+import httpx
+
+from server.agent import SessionLog
+from server.app import app
+from server.detector import annotate_events
+from server.export import session_records
+from server.feedback import generate_feedback
+from server.replay import (
+    batches,
+    load_recordings,
+    paced,
+    read_recordings,
+    rebuild,
+    replay_events,
+    replay_http,
+)
+
+QUESTION = "How will you fund your education and living expenses?"
+FOLLOW_UP = "Do you have a scholarship or education loan?"
+
+
+def _recorded_session(session_id="rec1"):
+    """A session built the way the app ingests a live interview."""
+    session = SessionLog(session_id=session_id, student_id="stu", start_time=100.0, questions_asked=[2])
+    events = [
+        {"type": "question", "question_id": 2},
+        {"type": "message", "role": "agent", "text": QUESTION, "timestamp": 101.0},
+        {"type": "message", "role": "student", "text": "Samajh nahi aaya", "timestamp": 104.0},
+        {"type": "message", "role": "agent", "text": FOLLOW_UP, "timestamp": 110.0},
+        {"type": "message", "role": "student", "text": "My father will pay with a bank loan.",
+         "timestamp": 130.0},
+        {"type": "switch", "question_id": 2, "reason": "student asked", "timestamp": 131.0},
+    ]
+    session.add_events(annotate_events(session, events))
+    session.end_time = 160.0
+    return session
+
+
+def _export(*sessions) -> list[str]:
+    return [json.dumps(r) for s in sessions for r in session_records(s)] + [
+        json.dumps({"type": "page", "sessions": len(sessions), "next_cursor": None})
+    ]
+
+
+def test_read_recordings_splits_an_export_by_session(tmp_path):
+    lines = _export(_recorded_session("a"), _recorded_session("b"))
+    recordings = list(read_recordings(lines))
+    assert [r.session_id for r in recordings] == ["a", "b"]
+    assert recordings[0].student_id == "stu"
+    assert len(recordings[0].records) == 6  # 4 messages, the derived switch and the explicit one
+
+    path = tmp_path / "export.ndjson.gz"
+    path.write_bytes(gzip.compress("\n".join(lines).encode()))
+    assert load_recordings(str(path)) == recordings
+
+
+def test_replay_events_regenerate_derived_switches_and_mark_questions():
+    (recording,) = read_recordings(_export(_recorded_session()))
+    events = replay_events(recording)
+    assert [e["type"] for e in events] == [
+        "question", "message", "message", "message", "message", "switch",
+    ]
+    assert events[0]["question_id"] == 2
+    assert events[-1]["reason"] == "student asked"
+
+
+def test_rebuild_reproduces_the_recorded_feedback():
+    original = _recorded_session()
+    (recording,) = read_recordings(_export(original))
+    rebuilt = rebuild(recording)
+    assert rebuilt.language_switches == original.language_switches
+    assert rebuilt.question_responses == original.question_responses
+    assert generate_feedback(rebuilt) == generate_feedback(original)
+
+
+def test_batches_group_events_and_pace_by_speed():
+    (recording,) = read_recordings(_export(_recorded_session()))
+    grouped = batches(recording, window=1.0)
+    assert [offset for offset, _ in grouped] == [1.0, 4.0, 10.0, 30.0]
+    assert len(grouped[-1][1]) == 2  # the answer and the switch a second later
+
+    async def run(speed):
+        started = time.perf_counter()
+        count = 0
+        async for _ in paced(grouped, speed):
+            count += 1
+        return count, time.perf_counter() - started
+
+    count, elapsed = asyncio.run(run(0))
+    assert count == 4 and elapsed < 0.2
+    count, elapsed = asyncio.run(run(100))  # the last batch is due 0.3 s in
+    assert count == 4 and elapsed >= 0.29
+
+
+@patch("server.app.get_signed_url", side_effect=Exception("skip"))
+def test_replay_http_drives_the_session_api(mock_signed_url):
+    original = _recorded_session()
+    (recording,) = read_recordings(_export(original))
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await replay_http(http, recording, speed=0)
+
+    feedback = asyncio.run(run())
+    expected = generate_feedback(original)
+    assert feedback["session_id"] != original.session_id
+    for key in ("total_questions_faced", "language_switches", "hindi_responses", "answer_quality"):
+        assert feedback[key] == expected[key]
@@ -0,0 +1,114 @@
+"""Tests for the adaptive question scheduler."""
+
+import json
+import random
+from collections import Counter
+
+import pytest
+
+from server.agent import SessionLog
+from server.questions import QuestionBank
+from server.scheduler import QuestionScheduler, StudentStats
+
+CATEGORIES = ("study_plans", "financial", "return_intent", "academic")
+
+
+@pytest.fixture
+def large_bank(tmp_path, monkeypatch):
+    questions = [
+        {
+            "id": qid,
+            "question_en": f"Question {qid}?",
+            "hint_hi": f"Sawaal {qid}?",
+            "category": CATEGORIES[qid % len(CATEGORIES)],
+            "follow_ups": [],
+        }
+        for qid in range(1, 2001)
+    ]
+    path = tmp_path / "questions.json"
+    path.write_text(json.dumps({"questions": questions}))
+    bank = QuestionBank(str(path))
+    monkeypatch.setattr("server.scheduler.question_bank", bank)
+    return bank
+
+
+def _struggled(session_id, question_ids, switches=2):
+    session = SessionLog(session_id=session_id)
+    for qid in question_ids:
+        session.mark_question(qid)
+        session.add_message("student", "Samajh nahi aaya", "hi")
+        for _ in range(switches):
+            session.add_language_switch(qid, "confusion")
+    return session
+
+
+def test_plan_has_distinct_questions_in_category_order(large_bank):
+    scheduler = QuestionScheduler(plan_size=12, rng=random.Random(1))
+    plan = scheduler.plan("asha")
+    assert len(plan) == len(set(plan)) == 12
+    bank_order = list(dict.fromkeys(q["category"] for q in large_bank.questions))
+    ranks = [bank_order.index(large_bank.by_id[qid]["category"]) for qid in plan]
+    assert ranks == sorted(ranks)
+
+
+def test_rotation_serves_fresh_questions_across_sessions(large_bank):
+    scheduler = QuestionScheduler(plan_size=8, rng=random.Random(2))
+    seen = Counter()
+    for _ in range(20):
+        seen.update(scheduler.plan("asha"))
+    assert max(seen.values()) == 1
+
+
+def test_struggled_questions_come_back_first_and_weak_categories_dominate(large_bank):
+    scheduler = QuestionScheduler(plan_size=10, rng=random.Random(3))
+    financial = [qid for qid in range(1, 200) if large_bank.by_id[qid]["category"] == "financial"]
+    scheduler.record("asha", _struggled("s1", financial[:3]))
+    plan = scheduler.plan("asha")
+    assert set(financial[:3]) <= set(plan)
+
+    counts = Counter()
+    for _ in range(200):
+        counts.update(large_bank.by_id[qid]["category"] for qid in scheduler.plan("asha"))
+    assert counts["financial"] > 2 * counts["academic"]
+
+
+def test_mastered_questions_leave_the_review_queue(large_bank):
+    scheduler = QuestionScheduler(rng=random.Random(4))
+    scheduler.record("asha", _struggled("s1", [5], switches=1))
+    assert scheduler.students["asha"].top_review(4) == [5]
+    for n in range(10):
+        session = SessionLog(session_id=f"ok{n}")
+        session.mark_question(5)
+        session.add_message("student", "My father will sponsor me.", "en")
+        scheduler.record("asha", session, [{"question_id": 5, "score": 1.0}])
+    assert scheduler.students["asha"].top_review(4) == []
+
+
+def test_review_heap_stays_bounded_under_updates():
+    stats = StudentStats()
+    for i in range(10_000):
+        stats.set_priority(i % 50, 1 + (i % 7))
+    assert len(stats._heap) <= 2 * len(stats.priority) + 17
+    top = stats.top_review(3)
+    assert [stats.priority[qid] for qid in top] == sorted(stats.priority.values(), reverse=True)[:3]
+
+
+def test_snapshot_round_trip(large_bank, tmp_path):
+    path = str(tmp_path / "scheduler.json")
+    scheduler = QuestionScheduler(path, rng=random.Random(5))
+    scheduler.record("asha", _struggled("s1", [6, 7]))
+    scheduler.save()
+    restored = QuestionScheduler(path)
+    assert restored.students["asha"].priority == scheduler.students["asha"].priority
+    assert restored.students["asha"].weakness == scheduler.students["asha"].weakness
+
+
+def test_least_recently_seen_students_are_forgotten(large_bank):
+    scheduler = QuestionScheduler(rng=random.Random(6), max_students=2)
+    scheduler.plan("asha")
+    scheduler.plan("ravi")
+    scheduler.record("asha", _struggled("s1", [6]))
+    scheduler.plan("meera")
+    assert list(scheduler.students) == ["asha", "meera"]
+    scheduler.plan()  # anonymous sessions keep no stats
+    assert len(scheduler.students) == 2
@@ -0,0 +1,86 @@
+"""Tests for answer-quality scoring."""
+
+from server.agent import SessionLog
+from server.detector import tokenize
+from server.feedback import generate_feedback
+from server.scoring import EXPECTATIONS, MIN_WORDS, score_answer, score_transcript
+
+FUNDING = "How will you fund your education and living expenses?"
+WHY_COUNTRY = "Why have you chosen to study in this country instead of studying in India?"
+
+
+def _session(*lines):
+    session = SessionLog(session_id="scored")
+    for role, text in lines:
+        session.add_message(role, text, language="en")
+    return session
+
+
+def test_complete_financial_answer_covers_expected_concepts():
+    result = score_answer(
+        tokenize("My father will sponsor me and we have 40 lakh rupees in a fixed deposit."),
+        "financial",
+    )
+    assert result.coverage == 1.0
+    assert result.covered == ("funding source", "amount or proof")
+    assert result.missing == ("loan or scholarship",)
+    assert result.score > 0.9
+
+
+def test_short_filler_heavy_answer_scores_low():
+    result = score_answer(tokenize("Um, basically, you know, my family."), "financial")
+    assert result.words < MIN_WORDS
+    assert result.filler_rate > 0.3
+    assert result.score < 0.5
+
+
+def test_unknown_category_scores_length_and_fluency_only():
+    result = score_answer(tokenize("I am not sure about that at this moment, sorry sir."), "unknown")
+    assert result.category is None
+    assert result.coverage is None
+    assert 0 < result.score < 1
+
+
+def test_answers_are_attributed_to_recognised_questions():
+    session = _session(
+        ("student", "Hello sir, good morning."),
+        ("agent", FUNDING),
+        ("student", "My father will sponsor me."),
+        ("agent", "Do you have a scholarship or education loan?"),
+        ("student", "Yes, an education loan from SBI."),
+        ("agent", "Could you speak a little louder?"),
+        ("student", "An education loan from SBI."),
+        ("agent", WHY_COUNTRY),
+        ("student", "The university has great research labs for my masters program."),
+    )
+    results = score_transcript(session.transcript)
+    assert [(r.question_id, r.category) for r in results] == [
+        (None, None), (2, "financial"), (1, "study_plans"),
+    ]
+    financial = results[1]
+    assert set(financial.covered) == {"funding source", "loan or scholarship"}
+    assert financial.words == len(tokenize(
+        "My father will sponsor me. Yes, an education loan from SBI. An education loan from SBI."
+    ))
+
+
+def test_every_category_has_reachable_concepts():
+    for category, (expected, concepts) in EXPECTATIONS.items():
+        assert 0 < expected <= len(concepts)
+        for concept, phrases in concepts.items():
+            assert score_answer(tokenize(phrases[0]), category).covered == (concept,)
+
+
+def test_feedback_reports_answer_quality():
+    session = _session(("agent", WHY_COUNTRY), ("student", "I got admission."))
+    feedback = generate_feedback(session)
+    quality = feedback["answer_quality"]
+    assert quality["answers"][0]["question_id"] == 1
+    assert quality["answers"][0]["missing"] == ["program name", "university", "reason"]
+    assert any("study plans answers" in note for note in feedback["improvements"])
+
+
+def test_answer_scoring_can_be_switched_off(monkeypatch):
+    monkeypatch.setattr("server.feedback.ANSWER_SCORING", False)
+    session = _session(("agent", WHY_COUNTRY), ("student", "I got admission."))
+    assert "answer_quality" not in generate_feedback(session)
@@ -0,0 +1,211 @@
+"""Tests for the session store backends."""
+
+import json
+import tracemalloc
+
+import pytest
+
+from server.agent import SessionLog
+from server.store import InMemorySessionStore, SqliteSessionStore, create_session_store
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_put_and_get():
+    store = InMemorySessionStore()
+    store.put(SessionLog(session_id="abc"))
+    assert store.get("abc").session_id == "abc"
+    assert store.get("missing") is None
+    assert len(store) == 1
+
+
+def test_idle_sessions_expire():
+    clock = FakeClock()
+    store = InMemorySessionStore(idle_ttl=60, clock=clock)
+    store.put(SessionLog(session_id="abc"))
+    clock.now = 61
+    assert store.get("abc") is None
+    assert store.metrics()["evictions"]["idle"] == 1
+
+
+def test_access_keeps_session_alive():
+    clock = FakeClock()
+    store = InMemorySessionStore(idle_ttl=60, clock=clock)
+    store.put(SessionLog(session_id="abc"))
+    clock.now = 50
+    assert store.get("abc") is not None
+    clock.now = 100
+    assert store.get("abc") is not None
+
+
+def test_lru_eviction_over_max_sessions():
+    store = InMemorySessionStore(max_sessions=2)
+    store.put(SessionLog(session_id="a"))
+    store.put(SessionLog(session_id="b"))
+    store.get("a")
+    store.put(SessionLog(session_id="c"))
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert store.metrics()["evictions"]["lru"] == 1
+
+
+def test_transcript_budget_drops_oldest_entries():
+    store = InMemorySessionStore(max_transcript_bytes=10_000)
+    session = SessionLog(session_id="abc")
+    store.put(session)
+    for i in range(200):
+        session.add_message("student", f"answer {i}")
+    assert session.transcript_bytes <= 10_000
+    assert session.transcript[-1]["text"] == "answer 199"
+    assert session.student_language_usage["english"] == 200
+
+
+def test_metrics_report_bytes_held():
+    store = InMemorySessionStore()
+    session = SessionLog(session_id="abc")
+    store.put(session)
+    session.add_message("student", "hello")
+    metrics = store.metrics()
+    assert metrics["sessions"] == 1
+    assert metrics["approx_bytes"] > 0
+
+
+def test_scan_ids_pages_in_order_without_touching_sessions():
+    clock = FakeClock()
+    store = InMemorySessionStore(idle_ttl=60, clock=clock)
+    for session_id in ("c", "a", "d", "b"):
+        store.put(SessionLog(session_id=session_id))
+    assert store.scan_ids(None, 3) == ["a", "b", "c"]
+    assert store.scan_ids("c", 3) == ["d"]
+    clock.now = 50
+    assert store.peek("a") is not None
+    clock.now = 61
+    assert store.peek("a") is None  # peek did not refresh the idle timer
+
+
+def test_unknown_backend(monkeypatch):
+    monkeypatch.setenv("SESSION_STORE", "nope")
+    with pytest.raises(ValueError):
+        create_session_store()
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+
+def test_sqlite_sessions_visible_to_other_processes(sqlite_path):
+    worker_a = SqliteSessionStore(sqlite_path)
+    worker_b = SqliteSessionStore(sqlite_path)
+    try:
+        session = SessionLog(session_id="abc")
+        worker_a.put(session)
+        session.add_message("student", "I will study data science", language="en")
+        worker_a.save(session)
+        worker_a.flush()
+
+        loaded = worker_b.get("abc")
+        assert loaded.transcript[0]["text"] == "I will study data science"
+        assert loaded.student_language_usage["english"] == 1
+        assert loaded.start_time == session.start_time
+    finally:
+        worker_a.close()
+        worker_b.close()
+
+
+def test_sqlite_sessions_survive_restart(sqlite_path):
+    store = SqliteSessionStore(sqlite_path)
+    session = SessionLog(session_id="abc")
+    store.put(session)
+    session.add_language_switch(2, "confusion")
+    store.save(session)
+    store.close()
+
+    restarted = SqliteSessionStore(sqlite_path)
+    try:
+        assert restarted.get("abc").language_switches[0]["question_id"] == 2
+        assert len(restarted) == 1
+    finally:
+        restarted.close()
+
+
+def test_sqlite_reads_own_pending_writes(sqlite_path):
+    store = SqliteSessionStore(sqlite_path, flush_interval=60)
+    try:
+        session = SessionLog(session_id="abc")
+        store.put(session)
+        assert store.get("abc") is session
+        assert store.metrics()["pending_writes"] == 1
+    finally:
+        store.close()
+
+
+def test_sqlite_writes_the_record_as_of_save(sqlite_path):
+    store = SqliteSessionStore(sqlite_path, flush_interval=60)
+    try:
+        session = SessionLog(session_id="abc")
+        session.add_message("student", "saved", "en")
+        store.put(session)
+        session.add_message("student", "changed after save", "en")  # the writer must not see this
+        store.flush()
+        row = store._connect().execute("SELECT record FROM sessions").fetchone()
+        assert [e["text"] for e in json.loads(row[0])["transcript"]] == ["saved"]
+    finally:
+        store.close()
+
+
+def test_sqlite_delete(sqlite_path):
+    store = SqliteSessionStore(sqlite_path)
+    try:
+        store.put(SessionLog(session_id="abc"))
+        store.flush()
+        store.delete("abc")
+        store.flush()
+        assert store.get("abc") is None
+    finally:
+        store.close()
+
+
+def test_sqlite_scan_ids_includes_pending_writes(sqlite_path):
+    store = SqliteSessionStore(sqlite_path, flush_interval=60)
+    try:
+        store.put(SessionLog(session_id="b"))
+        store.flush()
+        store.put(SessionLog(session_id="a"))
+        store.put(SessionLog(session_id="c"))
+        store.delete("b")
+        assert store.scan_ids(None, 10) == ["a", "c"]
+        store.flush()
+        assert store.scan_ids("a", 10) == ["c"]
+    finally:
+        store.close()
+
+
+def test_soak_memory_stays_bounded():
+    """100k sessions through a 1k-session store must not grow memory past the cap."""
+    store = InMemorySessionStore(max_sessions=1_000)
+
+    def fill(start, count):
+        for i in range(start, start + count):
+            session = SessionLog(session_id=f"s{i}")
+            store.put(session)
+            session.add_message("student", "I plan to return to India after my degree.")
+
+    tracemalloc.start()
+    try:
+        fill(0, 10_000)
+        baseline, _ = tracemalloc.get_traced_memory()
+        fill(10_000, 90_000)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(store) == 1_000
+    assert store.metrics()["evictions"]["lru"] == 99_000
+    assert current < baseline * 1.5
@@ -0,0 +1,82 @@
+"""Tests for the local streaming speech-to-text pipeline."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from server.stt import SpeechStream, StreamingRecognizer
+
+
+class ScriptedRecognizer(StreamingRecognizer):
+    """Returns one scripted result per accepted chunk."""
+
+    def __init__(self, script, final=""):
+        self.script = list(script)
+        self.final = final
+        self.chunks = []
+
+    def accept(self, pcm):
+        self.chunks.append(pcm)
+        return self.script.pop(0) if self.script else None
+
+    def finish(self):
+        return self.final
+
+
+def _collect(stream, feed):
+    async def run():
+        results = []
+
+        async def consume():
+            async for result in stream.results():
+                results.append(result)
+
+        consumer = asyncio.create_task(consume())
+        await feed(stream)
+        stream.close()
+        await consumer
+        return results
+
+    return asyncio.run(run())
+
+
+def test_partials_then_final():
+    recognizer = ScriptedRecognizer(
+        [("partial", "my"), ("partial", "my father"), ("final", "my father will pay")],
+        final="",
+    )
+
+    async def feed(stream):
+        for _ in range(3):
+            stream.push(b"\x00\x00" * 1600)
+            await asyncio.sleep(0.01)
+
+    results = _collect(SpeechStream(recognizer, ThreadPoolExecutor(1)), feed)
+    assert results == [
+        ("partial", "my"),
+        ("partial", "my father"),
+        ("final", "my father will pay"),
+    ]
+
+
+def test_unchanged_partials_are_dropped_and_finish_flushes():
+    recognizer = ScriptedRecognizer([("partial", "yes"), ("partial", "yes")], final="yes sir")
+
+    async def feed(stream):
+        for _ in range(2):
+            stream.push(b"\x00\x00" * 160)
+            await asyncio.sleep(0.01)
+
+    results = _collect(SpeechStream(recognizer, ThreadPoolExecutor(1)), feed)
+    assert results == [("partial", "yes"), ("final", "yes sir")]
+
+
+def test_audio_arriving_during_decode_is_coalesced():
+    recognizer = ScriptedRecognizer([])
+
+    async def feed(stream):
+        for _ in range(5):
+            stream.push(b"\x01\x00")
+
+    _collect(SpeechStream(recognizer, ThreadPoolExecutor(1)), feed)
+    assert b"".join(recognizer.chunks) == b"\x01\x00" * 5
+    assert len(recognizer.chunks) < 5
@@ -0,0 +1,110 @@
+"""Tests for local text-to-speech chunking and the phrase audio cache."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from server.agent import REASK_LINE
+from server.tts import PhraseAudioCache, SentenceChunker, SpeechService, fixed_phrases, split_sentences
+
+
+class CountingSynthesizer:
+    sample_rate = 16000
+
+    def __init__(self):
+        self.calls = []
+
+    def synthesize(self, text):
+        self.calls.append(text)
+        return text.encode()
+
+
+def _service(synthesizer, cache=None):
+    return SpeechService(
+        cache=cache or PhraseAudioCache(),
+        synthesizer_factory=lambda language: synthesizer,
+        executor=ThreadPoolExecutor(1),
+    )
+
+
+def test_chunker_emits_sentences_as_they_complete():
+    chunker = SentenceChunker()
+    assert chunker.feed("Thank you. How will") == ["Thank you."]
+    assert chunker.feed(" you fund it? And") == ["How will you fund it?"]
+    assert chunker.flush() == ["And"]
+
+
+def test_split_sentences_handles_danda():
+    assert split_sentences("Aap kahan padhenge। Kyun?") == ["Aap kahan padhenge।", "Kyun?"]
+
+
+def test_cache_evicts_least_recently_used_over_budget():
+    cache = PhraseAudioCache(max_bytes=10)
+    cache.put("en", "a", b"12345")
+    cache.put("en", "b", b"12345")
+    cache.get("en", "a")
+    cache.put("en", "c", b"12345")
+    assert ("en", "a") in cache
+    assert ("en", "b") not in cache
+    assert cache.bytes == 10
+
+
+def test_stream_synthesizes_each_sentence_once():
+    synthesizer = CountingSynthesizer()
+    service = _service(synthesizer)
+
+    async def run():
+        first = [s async for s, _ in service.stream("Hello there. Please sit.")]
+        second = [s async for s, _ in service.stream("Please sit.")]
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == ["Hello there.", "Please sit."]
+    assert second == ["Please sit."]
+    assert synthesizer.calls == ["Hello there.", "Please sit."]
+    assert service.cache.hits == 1
+
+
+def test_stream_accepts_async_fragments():
+    service = _service(CountingSynthesizer())
+
+    async def tokens():
+        for token in ["Your ", "answer ", "is clear.", " Next"]:
+            yield token
+
+    async def run():
+        return [s async for s, _ in service.stream(tokens())]
+
+    assert asyncio.run(run()) == ["Your answer is clear.", "Next"]
+
+
+def test_prewarm_covers_fixed_phrases():
+    synthesizer = CountingSynthesizer()
+    service = _service(synthesizer)
+    asyncio.run(service.prewarm())
+    phrases = fixed_phrases()
+    assert ("en", REASK_LINE) in phrases
+    assert any(language == "hi" for language, _ in phrases)
+    assert all(phrase in service.cache for phrase in phrases)
+    assert service.cache.hits == 0
+
+
+def test_voices_load_off_the_event_loop_and_sample_rate_is_remembered():
+    synthesizer = CountingSynthesizer()
+    loads = []
+
+    def factory(language):
+        loads.append(threading.current_thread())
+        return synthesizer
+
+    service = SpeechService(
+        cache=PhraseAudioCache(), synthesizer_factory=factory, executor=ThreadPoolExecutor(1)
+    )
+
+    async def run():
+        await service.synthesize("Good morning.", "hi")
+        return await service.sample_rate("hi")
+
+    assert asyncio.run(run()) == 16000
+    assert len(loads) == 1
+    assert threading.main_thread() not in loads
@@ -0,0 +1,71 @@
+"""Tests for voice activity detection on PCM16 audio."""
+
+import numpy as np
+
+from server.vad import SILENCE, SPEECH, VoiceActivityDetector
+
+RATE = 16000
+
+
+def _tone(seconds, amplitude=8000, freq=220):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype("<i2").tobytes()
+
+
+def _quiet(seconds):
+    return b"\x00\x00" * int(RATE * seconds)
+
+
+def _hiss(seconds, amplitude=2000):
+    rng = np.random.default_rng(0)
+    return rng.integers(-amplitude, amplitude, int(RATE * seconds), dtype="<i2").tobytes()
+
+
+def test_classifies_tone_as_speech_and_hiss_as_noise():
+    vad = VoiceActivityDetector()
+    assert vad.classify(np.frombuffer(_tone(0.3), dtype="<i2")).all()
+    assert not vad.classify(np.frombuffer(_quiet(0.3), dtype="<i2")).any()
+    assert not vad.classify(np.frombuffer(_hiss(0.3), dtype="<i2")).any()
+
+
+def test_reports_speech_then_silence_once():
+    vad = VoiceActivityDetector(silence_seconds=1.0)
+    events = vad.process(_tone(0.5)) + vad.process(_quiet(3.0))
+    assert [e["type"] for e in events] == [SPEECH, SILENCE]
+    assert events[0]["at"] < 0.1
+    assert events[1]["duration"] >= 1.0
+    assert 1.4 <= events[1]["at"] <= 1.6
+
+
+def test_handles_chunks_that_split_frames():
+    audio = _quiet(1.5) + _tone(0.6) + _quiet(1.5)
+    whole = VoiceActivityDetector(silence_seconds=1.0).process(audio)
+    vad = VoiceActivityDetector(silence_seconds=1.0)
+    pieces = []
+    for i in range(0, len(audio), 1234):
+        pieces += vad.process(audio[i:i + 1234])
+    assert pieces == whole
+    assert [e["type"] for e in whole] == [SILENCE, SPEECH, SILENCE]
+
+
+def test_short_pause_does_not_end_speech():
+    vad = VoiceActivityDetector(hangover_ms=300, silence_seconds=1.0)
+    events = vad.process(_tone(0.5) + _quiet(0.15) + _tone(0.5))
+    assert [e["type"] for e in events] == [SPEECH]
+    assert vad.in_speech
+
+
+def test_restart_silence_timer():
+    vad = VoiceActivityDetector(silence_seconds=1.0)
+    assert vad.process(_quiet(0.8)) == []
+    vad.restart_silence_timer()
+    assert vad.process(_quiet(0.8)) == []
+    assert [e["type"] for e in vad.process(_quiet(0.4))] == [SILENCE]
+
+
+def test_restart_silence_timer_after_a_delay():
+    vad = VoiceActivityDetector(silence_seconds=1.0)
+    vad.restart_silence_timer(delay=2.0)  # the officer's reply is still playing
+    assert vad.process(_quiet(2.9)) == []
+    (event,) = vad.process(_quiet(0.2))
+    assert event["type"] == SILENCE and event["at"] >= 3.0  # 30 ms frames
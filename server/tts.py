@@ -0,0 +1,225 @@
+"""Local text-to-speech for the self-hosted voice mode.
+
+Officer replies are split into sentences and each sentence is synthesized as
+soon as it is complete, so audio starts playing before the whole reply has
+been generated. Lines that repeat in every session (greeting, questions,
+Hindi hints, the re-ask line) are synthesized at startup and served from an
+in-memory LRU cache. The default backend is Piper (``pip install -r
+requirements-local.txt`` plus a voice model in TTS_MODEL_PATH, and
+TTS_MODEL_PATH_HI for Hindi).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from server.agent import CLOSING_LINE, OFFICER_GREETING, REASK_LINE
+from server.questions import get_all_questions
+
+# End of sentence: terminal punctuation (including the Devanagari danda)
+# followed by whitespace.
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+
+_synthesizers: dict = {}
+_synthesizers_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+
+
+class SentenceChunker:
+    """Turns a stream of reply text fragments into complete sentences."""
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, fragment: str) -> list[str]:
+        """Add text; return every sentence completed by it."""
+        self._pending += fragment
+        parts = _SENTENCE_END.split(self._pending)
+        self._pending = parts.pop()
+        return [part.strip() for part in parts if part.strip()]
+
+    def flush(self) -> list[str]:
+        """Return whatever is left once the reply is complete."""
+        rest, self._pending = self._pending.strip(), ""
+        return [rest] if rest else []
+
+
+def split_sentences(text: str) -> list[str]:
+    chunker = SentenceChunker()
+    return chunker.feed(text) + chunker.flush()
+
+
+class Synthesizer:
+    """Interface for TTS backends producing mono PCM16 audio."""
+
+    sample_rate: int = 22050
+
+    def synthesize(self, text: str) -> bytes:
+        raise NotImplementedError
+
+
+class PiperSynthesizer(Synthesizer):
+    """Synthesizer backed by a Piper ONNX voice."""
+
+    def __init__(self, model_path: str):
+        try:
+            from piper.voice import PiperVoice
+        except ImportError as exc:
+            raise RuntimeError("Local TTS needs the piper-tts package: pip install -r requirements-local.txt") from exc
+        self._voice = PiperVoice.load(model_path)
+        self.sample_rate = self._voice.config.sample_rate
+
+    def synthesize(self, text: str) -> bytes:
+        return b"".join(self._voice.synthesize_stream_raw(text))
+
+
+def create_synthesizer(language: str = "en") -> Synthesizer:
+    """Return the (shared) synthesizer for a language, loading its voice on first use.
+
+    Loading reads the model from disk, so call this from the synthesis pool,
+    never on the event loop.
+    """
+    with _synthesizers_lock:  # pool threads racing on a first use load the voice once
+        if language not in _synthesizers:
+            model_path = os.getenv(f"TTS_MODEL_PATH_{language.upper()}") or os.getenv("TTS_MODEL_PATH")
+            if not model_path:
+                raise ValueError("TTS_MODEL_PATH not set in environment")
+            _synthesizers[language] = PiperSynthesizer(model_path)
+        return _synthesizers[language]
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Shared synthesis pool, sized by TTS_WORKERS (defaults to 2)."""
+    global _executor
+    if _executor is None:
+        workers = int(os.getenv("TTS_WORKERS", "2"))
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+    return _executor
+
+
+class PhraseAudioCache:
+    """LRU cache of synthesized audio keyed by (language, text), bounded in bytes."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._audio: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+
+    def get(self, language: str, text: str) -> bytes | None:
+        audio = self._audio.get((language, text))
+        if audio is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._audio.move_to_end((language, text))
+        return audio
+
+    def put(self, language: str, text: str, audio: bytes):
+        key = (language, text)
+        if key in self._audio:
+            self.bytes -= len(self._audio.pop(key))
+        self._audio[key] = audio
+        self.bytes += len(audio)
+        while self.bytes > self.max_bytes and len(self._audio) > 1:
+            _, evicted = self._audio.popitem(last=False)
+            self.bytes -= len(evicted)
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self._audio
+
+    def __len__(self) -> int:
+        return len(self._audio)
+
+
+def fixed_phrases() -> list[tuple[str, str]]:
+    """(language, sentence) pairs spoken in every session."""
+    phrases = [("en", sentence) for sentence in split_sentences(OFFICER_GREETING)]
+    phrases.append(("en", REASK_LINE))
+    phrases.append(("en", CLOSING_LINE))
+    for q in get_all_questions():
+        phrases.extend(("en", sentence) for sentence in split_sentences(q["question_en"]))
+        phrases.extend(("hi", sentence) for sentence in split_sentences(q["hint_hi"]))
+    return phrases
+
+
+async def _iterate(fragments):
+    if isinstance(fragments, str):
+        yield fragments
+    elif hasattr(fragments, "__aiter__"):
+        async for fragment in fragments:
+            yield fragment
+    else:
+        for fragment in fragments:
+            yield fragment
+
+
+class SpeechService:
+    """Sentence-level streaming synthesis in front of a phrase cache.
+
+    Synthesizers are only built or fetched inside the synthesis pool, since the
+    first use of a language loads its voice from disk.
+    """
+
+    def __init__(self, cache: PhraseAudioCache | None = None, synthesizer_factory=None, executor=None):
+        self.cache = cache or PhraseAudioCache(
+            max_bytes=int(os.getenv("TTS_CACHE_BYTES", str(64 * 1024 * 1024)))
+        )
+        self._synthesizer_factory = synthesizer_factory or create_synthesizer
+        self._executor = executor
+        self._sample_rates: dict[str, int] = {}
+
+    def _synthesizer(self, language: str) -> Synthesizer:
+        synthesizer = self._synthesizer_factory(language)
+        self._sample_rates[language] = synthesizer.sample_rate
+        return synthesizer
+
+    def _synthesize(self, text: str, language: str) -> bytes:
+        return self._synthesizer(language).synthesize(text)
+
+    async def synthesize(self, text: str, language: str = "en") -> bytes:
+        """Audio for one sentence, from the cache when possible."""
+        audio = self.cache.get(language, text)
+        if audio is None:
+            loop = asyncio.get_running_loop()
+            audio = await loop.run_in_executor(
+                self._executor or get_executor(), self._synthesize, text, language
+            )
+            self.cache.put(language, text, audio)
+        return audio
+
+    async def stream(self, fragments, language: str = "en"):
+        """Yield (sentence, audio) pairs as soon as each sentence of a reply is complete.
+
+        ``fragments`` may be a string or an (async) iterable of text pieces,
+        e.g. tokens arriving from a language model.
+        """
+        chunker = SentenceChunker()
+        async for fragment in _iterate(fragments):
+            for sentence in chunker.feed(fragment):
+                yield sentence, await self.synthesize(sentence, language)
+        for sentence in chunker.flush():
+            yield sentence, await self.synthesize(sentence, language)
+
+    async def prewarm(self):
+        """Synthesize every fixed phrase into the cache."""
+        for language, sentence in fixed_phrases():
+            if (language, sentence) not in self.cache:
+                await self.synthesize(sentence, language)
+
+    async def sample_rate(self, language: str = "en") -> int:
+        """Sample rate of a language's audio, remembered once its synthesizer is loaded."""
+        rate = self._sample_rates.get(language)
+        if rate is None:
+            loop = asyncio.get_running_loop()
+            synthesizer = await loop.run_in_executor(
+                self._executor or get_executor(), self._synthesizer, language
+            )
+            rate = synthesizer.sample_rate
+        return rate
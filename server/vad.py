@@ -0,0 +1,128 @@
+"""Voice activity detection on the incoming PCM16 audio stream.
+
+Audio is cut into fixed frames and each frame is classified from two
+features computed for a whole chunk at once with NumPy: RMS energy in dBFS
+and the zero-crossing rate. Loud frames with a low crossing rate are speech;
+quiet frames, or hiss with a high crossing rate, are not. A short run of
+speech frames starts an utterance, a longer run of non-speech frames ends
+it, and a gap of ``silence_seconds`` with no speech at all raises a single
+silence event so the officer can offer Hindi help without a round trip to
+the LLM.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+
+import numpy as np
+
+from server.stt import SAMPLE_RATE
+
+SPEECH = "speech"
+SILENCE = "silence"
+
+
+class VoiceActivityDetector:
+    """Streaming speech/silence detector for one connection's audio."""
+
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        frame_ms: int = 30,
+        energy_db: float = -45.0,
+        max_zcr: float = 0.35,
+        min_speech_ms: int = 90,
+        hangover_ms: int = 300,
+        silence_seconds: float = 6.0,
+    ):
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_seconds = self.frame_samples / sample_rate
+        # Compare mean squares against the threshold to skip a sqrt and log per frame.
+        self._energy_threshold = (10 ** (energy_db / 20) * 32768) ** 2
+        self._max_crossings = max_zcr * (self.frame_samples - 1)
+        self._min_speech = max(1, round(min_speech_ms / frame_ms))
+        self._hangover = max(1, round(hangover_ms / frame_ms))
+        self._silence_frames = max(1, math.ceil(silence_seconds * 1000 / frame_ms))
+        self._pending = b""
+        self._frames = 0
+        self._run_speech = False
+        self._run_start = 0
+        self.in_speech = False
+        self._quiet_since = 0
+        self._silence_reported = False
+
+    def classify(self, samples: np.ndarray) -> np.ndarray:
+        """Speech flag per frame for whole frames of int16 samples."""
+        frames = samples.reshape(-1, self.frame_samples).astype(np.float32)
+        energy = np.einsum("ij,ij->i", frames, frames) / self.frame_samples
+        signs = np.signbit(frames)
+        crossings = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1)
+        return (energy > self._energy_threshold) & (crossings < self._max_crossings)
+
+    def process(self, pcm: bytes) -> list[dict]:
+        """Feed PCM16 audio; return speech/silence events, timed in stream seconds."""
+        data = self._pending + pcm if self._pending else pcm
+        frame_bytes = 2 * self.frame_samples
+        usable = len(data) - len(data) % frame_bytes
+        self._pending = data[usable:]
+        if not usable:
+            return []
+        flags = self.classify(np.frombuffer(data[:usable], dtype="<i2"))
+
+        events = []
+        # Walk runs of equal flags rather than single frames.
+        edges = np.flatnonzero(flags[1:] != flags[:-1]) + 1
+        starts = [0, *edges.tolist()]
+        ends = [*edges.tolist(), len(flags)]
+        for start, end in zip(starts, ends):
+            self._run(bool(flags[start]), self._frames + start, self._frames + end, events)
+        self._frames += len(flags)
+        return events
+
+    def _run(self, speech: bool, start: int, end: int, events: list):
+        if speech != self._run_speech:
+            self._run_speech = speech
+            self._run_start = start
+        if speech:
+            confirmed = self._run_start + self._min_speech - 1
+            if not self.in_speech and confirmed < end:
+                self.in_speech = True
+                self._silence_reported = False
+                events.append({"type": SPEECH, "at": self._seconds(max(start, confirmed))})
+            return
+        if self.in_speech:
+            if self._run_start + self._hangover > end:
+                return
+            self.in_speech = False
+            self._quiet_since = self._run_start
+        due = self._quiet_since + self._silence_frames
+        if not self._silence_reported and due <= end:
+            self._silence_reported = True
+            at = max(start, due)
+            events.append({
+                "type": SILENCE,
+                "at": self._seconds(at),
+                "duration": self._seconds(at - self._quiet_since),
+            })
+
+    def restart_silence_timer(self, delay: float = 0.0):
+        """Count silence from ``delay`` seconds of stream time after now, e.g. from
+        when the officer's reply, already sent, finishes playing."""
+        self._quiet_since = self._frames + round(delay / self.frame_seconds)
+        self._silence_reported = False
+
+    def _seconds(self, frames: int) -> float:
+        return round(frames * self.frame_seconds, 3)
+
+
+def create_vad() -> VoiceActivityDetector:
+    """Build a detector configured from VAD_* environment variables."""
+    return VoiceActivityDetector(
+        frame_ms=int(os.getenv("VAD_FRAME_MS", "30")),
+        energy_db=float(os.getenv("VAD_ENERGY_DB", "-45")),
+        max_zcr=float(os.getenv("VAD_MAX_ZCR", "0.35")),
+        min_speech_ms=int(os.getenv("VAD_MIN_SPEECH_MS", "90")),
+        hangover_ms=int(os.getenv("VAD_HANGOVER_MS", "300")),
+        silence_seconds=float(os.getenv("VAD_SILENCE_SECONDS", "6")),
+    )